@@ -0,0 +1,139 @@
+# benchmarks/mock_api.py
+
+import asyncio
+import base64
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from aiohttp import web
+
+
+def make_token(ttl: int, subject: str = "benchmark") -> str:
+    """JWT-подобный токен с exp (подпись не проверяется), чтобы кэш брал срок из токена"""
+    def encode(payload: dict) -> str:
+        raw = json.dumps(payload).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    return ".".join([encode({"alg": "none"}), encode({"sub": subject, "exp": int(time.time()) + ttl}), "sig"])
+
+
+@dataclass
+class MockStats:
+    key_requests: int = 0
+    token_requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+    by_status: dict = field(default_factory=dict)
+
+    def count(self, status: int):
+        self.by_status[status] = self.by_status.get(status, 0) + 1
+
+
+class MockTrueAPI:
+    """Локальный сервер с /auth/key и /token для нагрузочных прогонов.
+
+    latency: задержка ответа, секунды (плюс случайная добавка до latency_jitter);
+    error_rate: доля ответов 503; throttle_rate: доля ответов 429 с Retry-After.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.1,
+        token_ttl: int = 36000,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.token_ttl = token_ttl
+        self.stats = MockStats()
+        self._random = random.Random(seed)
+        self._challenges = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    @property
+    def key_url(self) -> str:
+        return self.base_url + "/auth/key"
+
+    @property
+    def token_url(self) -> str:
+        return self.base_url + "/token"
+
+    async def _delay_or_fail(self) -> Optional[web.Response]:
+        delay = self.latency + self._random.uniform(0, self.latency_jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        roll = self._random.random()
+        if roll < self.throttle_rate:
+            self.stats.throttled += 1
+            self.stats.count(429)
+            return web.json_response(
+                {"error_message": "Too many requests"}, status=429, headers={"Retry-After": str(self.retry_after)}
+            )
+        if roll < self.throttle_rate + self.error_rate:
+            self.stats.errors += 1
+            self.stats.count(503)
+            return web.json_response({"error_message": "Service unavailable"}, status=503)
+        return None
+
+    async def auth_key(self, request: web.Request) -> web.Response:
+        self.stats.key_requests += 1
+        failure = await self._delay_or_fail()
+        if failure is not None:
+            return failure
+        challenge_uuid = str(uuid.uuid4())
+        data = uuid.uuid4().hex + uuid.uuid4().hex
+        self._challenges[challenge_uuid] = data
+        self.stats.count(200)
+        return web.json_response({"uuid": challenge_uuid, "data": data})
+
+    async def token(self, request: web.Request) -> web.Response:
+        self.stats.token_requests += 1
+        failure = await self._delay_or_fail()
+        if failure is not None:
+            return failure
+        try:
+            body = await request.json()
+        except ValueError:
+            body = {}
+        code = body.get("code")
+        # challenge одноразовый, как в True API
+        if not body.get("signature") or self._challenges.pop(code, None) is None:
+            self.stats.count(401)
+            return web.json_response({"error_message": "Неверный код или подпись"}, status=401)
+        self.stats.count(200)
+        return web.json_response({"token": make_token(self.token_ttl, code)})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> "MockTrueAPI":
+        app = web.Application()
+        app.router.add_get("/auth/key", self.auth_key)
+        app.router.add_post("/token", self.token)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.base_url = f"http://{bound_host}:{bound_port}"
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
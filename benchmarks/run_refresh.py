@@ -0,0 +1,280 @@
+# benchmarks/run_refresh.py
+"""Нагрузочный прогон полного цикла обновления токенов (ключ → подпись → токен)
+против локального mock True API.
+
+python -m benchmarks.run_refresh --orgs 1000 --concurrency 50 --latency 0.02 --throttle-rate 0.05
+"""
+
+import argparse
+import asyncio
+import base64
+import functools
+import hashlib
+import json
+import math
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from src.async_signer import AsyncSigner
+from src.batch_refresh import BatchRefresher
+from src.http_session import SessionManager
+from src.pipeline import refresh_pipelined
+from src.rate_limiter import ENDPOINT_KEY, ENDPOINT_TOKEN, RateLimiter
+from src.sharding import ShardedRefresher, ShardOptions
+from src.signer_backend import PAYLOAD_BYTES, SignerBackend, payload_format_of
+from src.timeouts import PHASE_KEY, PHASE_SIGN, PHASE_TOKEN
+from src.token_cache import TokenCache
+from src.tracing import FileSpanExporter, set_exporter
+
+from .mock_api import MockTrueAPI
+
+SIGNERS = ("fake", "local")
+
+
+class FakeSigner(SignerBackend):
+    """Подписант без криптографии: SHA-256 от данных в base64; sign_delay имитирует стоимость подписи"""
+
+    payload_format = PAYLOAD_BYTES
+
+    def __init__(self, sign_delay: float = 0.0):
+        self.sign_delay = sign_delay
+        self.inn = None
+
+    def initialize_store(self, store_location=3):
+        return True
+
+    def select_certificate(self, thumbprint=None):
+        return True
+
+    def select_certificate_by_inn(self, inn):
+        self.inn = inn
+        return True
+
+    def sign_data(self, data_to_sign, detached=True):
+        if self.sign_delay:
+            time.sleep(self.sign_delay)  # блокирующий вызов, как COM
+        if isinstance(data_to_sign, str):
+            data_to_sign = data_to_sign.encode("utf-8")
+        return base64.b64encode(hashlib.sha256(data_to_sign).digest()).decode("ascii")
+
+    def verify_signature(self, signature, original_data=None):
+        return True
+
+    def close(self):
+        pass
+
+
+def synthetic_inns(count: int) -> List[str]:
+    return [str(7700000000 + position) for position in range(count)]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {f"p{q}": percentile(values, q) for q in (50, 95, 99)}
+
+
+@dataclass
+class BenchmarkReport:
+    organizations: int
+    succeeded: int
+    failed: int
+    elapsed: float
+    throughput: float  # токенов в секунду
+    latency: Dict[str, float]  # p50/p95/p99 суммы этапов одной организации, секунды
+    phases: Dict[str, Dict[str, float]]
+    peak_memory_mb: Optional[float]
+    errors: Dict[str, int] = field(default_factory=dict)  # причина сбоя → количество
+    api: Dict[str, object] = field(default_factory=dict)
+
+
+def _local_signer_factory(inns: List[str], directory: str):
+    from src.local_signer import LocalCMSSigner, create_test_certificate
+
+    for inn in inns:
+        create_test_certificate(inn, directory)
+    # partial, а не lambda: фабрика передаётся в процессы-обработчики (pickle)
+    return functools.partial(LocalCMSSigner, directory), LocalCMSSigner
+
+
+async def run_benchmark(
+    organizations: int = 100,
+    concurrency: int = 20,
+    signer: str = "fake",
+    sign_workers: int = 4,
+    sign_delay: float = 0.0,
+    latency: float = 0.0,
+    latency_jitter: float = 0.0,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    rate_limit: float = 1000.0,
+    pipelined: bool = False,
+    trace_memory: bool = True,
+    seed: Optional[int] = None,
+    workers: int = 1,
+) -> BenchmarkReport:
+    """Один прогон: mock API и подписант поднимаются заново, замеряется только обновление.
+
+    Mock-сервер работает в том же процессе и event loop, поэтому его память и CPU
+    входят в результат; сравнивать стоит прогоны с одинаковыми параметрами.
+    workers > 1 — обновление в процессах ShardedRefresher (concurrency и sign_workers — на процесс,
+    rate_limit — общий); tracemalloc видит только память родителя.
+    """
+    if signer not in SIGNERS:
+        raise ValueError(f"Неизвестный подписант: {signer}")
+    inns = synthetic_inns(organizations)
+
+    with tempfile.TemporaryDirectory() as certificates_dir:
+        if signer == "local":
+            signer_factory, signer_class = _local_signer_factory(inns, certificates_dir)
+        else:
+            signer_factory, signer_class = functools.partial(FakeSigner, sign_delay), FakeSigner
+        async_signer = AsyncSigner(
+            signer_factory=signer_factory, max_workers=sign_workers, payload_format=payload_format_of(signer_class)
+        )
+
+        async with MockTrueAPI(latency, latency_jitter, error_rate, throttle_rate, seed=seed) as api:
+            rate_limiter = RateLimiter(
+                default_rate=rate_limit, endpoint_rates={ENDPOINT_KEY: rate_limit, ENDPOINT_TOKEN: rate_limit}
+            )
+            refresher = BatchRefresher(
+                async_signer,
+                key_url=api.key_url,
+                token_url=api.token_url,
+                concurrency=concurrency,
+                sessions=SessionManager(limit=max(100, concurrency), limit_per_host=concurrency),
+                cache=TokenCache(),
+                rate_limiter=rate_limiter,
+            )
+            sharded = ShardedRefresher(
+                workers=workers,
+                cache=refresher.cache,
+                options=ShardOptions(
+                    signer_factory=signer_factory,
+                    sign_workers=sign_workers,
+                    concurrency=concurrency,
+                    key_url=api.key_url,
+                    token_url=api.token_url,
+                    rate_limit=rate_limit,
+                    payload_format=async_signer.payload_format,
+                ),
+            )
+            if trace_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            try:
+                if workers > 1:
+                    results = await sharded.refresh_all(inns)
+                elif pipelined:
+                    results = await refresh_pipelined(refresher, inns)
+                else:
+                    results = await refresher.refresh_all(inns)
+                elapsed = time.perf_counter() - started
+                peak_memory = tracemalloc.get_traced_memory()[1] / 2**20 if trace_memory else None
+            finally:
+                if trace_memory:
+                    tracemalloc.stop()
+                await refresher.close()
+                async_signer.close()
+
+    succeeded = [result for result in results.values() if result.ok]
+    errors: Dict[str, int] = {}
+    for result in results.values():
+        if not result.ok:
+            errors[result.cause or "error"] = errors.get(result.cause or "error", 0) + 1
+    return BenchmarkReport(
+        organizations=organizations,
+        succeeded=len(succeeded),
+        failed=organizations - len(succeeded),
+        elapsed=elapsed,
+        throughput=len(succeeded) / elapsed if elapsed else 0.0,
+        latency=summarize([sum(result.timings.values()) for result in succeeded]),
+        phases={
+            phase: summarize([result.timings[phase] for result in succeeded if phase in result.timings])
+            for phase in (PHASE_KEY, PHASE_SIGN, PHASE_TOKEN)
+        },
+        peak_memory_mb=peak_memory,
+        errors=errors,
+        api=asdict(api.stats),
+    )
+
+
+def format_report(report: BenchmarkReport) -> str:
+    def row(name: str, values: Dict[str, float]) -> str:
+        return f"  {name:<8}" + "".join(f"{key}={value * 1000:9.1f} ms " for key, value in values.items())
+
+    lines = [
+        f"Организаций: {report.organizations}, успешно: {report.succeeded}, с ошибкой: {report.failed}",
+        f"Время: {report.elapsed:.2f} с, пропускная способность: {report.throughput:.1f} токенов/с",
+        "Задержка одной организации:",
+        row("всего", report.latency),
+    ]
+    lines += [row(phase, values) for phase, values in report.phases.items()]
+    if report.peak_memory_mb is not None:
+        lines.append(f"Пиковая память (tracemalloc): {report.peak_memory_mb:.1f} МБ")
+    if report.errors:
+        lines.append("Ошибки: " + ", ".join(f"{cause}={count}" for cause, count in sorted(report.errors.items())))
+    lines.append(f"Mock API: {report.api}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон обновления токенов против mock True API")
+    parser.add_argument("--orgs", type=int, default=100, help="количество синтетических организаций (1–10000)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--signer", choices=SIGNERS, default="fake")
+    parser.add_argument("--sign-workers", type=int, default=4)
+    parser.add_argument("--sign-delay", type=float, default=0.0, help="задержка fake-подписи, с")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа mock API, с")
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--rate-limit", type=float, default=1000.0, help="клиентский лимит, запросов/с")
+    parser.add_argument("--pipelined", action="store_true", help="конвейерный режим")
+    parser.add_argument("--workers", type=int, default=1, help="процессов обновления (ShardedRefresher)")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="не замерять память (tracemalloc замедляет прогон)")
+    parser.add_argument("--trace", metavar="PATH", help="записать интервалы трассировки в файл JSON Lines")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = parser.parse_args(argv)
+    if not 1 <= args.orgs <= 10000:
+        parser.error("--orgs: от 1 до 10000")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.trace:
+        set_exporter(FileSpanExporter(args.trace))
+    report = asyncio.run(run_benchmark(
+        organizations=args.orgs,
+        concurrency=args.concurrency,
+        signer=args.signer,
+        sign_workers=args.sign_workers,
+        sign_delay=args.sign_delay,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit,
+        pipelined=args.pipelined,
+        trace_memory=not args.no_tracemalloc,
+        seed=args.seed,
+        workers=args.workers,
+    ))
+    set_exporter(None)
+    print(json.dumps(asdict(report), ensure_ascii=False, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,96 @@
+import asyncio
 from src import to_sign_data as sign
 from src import consts as c 
 from src import send_request as send
+from src import batch_refresh as batch
+from src import token_cache as cache
+from src import scheduler
+from src import async_signer
+from src import pipeline
+from src import metrics
+from src import organizations
+from src import sharding
+from src import leases
 
 async def main():
-    sign.get_certificates_list()
-    
     # Подписание данных
     print("\n=== Подписание данных ===")
     signer = sign.CryptoProSigner()
     
     if signer.initialize_store():
         if signer.select_certificate(c.The_print):  # Можно указать отпечаток
-            data_sign = send.AsyncAPIHandler._make_request()
-            data_to_base64= send.AsyncAPIHandler.decode_data(data_sign)
-            signature = signer.sign_data(data_to_base64["data"])
+            # Challenge выдаёт /auth/key; URL_TOKEN по умолчанию — эндпоинт обмена на токен
+            async with send.AsyncAPIHandler(c.URL_KEY) as handler:
+                data_sign = await handler._make_request()
+            # CryptoPro подписывает base64 строкой
+            data_to_base64 = send.encode_challenge(data_sign["data"], signer.payload_format)
+            signature = signer.sign_data(data_to_base64)
             
             if signature:
                 print(f"Подпись создана успешно")
                 
                 # Проверка подписи
                 print("\n=== Проверка подписи ===")
-                signer.verify_signature(signature, data_sign)
+                signer.verify_signature(signature, data_to_base64)
             
             signer.close()
-            response= send.AsyncAPIHandler.get_auth_token(data_sign["uuid"],signature)
-            return await response.json()
\ No newline at end of file
+            return await send.get_auth_token(data_sign["uuid"], signature)
+
+
+async def refresh_all_organizations(pipelined=False):
+    """Обновление токенов всех организаций из organization.json
+    pipelined: конвейерный режим (запрос challenge и обмен на токен идут параллельно с подписью)
+    При REFRESH_WORKERS > 1 организации делятся между процессами (в каждом — конвейер при pipelined),
+    токены собираются в общий кэш
+    Аренда ИНН (LEASE_BACKEND) действует только в обычном режиме; конвейерный и многопроцессный — для одного узла,
+    поэтому вместе с LEASE_BACKEND они не запускаются
+    """
+    if c.LEASE_BACKEND and (pipelined or c.REFRESH_WORKERS > 1):
+        raise ValueError(
+            "LEASE_BACKEND не поддерживается в конвейерном режиме и при REFRESH_WORKERS > 1: "
+            "организации обновлялись бы без аренды"
+        )
+    if c.REFRESH_WORKERS > 1:
+        refresher = sharding.ShardedRefresher(
+            cache=cache.create_token_cache(),
+            options=sharding.ShardOptions(pipelined=pipelined),
+        )
+        return await refresher.refresh_all(batch.load_organizations())
+    signer = async_signer.AsyncSigner()
+    try:
+        async with batch.BatchRefresher(signer, cache=cache.create_token_cache()) as refresher:
+            if pipelined:
+                return await pipeline.refresh_pipelined(refresher, batch.load_organizations())
+            lease_backend = leases.create_lease_backend()
+            if lease_backend is not None:
+                refresher = leases.LeasedRefresher(refresher, lease_backend)
+            return await refresher.refresh_all(batch.load_organizations())
+    finally:
+        signer.close()
+
+
+async def run_refresh_scheduler():
+    """Фоновое обновление токенов всех организаций до остановки процесса"""
+    signer = async_signer.AsyncSigner()
+    token_cache = cache.create_token_cache()
+    metrics.track_cache(token_cache)
+    metrics_server = await metrics.start_metrics_server(c.METRICS_HOST, c.METRICS_PORT) if c.METRICS_PORT else None
+    try:
+        async with batch.BatchRefresher(signer) as refresher:
+            # На нескольких узлах каждую организацию обновляет владелец аренды её ИНН
+            lease_backend = leases.create_lease_backend()
+            if lease_backend is not None:
+                refresher = leases.LeasedRefresher(refresher, lease_backend)
+            async with scheduler.RefreshScheduler(refresher, token_cache) as refresh_scheduler:
+                # Изменения файла организаций затрагивают только добавленные, удалённые и изменённые ИНН
+                watcher = organizations.OrganizationWatcher()
+                await refresh_scheduler.start(watcher.registry.inns())
+                watch_task = asyncio.create_task(watcher.watch(refresh_scheduler))
+                try:
+                    await asyncio.Event().wait()
+                finally:
+                    watch_task.cancel()
+    finally:
+        signer.close()
+        if metrics_server:
+            await metrics_server.cleanup()
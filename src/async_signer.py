@@ -0,0 +1,156 @@
+# src/async_signer.py
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, Callable, Iterable, List, Optional, Union
+
+from . import consts as c
+from .logger_setup import logger
+from .signer_backend import (
+    PAYLOAD_TEXT,
+    SignResult,
+    backend_payload_format,
+    create_signer_backend,
+    payload_format_of,
+    sign_each,
+)
+from .tracing import tracer
+
+
+async def _chunks(payloads: Union[Iterable, AsyncIterable], size: int):
+    """Части по size элементов из обычного или асинхронного итератора"""
+    chunk = []
+    if hasattr(payloads, "__aiter__"):
+        async for item in payloads:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    else:
+        for item in payloads:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _init_com_apartment():
+    """Каждый поток пула работает в собственном COM-апартаменте"""
+    try:
+        import pythoncom
+    except ImportError:  # не Windows: COM не нужен (например, для локальных подписантов)
+        return
+    pythoncom.CoInitialize()
+
+
+class AsyncSigner:
+    """Асинхронная обёртка над подписантом (SignerBackend): подпись выполняется в выделенном
+    пуле потоков, чтобы блокирующие COM-вызовы не останавливали event loop"""
+
+    def __init__(
+        self,
+        signer_factory: Callable = create_signer_backend,
+        max_workers: Optional[int] = None,
+        store_location: int = 3,
+        payload_format: Optional[str] = None,
+    ):
+        """payload_format: в каком виде отдавать данные подписанту (PAYLOAD_TEXT/PAYLOAD_BYTES);
+        по умолчанию — по бэкенду из SIGNER_BACKEND или атрибуту класса signer_factory"""
+        self.signer_factory = signer_factory
+        self.payload_format = payload_format or self._default_payload_format(signer_factory)
+        self.store_location = store_location
+        self.max_workers = max(1, c.SIGNER_WORKERS if max_workers is None else max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="signer",
+            initializer=_init_com_apartment,
+        )
+        self._local = threading.local()
+        self._signers: List = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _default_payload_format(signer_factory) -> str:
+        if signer_factory is create_signer_backend:
+            return backend_payload_format()
+        return payload_format_of(signer_factory, PAYLOAD_TEXT)
+
+    def _worker_signer(self):
+        """Свой подписант на каждый поток: COM-объекты привязаны к апартаменту"""
+        signer = getattr(self._local, "signer", None)
+        if signer is None:
+            signer = self.signer_factory()
+            if not signer.initialize_store(self.store_location):
+                raise RuntimeError("Не удалось инициализировать хранилище сертификатов")
+            self._local.signer = signer
+            with self._lock:
+                self._signers.append(signer)
+        return signer
+
+    def _sign_in_worker(self, inn: str, data) -> Optional[str]:
+        with tracer.span("signer.sign", inn=inn):
+            signer = self._worker_signer()
+            if not signer.select_certificate_by_inn(inn):
+                return None
+            return signer.sign_data(data)
+
+    def _sign_many_in_worker(self, inn: str, payloads: list) -> List[SignResult]:
+        with tracer.span("signer.sign_many", inn=inn, **{"batch.size": len(payloads)}):
+            try:
+                signer = self._worker_signer()
+            except RuntimeError as e:
+                return [SignResult(None, str(e)) for _ in payloads]
+            if not signer.select_certificate_by_inn(inn):
+                return [SignResult(None, f"Сертификат для ИНН {inn} не найден") for _ in payloads]
+            return sign_each(signer, payloads)
+
+    def _verify_in_worker(self, signature, data) -> bool:
+        return self._worker_signer().verify_signature(signature, data)
+
+    async def sign(self, inn: str, data) -> Optional[str]:
+        """Подписывает data сертификатом организации inn"""
+        loop = asyncio.get_running_loop()
+        try:
+            # Контекст вызывающей задачи (текущий интервал, поля лога) переходит в поток пула
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._executor, context.run, self._sign_in_worker, str(inn), data)
+        except RuntimeError as e:
+            logger.error(f"Ошибка подписания для ИНН {inn}: {e}")
+            return None
+
+    async def sign_many(
+        self, inn: str, payloads: Union[Iterable, AsyncIterable], chunk_size: int = 64
+    ) -> List[SignResult]:
+        """Подписывает набор данных сертификатом организации inn, сохраняя порядок.
+
+        payloads — список или асинхронный итератор; каждая часть из chunk_size элементов
+        подписывается одним вызовом в пуле с одним CPSigner, между частями пул свободен
+        для других организаций
+        """
+        loop = asyncio.get_running_loop()
+        results: List[SignResult] = []
+        async for chunk in _chunks(payloads, max(1, chunk_size)):
+            context = contextvars.copy_context()
+            results.extend(await loop.run_in_executor(
+                self._executor, context.run, self._sign_many_in_worker, str(inn), chunk
+            ))
+        return results
+
+    async def verify(self, signature, data) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._verify_in_worker, signature, data)
+
+    def close(self):
+        """Дожидается текущих подписей и закрывает хранилища всех потоков"""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            signers, self._signers = self._signers, []
+        for signer in signers:
+            try:
+                signer.close()
+            except Exception as e:
+                logger.error(f"Ошибка закрытия хранилища: {e}")
@@ -0,0 +1,200 @@
+# src/batch_refresh.py
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+from . import consts as c
+from . import metrics
+from .async_signer import AsyncSigner
+from .circuit_breaker import CircuitBreakers
+from .errors import HTTPError
+from .http_session import SessionManager
+from .logger_setup import log_context, logger, new_refresh_id
+from .organizations import OrganizationRegistry
+from .rate_limiter import RateLimiter
+from .retry import RetryPolicy, deadline_scope
+from .send_request import AsyncAPIHandler, encode_challenge, fetch_auth_token
+from .signer_backend import payload_format_of
+from .single_flight import SingleFlight
+from .timeouts import PHASE_KEY, PHASE_SIGN, PHASE_TOKEN, PhaseTimeouts, PhaseTimer
+from .token_cache import TokenCache
+from .tracing import tracer
+
+
+def load_organizations(path=None) -> Dict[str, str]:
+    """Читает файл организаций и возвращает {ИНН: название} без повторов и с проверенными ИНН"""
+    return OrganizationRegistry.from_file(path).as_dict()
+
+
+@dataclass
+class RefreshResult:
+    """Результат обновления токена одной организации"""
+    inn: str
+    token: Optional[dict] = None
+    error: Optional[str] = None
+    cause: Optional[str] = None  # метка причины сбоя для метрик: key_timeout, token_http_429, sign_failed...
+    timings: Dict[str, float] = field(default_factory=dict)  # секунды по этапам: key, sign, token
+
+    @property
+    def ok(self) -> bool:
+        return self.token is not None
+
+
+class BatchRefresher:
+    """Параллельное обновление токенов (ключ → подпись → токен) для набора организаций
+
+    signer: AsyncSigner — подпись идёт в пуле потоков, не блокируя запросы других организаций
+    """
+
+    def __init__(
+        self,
+        signer: AsyncSigner,
+        key_url: str = c.URL_KEY,
+        concurrency: Optional[int] = None,
+        sessions: Optional[SessionManager] = None,
+        cache: Optional[TokenCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breakers: Optional[CircuitBreakers] = None,
+        timeouts: Optional[PhaseTimeouts] = None,
+        token_url: Optional[str] = None,
+    ):
+        self.signer = signer
+        self.key_url = key_url
+        self.token_url = c.URL_AUTH_TOKEN if token_url is None else token_url
+        self.concurrency = max(1, c.MAX_CONCURRENCY if concurrency is None else concurrency)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._flights = SingleFlight()
+        # Одна сессия на все организации: соединения и TLS переиспользуются
+        self.sessions = sessions or SessionManager()
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Лимитер общий для всех организаций, иначе параллельные обновления превысят квоты API
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.circuit_breakers = circuit_breakers or CircuitBreakers()
+        self.timeouts = timeouts or PhaseTimeouts()
+
+    async def close(self):
+        if self.cache is not None:
+            await self.cache.aflush()
+        await self.sessions.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def fetch_challenge(self) -> dict:
+        """Этап 1: получение challenge (uuid и data) от /auth/key"""
+        async with AsyncAPIHandler(
+            self.key_url,
+            session=self.sessions.session,
+            retry_policy=self.retry_policy,
+            rate_limiter=self.rate_limiter,
+            circuit_breakers=self.circuit_breakers,
+            timeout=self.timeouts.key.client_timeout(),
+        ) as handler:
+            return await handler._make_request()
+
+    async def sign_challenge(self, inn: str, challenge: dict) -> Optional[str]:
+        """Этап 2: base64 от data в формате подписанта и подпись сертификатом организации"""
+        data = encode_challenge(challenge["data"], payload_format_of(self.signer))
+        # Поток пула прервать нельзя: по таймауту перестаём ждать, COM-вызов доработает сам
+        return await asyncio.wait_for(self.signer.sign(inn, data), self.timeouts.sign)
+
+    async def exchange_token(self, inn: str, challenge: dict, signature: str) -> RefreshResult:
+        """Этап 3: обмен подписанного challenge на токен"""
+        with log_context(uuid=challenge["uuid"]):
+            token = await fetch_auth_token(
+                challenge["uuid"],
+                signature,
+                session=self.sessions.session,
+                retry_policy=self.retry_policy,
+                rate_limiter=self.rate_limiter,
+                circuit_breakers=self.circuit_breakers,
+                timeout=self.timeouts.token.client_timeout(),
+                url=self.token_url,
+            )
+        if token is None or token.token is None:
+            return RefreshResult(inn, error="Токен не получен", cause="token_failed")
+        if self.cache is not None:
+            # Срок уже разобран из JWT при чтении ответа
+            self.cache.put(inn, token.token, token.expires_at)
+        return RefreshResult(inn, token=token.as_dict())
+
+    def failure(self, inn: str, error: BaseException, timer: PhaseTimer) -> RefreshResult:
+        """Результат с ошибкой этапа timer.current (с записью в лог)"""
+        phase = timer.current or "refresh"
+        if isinstance(error, HTTPError):
+            message = str(error.detail)
+            cause = f"{phase}_http_{error.status_code}"
+        elif isinstance(error, asyncio.TimeoutError):
+            message = f"Таймаут на этапе {timer.current}"
+            cause = f"{phase}_timeout"
+        else:
+            message = str(error)
+            cause = f"{phase}_error"
+        logger.error(f"Ошибка обновления токена для ИНН {inn}: {message}")
+        return RefreshResult(inn, error=message, cause=cause, timings=timer.timings)
+
+    async def _run_cycle(self, inn: str, timer: PhaseTimer) -> RefreshResult:
+        with timer.phase(PHASE_KEY):
+            challenge = await self.fetch_challenge()
+        with timer.phase(PHASE_SIGN):
+            signature = await self.sign_challenge(inn, challenge)
+        if not signature:
+            return RefreshResult(inn, error="Подпись не создана", cause="sign_failed")
+        with timer.phase(PHASE_TOKEN):
+            return await self.exchange_token(inn, challenge, signature)
+
+    async def refresh_one(self, inn: str) -> RefreshResult:
+        """Полный цикл получения токена для одной организации.
+        Всё обновление, включая повторы запросов, укладывается в timeouts.refresh.
+        Записи лога внутри цикла помечены refresh_id и ИНН"""
+        timer = PhaseTimer()
+        result = None
+        metrics.refresh_started()
+        try:
+            with log_context(refresh_id=new_refresh_id(), inn=inn), tracer.span("token.refresh", inn=inn) as span:
+                try:
+                    with deadline_scope(self.timeouts.refresh):
+                        async with asyncio.timeout(self.timeouts.refresh):
+                            result = await self._run_cycle(inn, timer)
+                    result.timings = timer.timings
+                except Exception as e:
+                    result = self.failure(inn, e, timer)
+                span.set_attribute("refresh.ok", result.ok)
+                if result.cause:
+                    span.set_attribute("refresh.cause", result.cause)
+        finally:
+            metrics.refresh_finished(result)
+        return result
+
+    async def _refresh_bounded(self, inn: str) -> RefreshResult:
+        async with self._semaphore:
+            return await self.refresh_one(inn)
+
+    async def refresh(self, inn: str) -> RefreshResult:
+        """refresh_one с учётом общего лимита concurrency.
+        Одновременные запросы по одному ИНН разделяют одно обновление"""
+        return await self._flights.do(inn, lambda: self._refresh_bounded(inn))
+
+    async def get_token(self, inn: str) -> Optional[str]:
+        """Токен из кэша, а при его отсутствии — после (общего) обновления"""
+        inn = str(inn)
+        if self.cache is not None:
+            token = self.cache.get(inn)
+            if token is not None:
+                return token
+        result = await self.refresh(inn)
+        return result.token.get("token") if result.ok else None
+
+    async def refresh_all(self, inns: Iterable[str]) -> Dict[str, RefreshResult]:
+        """Обновляет токены всех организаций параллельно, не более concurrency одновременно"""
+        unique_inns = list(dict.fromkeys(str(inn) for inn in inns))
+        results = await asyncio.gather(*(self.refresh(inn) for inn in unique_inns))
+        if self.cache is not None:
+            await self.cache.aflush()  # одна запись кэша на весь пакет
+        return {result.inn: result for result in results}
@@ -0,0 +1,110 @@
+# src/broker.py
+
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel
+
+from . import metrics
+from .async_signer import AsyncSigner
+from .batch_refresh import BatchRefresher, load_organizations
+from .leases import LeasedRefresher, create_lease_backend
+from .scheduler import RefreshScheduler
+from .token_cache import TokenCache, create_token_cache
+
+
+class RefreshRequest(BaseModel):
+    """Список ИНН для обновления; пустой — все организации"""
+    inns: Optional[List[str]] = None
+
+
+def create_app(
+    refresher: Optional[BatchRefresher] = None,
+    cache: Optional[TokenCache] = None,
+    organizations: Optional[Dict[str, str]] = None,
+    schedule: bool = False,
+) -> FastAPI:
+    """Брокер токенов: внутренние сервисы берут токены здесь, а не подписывают сами.
+
+    Без аргументов всё собирается из конфигурации при старте приложения:
+    uvicorn src.broker:create_app --factory
+    schedule: фоновое упреждающее обновление токенов всех организаций
+    """
+    state = {"refresher": refresher, "cache": cache, "organizations": organizations}
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        signer = None
+        if state["cache"] is None:
+            existing = state["refresher"].cache if state["refresher"] else None
+            state["cache"] = existing if existing is not None else create_token_cache()
+        if state["organizations"] is None:
+            state["organizations"] = load_organizations()
+        owns_refresher = state["refresher"] is None
+        if owns_refresher:
+            signer = AsyncSigner()
+            state["refresher"] = BatchRefresher(signer)
+            # Несколько экземпляров брокера: организацию обновляет владелец аренды её ИНН
+            lease_backend = create_lease_backend()
+            if lease_backend is not None:
+                state["refresher"] = LeasedRefresher(state["refresher"], lease_backend)
+        state["refresher"].cache = state["cache"]
+        metrics.track_cache(state["cache"])
+
+        scheduler = RefreshScheduler(state["refresher"], state["cache"])
+        if schedule:
+            await scheduler.start(state["organizations"])
+        try:
+            yield
+        finally:
+            await scheduler.stop()
+            if owns_refresher:
+                await state["refresher"].close()
+                signer.close()
+
+    app = FastAPI(title="Token broker", lifespan=lifespan)
+
+    def known(inn: str):
+        if state["organizations"] and inn not in state["organizations"]:
+            raise HTTPException(status_code=404, detail=f"Организация с ИНН {inn} не найдена")
+
+    @app.get("/token/{inn}")
+    async def get_token(inn: str):
+        """Действующий токен из кэша; если его нет — одно общее обновление на все запросы"""
+        known(inn)
+        entry = state["cache"].get_entry(inn)
+        if entry is None:
+            result = await state["refresher"].refresh(inn)
+            entry = state["cache"].peek(inn)
+            if not result.ok or entry is None:
+                raise HTTPException(status_code=502, detail=result.error or "Токен не получен")
+        return {"inn": inn, "token": entry.token, "expires_at": entry.expires_at}
+
+    @app.post("/refresh")
+    async def refresh(request: Optional[RefreshRequest] = None):
+        """Принудительное обновление токенов списка организаций (или всех)"""
+        inns = request.inns if request and request.inns else list(state["organizations"] or ())
+        for inn in inns:
+            known(inn)
+        results = await state["refresher"].refresh_all(inns)
+        return {
+            inn: {"ok": result.ok, "error": result.error, "timings": result.timings}
+            for inn, result in results.items()
+        }
+
+    @app.get("/health")
+    async def health():
+        refresher = state["refresher"]
+        return {
+            "status": "ok",
+            "organizations": len(state["organizations"] or ()),
+            "cache": state["cache"].stats,
+            "circuit_breakers": refresher.circuit_breakers.states() if refresher else {},
+        }
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+    return app
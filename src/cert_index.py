@@ -0,0 +1,110 @@
+# src/cert_index.py
+
+import re
+import time
+from typing import Dict, List, Optional
+
+# ИНН в имени субъекта CryptoPro: "ИНН=...", "INN=...", "ИНН ЮЛ=...", "INNLE=..." или OID
+_INN_PATTERN = re.compile(
+    r'(?:ИНН(?:\s*ЮЛ)?|INN(?:LE)?|OID\.1\.2\.643\.3\.131\.1\.1|OID\.1\.2\.643\.100\.4)\s*=\s*"?(\d{10,12})',
+    re.IGNORECASE,
+)
+
+
+def parse_subject_inns(subject_name: str) -> List[str]:
+    """Все ИНН (физлица и юрлица), найденные в имени субъекта сертификата"""
+    return _INN_PATTERN.findall(subject_name or "")
+
+
+def _normalize(value) -> str:
+    return str(value).replace(" ", "").upper()
+
+
+def _rank(certificate, now: float) -> tuple:
+    """Порядок выбора среди сертификатов одного ИНН: действующий, с закрытым ключом,
+    с самым поздним сроком. После продления старый сертификат обычно остаётся в хранилище"""
+    try:
+        valid_from = float(certificate.ValidFromDate.timestamp())
+        valid_to = float(certificate.ValidToDate.timestamp())
+    except Exception:
+        valid_from, valid_to = now, float("-inf")  # срок неизвестен — в последнюю очередь
+    try:
+        has_key = bool(certificate.HasPrivateKey())
+    except Exception:
+        has_key = False
+    return valid_from <= now < valid_to, has_key, valid_to
+
+
+class CertificateIndex:
+    """Индекс хранилища CAdESCOM.Store: одно перечисление сертификатов вместо Find
+    на каждую организацию. Поиск по отпечатку, ИНН и серийному номеру — словарь."""
+
+    def __init__(self, store, check_interval: float = 60.0):
+        self.store = store
+        self.check_interval = check_interval
+        self._by_thumbprint: Dict[str, object] = {}
+        self._by_inn: Dict[str, object] = {}
+        self._by_serial: Dict[str, object] = {}
+        self._count: Optional[int] = None
+        self._checked_at = 0.0
+
+    def __len__(self):
+        return len(self._by_thumbprint)
+
+    def rebuild(self):
+        """Перечисляет хранилище один раз и строит все индексы"""
+        by_thumbprint, by_inn, by_serial = {}, {}, {}
+        ranks = {}
+        now = time.time()
+        certificates = self.store.Certificates
+        count = certificates.Count
+        for position in range(1, count + 1):  # коллекции COM нумеруются с 1
+            certificate = certificates.Item(position)
+            by_thumbprint[_normalize(certificate.Thumbprint)] = certificate
+            by_serial[_normalize(certificate.SerialNumber)] = certificate
+            rank = _rank(certificate, now)
+            for inn in parse_subject_inns(certificate.SubjectName):
+                if inn not in ranks or rank > ranks[inn]:
+                    by_inn[inn], ranks[inn] = certificate, rank
+        self._by_thumbprint, self._by_inn, self._by_serial = by_thumbprint, by_inn, by_serial
+        self._count = count
+        self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Следующий поиск перестроит индекс (например, после ошибки подписи сертификатом)"""
+        self._count = None
+
+    def _is_stale(self) -> bool:
+        return self._count is None or self.store.Certificates.Count != self._count
+
+    def _fingerprint(self) -> frozenset:
+        """Отпечатки всех сертификатов: продлённый сертификат меняет набор, но не Count"""
+        certificates = self.store.Certificates
+        return frozenset(
+            _normalize(certificates.Item(position).Thumbprint) for position in range(1, certificates.Count + 1)
+        )
+
+    def _ensure_fresh(self):
+        # Полная сверка отпечатков — не чаще check_interval; между сверками индекс считается актуальным
+        if self._count is None or time.monotonic() - self._checked_at >= self.check_interval:
+            if self._count is None or self._fingerprint() != self._by_thumbprint.keys():
+                self.rebuild()
+            self._checked_at = time.monotonic()
+
+    def _lookup(self, table: str, key: str):
+        self._ensure_fresh()
+        certificate = getattr(self, table).get(key)
+        if certificate is None and self._is_stale():
+            # Сертификат мог появиться после последней проверки
+            self.rebuild()
+            certificate = getattr(self, table).get(key)
+        return certificate
+
+    def by_thumbprint(self, thumbprint: str):
+        return self._lookup("_by_thumbprint", _normalize(thumbprint))
+
+    def by_inn(self, inn: str):
+        return self._lookup("_by_inn", str(inn).strip())
+
+    def by_serial(self, serial_number: str):
+        return self._lookup("_by_serial", _normalize(serial_number))
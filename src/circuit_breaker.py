@@ -0,0 +1,122 @@
+# src/circuit_breaker.py
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from aiohttp import ClientError
+
+from . import consts as c
+from .errors import HTTPError
+from .logger_setup import logger
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Хост считается недоступным, запрос отклонён без обращения к сети"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Circuit open for {host}")
+        self.host = host
+        self.retry_after = retry_after
+
+
+def is_host_failure(error: Exception) -> bool:
+    """Сбой хоста: сеть, таймаут или 5xx. Ответы 4xx означают, что хост жив"""
+    if isinstance(error, HTTPError):
+        return error.status_code >= 500
+    return isinstance(error, (ClientError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """Circuit breaker одного хоста: closed → open после failure_threshold сбоев подряд,
+    через reset_timeout — half_open с ограниченным числом пробных запросов"""
+
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+        half_open_max_calls: Optional[int] = None,
+    ):
+        self.host = host
+        self.failure_threshold = c.BREAKER_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold
+        self.reset_timeout = c.BREAKER_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self.half_open_max_calls = c.BREAKER_HALF_OPEN_CALLS if half_open_max_calls is None else half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    def before_call(self):
+        """Пропускает запрос или бросает CircuitOpenError"""
+        if self.state == OPEN:
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.host, remaining)
+            self.state = HALF_OPEN
+            self._probes = 0
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                raise CircuitOpenError(self.host, self.reset_timeout)
+            self._probes += 1
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.error(f"Circuit breaker открыт для {self.host}")
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    async def call(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        self.before_call()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            if self.state == HALF_OPEN:
+                self._probes -= 1  # отменённая проба не должна занимать слот
+            raise
+        except Exception as error:
+            if is_host_failure(error):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+
+class CircuitBreakers:
+    """Реестр circuit breaker'ов по хостам"""
+
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+        half_open_max_calls: Optional[int] = None,
+    ):
+        self.failure_threshold = c.BREAKER_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold
+        self.reset_timeout = c.BREAKER_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self.half_open_max_calls = c.BREAKER_HALF_OPEN_CALLS if half_open_max_calls is None else half_open_max_calls
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def for_url(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).hostname or url
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(
+                host, self.failure_threshold, self.reset_timeout, self.half_open_max_calls
+            )
+        return breaker
+
+    def states(self) -> Dict[str, str]:
+        return {host: breaker.state for host, breaker in self._breakers.items()}
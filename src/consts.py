@@ -1,18 +1,230 @@
-from dotenv import load_dotenv
 import os
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Optional
 
-load_dotenv()
+# Адреса True API (константы, окружение не читается)
+BASE_URL = "https://elk.prod.markirovka.ismet.kz/api/v3/true-api";
+GET_KEY = "/auth/key"
+URL_TOKEN = BASE_URL + "auth/token";
+URL_KEY = BASE_URL + GET_KEY
 
-#CryptoPro
-Serial_number = os.getenv("")
-The_print=os.getenv("The_print")
-Key_ID=os.getenv("Key_ID")
-number_certificate=os.getenv("Serial_number_certificate")
-Path_to_certificates =os.getenv("Path_to_certificates")
-certificates_path=os.getenv("User_certificates_path")
-Cryptopro_path =os.getenv("Cryptopro_path")
-launch_shortcut=os.getenv("launch_shortcut")
 
-BASE_URL = "https://elk.prod.markirovka.ismet.kz/api/v3/true-api"; 
-GET_KEY = "/auth/key"
-URL_TOKEN = BASE_URL + "auth/token";
\ No newline at end of file
+def _str(name: str, default=None) -> Optional[str]:
+    return os.getenv(name, default)
+
+
+def _int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Настройки из окружения и .env. Читаются и проверяются один раз — при первом обращении
+    к c.<ИМЯ> или get_settings(), а не при импорте модуля"""
+
+    #CryptoPro
+    Serial_number: Optional[str]
+    The_print: Optional[str]
+    Key_ID: Optional[str]
+    number_certificate: Optional[str]
+    Path_to_certificates: Optional[str]
+    certificates_path: Optional[str]
+    Cryptopro_path: Optional[str]
+    launch_shortcut: Optional[str]
+
+    URL_AUTH_TOKEN: str  # обмен подписи на токен
+
+    #Пакетное обновление токенов
+    ORGANIZATIONS_PATH: str
+    ORGANIZATIONS_RELOAD_INTERVAL: float  # как часто проверять изменения файла организаций
+    MAX_CONCURRENCY: int
+    REFRESH_WORKERS: int  # процессов обновления; 1 — без разделения на процессы
+
+    #Пул HTTP-соединений
+    HTTP_LIMIT: int
+    HTTP_LIMIT_PER_HOST: int
+    HTTP_KEEPALIVE_TIMEOUT: float
+    HTTP_DNS_CACHE_TTL: int
+
+    #Кэш токенов
+    TOKEN_CACHE_PATH: str
+    TOKEN_DEFAULT_TTL: int  # токен True API живёт 10 часов
+    TOKEN_EXPIRY_SKEW: int
+    TOKEN_CACHE_FLUSH_DELAY: float  # записи в хранилище собираются и сбрасываются пачкой
+    REDIS_URL: Optional[str]
+
+    #Координация узлов: аренда ИНН, чтобы каждую организацию обновлял один узел
+    LEASE_BACKEND: str  # file | redis | пусто — без координации
+    LEASE_DIR: str
+    LEASE_TTL: float  # аренда истекает сама, если узел упал
+
+    #Фоновое обновление токенов
+    REFRESH_LEAD_TIME: float  # за сколько секунд до истечения обновлять
+    REFRESH_JITTER: float
+    REFRESH_RETRY_DELAY: float
+
+    #Подпись в отдельных потоках
+    SIGNER_WORKERS: int
+    SIGNER_BACKEND: str  # cryptopro | local
+    LOCAL_CERTIFICATES_DIR: str
+
+    #Повторные попытки запросов к True API
+    RETRY_MAX_ATTEMPTS: int
+    RETRY_BASE_DELAY: float
+    RETRY_MAX_DELAY: float
+    REFRESH_DEADLINE: float  # общий лимит времени на одно обновление
+
+    #Ограничение частоты запросов к True API (запросов в секунду)
+    RATE_LIMIT_DEFAULT: float
+    RATE_LIMIT_KEY: float
+    RATE_LIMIT_TOKEN: float
+
+    #Circuit breaker для хостов True API
+    BREAKER_FAILURE_THRESHOLD: int
+    BREAKER_RESET_TIMEOUT: float
+    BREAKER_HALF_OPEN_CALLS: int
+
+    #Таймауты этапов обновления токена, секунды
+    TIMEOUT_CONNECT: float
+    TIMEOUT_READ: float
+    TIMEOUT_KEY_TOTAL: float
+    TIMEOUT_TOKEN_TOTAL: float
+    TIMEOUT_SIGN: float
+
+    #Конвейерный режим пакетного обновления
+    PIPELINE_PREFETCH: int  # сколько challenge держать наготове
+
+    #Метрики Prometheus
+    METRICS_HOST: str
+    METRICS_PORT: int  # 0 — отдельный сервер /metrics не запускается
+
+    #Логирование
+    LOG_FILE_PATH: str
+    LOG_LEVEL: str
+    LOG_FORMAT: str  # json или text
+    LOG_MAX_BYTES: int  # ротация по размеру
+    LOG_BACKUP_COUNT: int
+    LOG_ROTATE_WHEN: str  # ротация по времени, например "midnight"
+
+    #Трассировка: файл JSON Lines для интервалов; пусто — трассировка выключена
+    TRACE_EXPORT_PATH: str
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        rate_limit_default = _float("RATE_LIMIT_DEFAULT", 10)
+        return cls(
+            Serial_number=_str("Serial_number"),
+            The_print=_str("The_print"),
+            Key_ID=_str("Key_ID"),
+            number_certificate=_str("Serial_number_certificate"),
+            Path_to_certificates=_str("Path_to_certificates"),
+            certificates_path=_str("User_certificates_path"),
+            Cryptopro_path=_str("Cryptopro_path"),
+            launch_shortcut=_str("launch_shortcut"),
+            URL_AUTH_TOKEN=_str("URL_AUTH_TOKEN", "https://api.mdlp.crpt.ru/api/v1/token"),
+            ORGANIZATIONS_PATH=_str("ORGANIZATIONS_PATH", "organization.json"),
+            ORGANIZATIONS_RELOAD_INTERVAL=_float("ORGANIZATIONS_RELOAD_INTERVAL", 30),
+            MAX_CONCURRENCY=_int("MAX_CONCURRENCY", 10),
+            REFRESH_WORKERS=_int("REFRESH_WORKERS", 1),
+            HTTP_LIMIT=_int("HTTP_LIMIT", 100),
+            HTTP_LIMIT_PER_HOST=_int("HTTP_LIMIT_PER_HOST", 20),
+            HTTP_KEEPALIVE_TIMEOUT=_float("HTTP_KEEPALIVE_TIMEOUT", 30),
+            HTTP_DNS_CACHE_TTL=_int("HTTP_DNS_CACHE_TTL", 300),
+            TOKEN_CACHE_PATH=_str("TOKEN_CACHE_PATH", "token_cache.json"),
+            TOKEN_DEFAULT_TTL=_int("TOKEN_DEFAULT_TTL", 36000),
+            TOKEN_EXPIRY_SKEW=_int("TOKEN_EXPIRY_SKEW", 60),
+            TOKEN_CACHE_FLUSH_DELAY=_float("TOKEN_CACHE_FLUSH_DELAY", 1),
+            REDIS_URL=_str("REDIS_URL"),
+            LEASE_BACKEND=_str("LEASE_BACKEND", "").lower(),
+            LEASE_DIR=_str("LEASE_DIR", "leases"),
+            LEASE_TTL=_float("LEASE_TTL", 120),
+            REFRESH_LEAD_TIME=_float("REFRESH_LEAD_TIME", 600),
+            REFRESH_JITTER=_float("REFRESH_JITTER", 120),
+            REFRESH_RETRY_DELAY=_float("REFRESH_RETRY_DELAY", 30),
+            SIGNER_WORKERS=_int("SIGNER_WORKERS", 4),
+            SIGNER_BACKEND=_str("SIGNER_BACKEND", "cryptopro").lower(),
+            LOCAL_CERTIFICATES_DIR=_str("LOCAL_CERTIFICATES_DIR", "certificates"),
+            RETRY_MAX_ATTEMPTS=_int("RETRY_MAX_ATTEMPTS", 4),
+            RETRY_BASE_DELAY=_float("RETRY_BASE_DELAY", 0.5),
+            RETRY_MAX_DELAY=_float("RETRY_MAX_DELAY", 10),
+            REFRESH_DEADLINE=_float("REFRESH_DEADLINE", 60),
+            RATE_LIMIT_DEFAULT=rate_limit_default,
+            RATE_LIMIT_KEY=_float("RATE_LIMIT_KEY", rate_limit_default),
+            RATE_LIMIT_TOKEN=_float("RATE_LIMIT_TOKEN", rate_limit_default),
+            BREAKER_FAILURE_THRESHOLD=_int("BREAKER_FAILURE_THRESHOLD", 5),
+            BREAKER_RESET_TIMEOUT=_float("BREAKER_RESET_TIMEOUT", 30),
+            BREAKER_HALF_OPEN_CALLS=_int("BREAKER_HALF_OPEN_CALLS", 1),
+            TIMEOUT_CONNECT=_float("TIMEOUT_CONNECT", 5),
+            TIMEOUT_READ=_float("TIMEOUT_READ", 10),
+            TIMEOUT_KEY_TOTAL=_float("TIMEOUT_KEY_TOTAL", 15),
+            TIMEOUT_TOKEN_TOTAL=_float("TIMEOUT_TOKEN_TOTAL", 15),
+            TIMEOUT_SIGN=_float("TIMEOUT_SIGN", 10),
+            PIPELINE_PREFETCH=_int("PIPELINE_PREFETCH", 10),
+            METRICS_HOST=_str("METRICS_HOST", "0.0.0.0"),
+            METRICS_PORT=_int("METRICS_PORT", 0),
+            LOG_FILE_PATH=_str("LOG_FILE_PATH", "app_errors.log"),
+            LOG_LEVEL=_str("LOG_LEVEL", "ERROR").upper(),
+            LOG_FORMAT=_str("LOG_FORMAT", "json").lower(),
+            LOG_MAX_BYTES=_int("LOG_MAX_BYTES", 10 * 1024 * 1024),
+            LOG_BACKUP_COUNT=_int("LOG_BACKUP_COUNT", 5),
+            LOG_ROTATE_WHEN=_str("LOG_ROTATE_WHEN", ""),
+            TRACE_EXPORT_PATH=_str("TRACE_EXPORT_PATH", ""),
+        )
+
+    def validate(self):
+        """Проверка значений; все ошибки сообщаются одним исключением"""
+        errors = []
+        for name in ("MAX_CONCURRENCY", "REFRESH_WORKERS", "HTTP_LIMIT", "HTTP_LIMIT_PER_HOST", "SIGNER_WORKERS",
+                     "RETRY_MAX_ATTEMPTS", "BREAKER_FAILURE_THRESHOLD", "BREAKER_HALF_OPEN_CALLS",
+                     "PIPELINE_PREFETCH", "RATE_LIMIT_DEFAULT", "RATE_LIMIT_KEY", "RATE_LIMIT_TOKEN",
+                     "TIMEOUT_KEY_TOTAL", "TIMEOUT_TOKEN_TOTAL", "TIMEOUT_SIGN", "REFRESH_DEADLINE",
+                     "ORGANIZATIONS_RELOAD_INTERVAL", "LEASE_TTL"):
+            if getattr(self, name) <= 0:
+                errors.append(f"{name} должен быть больше нуля")
+        for field_ in fields(self):
+            value = getattr(self, field_.name)
+            if isinstance(value, (int, float)) and value < 0:
+                errors.append(f"{field_.name} не может быть отрицательным")
+        if self.SIGNER_BACKEND not in ("cryptopro", "local"):
+            errors.append(f"SIGNER_BACKEND: неизвестный бэкенд {self.SIGNER_BACKEND}")
+        if self.LEASE_BACKEND not in ("", "file", "redis"):
+            errors.append(f"LEASE_BACKEND: неизвестный бэкенд {self.LEASE_BACKEND}")
+        if self.LOG_FORMAT not in ("json", "text"):
+            errors.append(f"LOG_FORMAT: ожидается json или text, получено {self.LOG_FORMAT}")
+        if self.LOG_LEVEL not in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+            errors.append(f"LOG_LEVEL: неизвестный уровень {self.LOG_LEVEL}")
+        if errors:
+            raise ValueError("Некорректная конфигурация: " + "; ".join(dict.fromkeys(errors)))
+        return self
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Загружает .env (без перезаписи окружения), читает и проверяет настройки — один раз"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    try:
+        return Settings.from_env().validate()
+    except ValueError as e:
+        if str(e).startswith("Некорректная конфигурация"):
+            raise
+        raise ValueError(f"Некорректная конфигурация: {e}") from e
+
+
+def reload_settings() -> Settings:
+    """Перечитывает окружение (например, в тестах после изменения переменных)"""
+    get_settings.cache_clear()
+    return get_settings()
+
+
+def __getattr__(name: str):
+    # c.MAX_CONCURRENCY и т. п.: значение из настроек, загружаемых при первом обращении
+    if name in Settings.__dataclass_fields__:
+        return getattr(get_settings(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,13 @@
+# src/errors.py
+
+from typing import Optional
+
+# Базовый класс fastapi.HTTPException: для проверок isinstance FastAPI загружать не нужно
+from starlette.exceptions import HTTPException as HTTPError
+
+
+def http_error(status_code: int, detail=None, headers: Optional[dict] = None) -> HTTPError:
+    """fastapi.HTTPException; FastAPI импортируется при первой ошибке, а не при импорте модуля"""
+    from fastapi import HTTPException
+
+    return HTTPException(status_code=status_code, detail=detail, headers=headers)
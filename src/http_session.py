@@ -0,0 +1,60 @@
+# src/http_session.py
+
+from typing import Optional
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from . import consts as c
+from .timeouts import HttpTimeouts
+from .tracing import create_trace_config
+
+
+class SessionManager:
+    """Общая сессия aiohttp с пулом keep-alive соединений и DNS-кэшем"""
+
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        limit_per_host: Optional[int] = None,
+        keepalive_timeout: Optional[float] = None,
+        dns_cache_ttl: Optional[int] = None,
+        timeout: Optional[ClientTimeout] = None,
+        trace_configs: Optional[list] = None,
+    ):
+        self.limit = c.HTTP_LIMIT if limit is None else limit
+        self.limit_per_host = c.HTTP_LIMIT_PER_HOST if limit_per_host is None else limit_per_host
+        self.keepalive_timeout = c.HTTP_KEEPALIVE_TIMEOUT if keepalive_timeout is None else keepalive_timeout
+        self.dns_cache_ttl = c.HTTP_DNS_CACHE_TTL if dns_cache_ttl is None else dns_cache_ttl
+        # Таймаут по умолчанию для запросов без собственного таймаута этапа
+        self.timeout = timeout or HttpTimeouts().client_timeout()
+        # Время DNS, подключения и ожидания в пуле попадает в интервалы трассировки
+        self.trace_configs = trace_configs if trace_configs is not None else [create_trace_config()]
+        self._session: Optional[ClientSession] = None
+
+    def _create_connector(self) -> TCPConnector:
+        return TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+
+    @property
+    def session(self) -> ClientSession:
+        """Сессия создаётся при первом обращении и переиспользуется всеми запросами"""
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._create_connector(), timeout=self.timeout, trace_configs=self.trace_configs
+            )
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,263 @@
+# src/leases.py
+
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Protocol, runtime_checkable
+
+from . import consts as c
+from .batch_refresh import RefreshResult
+from .file_lock import file_lock
+from .logger_setup import logger
+
+
+def default_owner() -> str:
+    """Идентификатор узла: хост и процесс"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@runtime_checkable
+class LeaseBackend(Protocol):
+    """Аренда ключа одним владельцем на ttl секунд; по истечении срока ключ свободен,
+    поэтому упавший узел не держит организацию дольше ttl"""
+
+    def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        """Берёт аренду (или продлевает свою); False — ключ у другого владельца"""
+
+    def release(self, key: str, owner: str) -> bool:
+        """Освобождает аренду, только если она принадлежит owner"""
+
+    def owner(self, key: str) -> Optional[str]:
+        """Текущий владелец или None"""
+
+
+class FileLeaseBackend:
+    """Аренда через lock-файлы в общем каталоге: внутри — владелец и срок. Проверка и запись
+    идут под блокировкой ОС на соседний файл .guard, поэтому просроченную аренду при гонке
+    забирает только один узел. Каталог может быть на сетевом диске с блокировками (NFSv4, SMB)"""
+
+    def __init__(self, directory=None):
+        self.directory = Path(c.LEASE_DIR if directory is None else directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.lock"
+
+    def _guard(self, key: str):
+        return file_lock(self.directory / f"{key}.guard")
+
+    def _read(self, path: Path) -> Optional[dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            # Запись атомарная, битый файл — не чужая аренда
+            logger.error(f"Повреждён файл аренды {path}: {e}")
+            return None
+
+    def _write(self, path: Path, owner: str, ttl: float):
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"owner": owner, "expires_at": time.time() + ttl}, f)
+        os.replace(tmp_path, path)
+
+    def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        path = self._path(key)
+        with self._guard(key):
+            lease = self._read(path)
+            if lease is not None and lease.get("owner") != owner and lease.get("expires_at", 0) > time.time():
+                return False
+            self._write(path, owner, ttl)  # свободна, просрочена или своя — берём или продлеваем
+            return True
+
+    def release(self, key: str, owner: str) -> bool:
+        path = self._path(key)
+        with self._guard(key):
+            lease = self._read(path)
+            if lease is None or lease.get("owner") != owner:
+                return False
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                return False
+            return True
+
+    def owner(self, key: str) -> Optional[str]:
+        lease = self._read(self._path(key))
+        if lease is None or lease.get("expires_at", 0) <= time.time():
+            return None
+        return lease.get("owner")
+
+
+class RedisLeaseBackend:
+    """Аренда в Redis (и совместимых по протоколу серверах): SET NX PX; срок отслеживает сервер.
+    Продление и освобождение — Lua-скриптами, чтобы не затронуть чужую аренду"""
+
+    RENEW_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    )
+    RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "refresh_lease:", client=None):
+        self.url = c.REDIS_URL if url is None else url
+        self.prefix = prefix
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis  # необязательная зависимость
+
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        ttl_ms = int(ttl * 1000)
+        if self.client.set(self.prefix + key, owner, nx=True, px=ttl_ms):
+            return True
+        return bool(self.client.eval(self.RENEW_SCRIPT, 1, self.prefix + key, owner, ttl_ms))
+
+    def release(self, key: str, owner: str) -> bool:
+        return bool(self.client.eval(self.RELEASE_SCRIPT, 1, self.prefix + key, owner))
+
+    def owner(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+
+def create_lease_backend() -> Optional[LeaseBackend]:
+    """Бэкенд аренды по LEASE_BACKEND: file, redis или пусто — без координации узлов"""
+    name = c.LEASE_BACKEND
+    if not name:
+        return None
+    if name == "file":
+        return FileLeaseBackend(c.LEASE_DIR)
+    if name == "redis":
+        return RedisLeaseBackend(c.REDIS_URL)
+    raise ValueError(f"Неизвестный бэкенд аренды: {name}")
+
+
+class LeasedRefresher:
+    """Обёртка над BatchRefresher для нескольких узлов: организацию обновляет только узел,
+    взявший аренду её ИНН, остальные читают токен из общего кэша. Подключается в планировщике,
+    брокере и пакетном обновлении; конвейерный (refresh_pipelined) и многопроцессный
+    (ShardedRefresher) режимы аренду не берут и рассчитаны на один узел.
+
+    min_remaining: токен в общем кэше, которому осталось жить больше этого, не обновляется
+    (его уже обновил другой узел). По умолчанию REFRESH_LEAD_TIME + REFRESH_JITTER: планировщик
+    просыпается не раньше этого срока, и собственный старый токен свежим не считается
+    """
+
+    def __init__(
+        self,
+        refresher,
+        leases: LeaseBackend,
+        owner: Optional[str] = None,
+        ttl: Optional[float] = None,
+        min_remaining: Optional[float] = None,
+    ):
+        self.refresher = refresher
+        self.leases = leases
+        self.owner = owner or default_owner()
+        self.ttl = c.LEASE_TTL if ttl is None else ttl
+        self.min_remaining = (
+            c.REFRESH_LEAD_TIME + c.REFRESH_JITTER if min_remaining is None else min_remaining
+        )
+
+    @property
+    def cache(self):
+        return self.refresher.cache
+
+    @cache.setter
+    def cache(self, cache):
+        self.refresher.cache = cache
+
+    @property
+    def circuit_breakers(self):
+        return self.refresher.circuit_breakers
+
+    async def close(self):
+        await self.refresher.close()
+
+    def _fresh_from_cache(self, inn: str) -> Optional[RefreshResult]:
+        """Токен, который другой узел уже обновил, из общего кэша"""
+        if self.cache is None:
+            return None
+        entry = self.cache.reload(inn)
+        if entry is not None and entry.expires_at - time.time() > self.min_remaining:
+            return RefreshResult(inn, token={"token": entry.token})
+        return None
+
+    async def refresh(self, inn: str) -> RefreshResult:
+        inn = str(inn)
+        loop = asyncio.get_running_loop()
+        # Файловые операции и синхронный клиент Redis — вне event loop
+        acquired = await loop.run_in_executor(None, self.leases.acquire, inn, self.owner, self.ttl)
+        if not acquired:
+            cached = await loop.run_in_executor(None, self._fresh_from_cache, inn)
+            if cached is not None:
+                return cached
+            return RefreshResult(inn, error="Токен обновляет другой узел", cause="lease_busy")
+        # refresh() может ждать места в лимите concurrency дольше ttl — аренду продлеваем до освобождения
+        keeper = asyncio.create_task(self._keep_lease(inn))
+        try:
+            cached = await loop.run_in_executor(None, self._fresh_from_cache, inn)
+            if cached is not None:
+                return cached
+            result = await self.refresher.refresh(inn)
+            if self.cache is not None:
+                # Токен должен оказаться в общем кэше раньше, чем другой узел получит аренду
+                await self.cache.aflush()
+            return result
+        finally:
+            keeper.cancel()
+            try:
+                await loop.run_in_executor(None, self.leases.release, inn, self.owner)
+            except Exception as e:
+                # Аренда истечёт сама через ttl
+                logger.error(f"Не удалось освободить аренду ИНН {inn}: {e}")
+
+    async def _keep_lease(self, inn: str):
+        """Продлевает аренду каждую треть ttl, пока задачу не отменят"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                renewed = await loop.run_in_executor(None, self.leases.acquire, inn, self.owner, self.ttl)
+            except Exception as e:
+                logger.error(f"Не удалось продлить аренду ИНН {inn}: {e}")
+                continue
+            if not renewed:
+                logger.error(f"Аренда ИНН {inn} перешла другому узлу во время обновления")
+                return
+
+    async def get_token(self, inn: str) -> Optional[str]:
+        """Токен из кэша, а при его отсутствии — после обновления (своего или другого узла)"""
+        inn = str(inn)
+        if self.cache is not None:
+            token = self.cache.get(inn)
+            if token is not None:
+                return token
+        result = await self.refresh(inn)
+        return result.token.get("token") if result.ok else None
+
+    async def refresh_all(self, inns: Iterable[str]) -> Dict[str, RefreshResult]:
+        """Как BatchRefresher.refresh_all, но каждую организацию — под арендой её ИНН"""
+        unique_inns = list(dict.fromkeys(str(inn) for inn in inns))
+        results = await asyncio.gather(*(self.refresh(inn) for inn in unique_inns))
+        return {result.inn: result for result in results}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,195 @@
+# src/local_signer.py
+
+import base64
+import datetime
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import pkcs7
+from cryptography.x509.oid import NameOID
+
+from .logger_setup import logger
+from .signer_backend import PAYLOAD_BYTES, SignerBackend
+from .tracing import tracer
+
+# OID ИНН физического лица и ИНН юридического лица в сертификатах ФНС/УЦ
+INN_OID = x509.ObjectIdentifier("1.2.643.3.131.1.1")
+INNLE_OID = x509.ObjectIdentifier("1.2.643.100.4")
+
+
+def certificate_inn(certificate: x509.Certificate) -> Optional[str]:
+    """ИНН из имени субъекта сертификата"""
+    for oid in (INN_OID, INNLE_OID):
+        attributes = certificate.subject.get_attributes_for_oid(oid)
+        if attributes:
+            return str(attributes[0].value)
+    return None
+
+
+def certificate_thumbprint(certificate: x509.Certificate) -> str:
+    """Отпечаток в формате CryptoPro: SHA-1 от DER, верхний регистр"""
+    return certificate.fingerprint(hashes.SHA1()).hex().upper()
+
+
+def create_test_certificate(inn: str, directory, common_name: Optional[str] = None) -> Tuple[Path, Path]:
+    """Создаёт самоподписанный сертификат с ИНН и ключ к нему (для тестов и нагрузочных прогонов)"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    key = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([
+        x509.NameAttribute(NameOID.COMMON_NAME, common_name or f"Test {inn}"),
+        x509.NameAttribute(INN_OID, str(inn)),
+    ])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(subject)
+        .issuer_name(subject)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=365))
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = directory / f"{inn}.crt"
+    key_path = directory / f"{inn}.key"
+    cert_path.write_bytes(certificate.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+    return cert_path, key_path
+
+
+class LocalCMSSigner(SignerBackend):
+    """Подписант на локальных файлах ключей: открепленная подпись CMS/PKCS#7 через cryptography.
+
+    Хранилище — каталог с парами <имя>.crt + <имя>.key (PEM). Работает без CryptoPro и Windows,
+    поэтому подходит для нагрузочных прогонов на Linux. ГОСТ-алгоритмы не поддерживаются.
+    """
+
+    payload_format = PAYLOAD_BYTES  # подписываются байты, строку пришлось бы кодировать обратно
+
+    def __init__(self, certificates_dir=None, password: Optional[bytes] = None):
+        self.certificates_dir = Path(certificates_dir) if certificates_dir else None
+        self.password = password
+        self.store: Optional[Dict[str, tuple]] = None
+        self._by_inn: Dict[str, tuple] = {}
+        self.certificate = None
+        self._key = None
+
+    def initialize_store(self, store_location=3):
+        """
+        Загружает пары сертификат/ключ из каталога; store_location оставлен для совместимости
+        """
+        try:
+            if not self.certificates_dir or not self.certificates_dir.is_dir():
+                raise Exception(f"Каталог сертификатов не найден: {self.certificates_dir}")
+            self.store, self._by_inn = {}, {}
+            for cert_path in sorted(self.certificates_dir.glob("*.crt")):
+                key_path = cert_path.with_suffix(".key")
+                if not key_path.exists():
+                    continue
+                certificate = x509.load_pem_x509_certificate(cert_path.read_bytes())
+                key = serialization.load_pem_private_key(key_path.read_bytes(), password=self.password)
+                self.store[certificate_thumbprint(certificate)] = (certificate, key)
+                inn = certificate_inn(certificate)
+                if inn:
+                    self._by_inn.setdefault(inn, (certificate, key))
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка инициализации хранилища: {e}")
+            self.store = None
+            return False
+
+    def _select(self, pair) -> bool:
+        if self.store is None:
+            raise Exception("Хранилище не инициализировано")
+        if pair is None:
+            raise Exception("Сертификат не найден")
+        self.certificate, self._key = pair
+        return True
+
+    def select_certificate(self, thumbprint=None):
+        try:
+            if self.store and thumbprint:
+                return self._select(self.store.get(thumbprint.replace(" ", "").upper()))
+            return self._select(next(iter(self.store.values()), None) if self.store else None)
+        except Exception as e:
+            logger.error(f"Ошибка выбора сертификата: {e}")
+            return False
+
+    def select_certificate_by_inn(self, inn):
+        try:
+            return self._select(self._by_inn.get(str(inn)))
+        except Exception as e:
+            logger.error(f"Ошибка выбора сертификата для ИНН {inn}: {e}")
+            return False
+
+    def sign_data(self, data_to_sign, detached=True):
+        """
+        Подписание данных; возвращает подпись DER в base64, как CryptoPro
+        """
+        with tracer.span("local.sign_data", **{"data.length": len(data_to_sign or "")}):
+            return self._sign_data(data_to_sign, detached)
+
+    def _sign_data(self, data_to_sign, detached=True):
+        try:
+            if not self.certificate:
+                raise Exception("Сертификат не выбран")
+            if isinstance(data_to_sign, str):
+                data_to_sign = data_to_sign.encode("utf-8")
+            elif not isinstance(data_to_sign, bytes):
+                data_to_sign = bytes(data_to_sign)  # memoryview/bytearray: cryptography ждёт bytes
+
+            options = [pkcs7.PKCS7Options.Binary]
+            if detached:
+                options.append(pkcs7.PKCS7Options.DetachedSignature)
+            signature = (
+                pkcs7.PKCS7SignatureBuilder()
+                .set_data(bytes(data_to_sign))
+                .add_signer(self.certificate, self._key, hashes.SHA256())
+                .sign(serialization.Encoding.DER, options)
+            )
+            return base64.b64encode(signature).decode("ascii")
+        except Exception as e:
+            logger.error(f"Ошибка подписания: {e}")
+            return None
+
+    def verify_signature(self, signature, original_data=None):
+        """
+        Проверка подписи через openssl cms (цепочка доверия не проверяется)
+        """
+        openssl = shutil.which("openssl")
+        if not openssl:
+            logger.error("openssl не найден, проверка подписи невозможна")
+            return False
+        if isinstance(original_data, str):
+            original_data = original_data.encode("utf-8")
+        with tempfile.TemporaryDirectory() as tmp:
+            sig_path = Path(tmp) / "signature.der"
+            sig_path.write_bytes(base64.b64decode(signature))
+            command = [openssl, "cms", "-verify", "-binary", "-noverify", "-inform", "DER", "-in", str(sig_path),
+                       "-out", str(Path(tmp) / "content.bin")]
+            if original_data is not None:
+                content_path = Path(tmp) / "content.in"
+                content_path.write_bytes(original_data)
+                command += ["-content", str(content_path)]
+            result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            logger.error(f"Подпись недействительна: {result.stderr.decode(errors='replace').strip()}")
+            return False
+        return True
+
+    def close(self):
+        self.store = None
+        self._by_inn = {}
+        self.certificate = None
+        self._key = None
@@ -1,62 +1,190 @@
 # logger_setup.py
 
-import logging
-import os
 import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Optional
 
-# Путь к файлу логов во временной директории (в корне проекта или в temp)
-LOG_FILE_PATH = Path("app_errors.log")
+from . import consts as c
 
-# Формат логов
+# Формат логов (текстовый режим)
 LOG_FORMAT = "%(asctime)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-# Создаём логгер
-logger = logging.getLogger("AppLogger")
-logger.setLevel(logging.ERROR)  # Логируем только ошибки и критические события
+# Идентификаторы корреляции текущего обновления; contextvars наследуются задачами asyncio
+CORRELATION_FIELDS = ("refresh_id", "inn", "uuid")
+_correlation = {name: contextvars.ContextVar(name, default=None) for name in CORRELATION_FIELDS}
 
-# Предотвращаем дублирование логов, если обработчики уже есть
-if not logger.handlers:
-    # Обработчик записи в файл
-    file_handler = logging.FileHandler(LOG_FILE_PATH, encoding="utf-8")
-    file_handler.setLevel(logging.ERROR)
 
-    # Форматтер
-    formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
-    file_handler.setFormatter(formatter)
+@contextmanager
+def log_context(**fields):
+    """Добавляет к записям лога внутри блока поля корреляции: refresh_id, inn, uuid"""
+    tokens = [_correlation[name].set(value) for name, value in fields.items() if name in _correlation]
+    try:
+        yield
+    finally:
+        for token in reversed(tokens):
+            token.var.reset(token)
+
 
-    # Добавляем обработчик к логгеру
-    logger.addHandler(file_handler)
+def new_refresh_id() -> str:
+    return uuid.uuid4().hex[:12]
 
-# Функция для копирования лога на рабочий стол при завершении программы
-def _save_log_to_desktop():
-    try:
-        # Определяем путь к рабочему столу
-        desktop_path = Path.home() / "Desktop"
-        if os.name == "nt":  # Windows
-            desktop_path = Path(os.path.expandvars("%USERPROFILE%")) / "Desktop"
-
-        # Целевой файл на рабочем столе
-        dest_file = desktop_path / "error_report.txt"
-
-        # Копируем содержимое лога
-        if LOG_FILE_PATH.exists():
-            with open(LOG_FILE_PATH, "r", encoding="utf-8") as src:
-                content = src.read()
-            with open(dest_file, "w", encoding="utf-8") as dst:
-                dst.write("=== ОТЧЁТ ОБ ОШИБКАХ ПРИЛОЖЕНИЯ ===\n")
-                dst.write(f"Дата: {logging.Formatter().formatTime(logging.LogRecord('', '', '', '', '', '', ''))}\n")
-                dst.write("=" * 50 + "\n\n")
-                dst.write(content)
-            print(f"Лог ошибок сохранён на рабочем столе: {dest_file}")
-        else:
-            print("Файл лога не найден.")
-    except Exception as e:
-        print(f"Не удалось сохранить лог на рабочем столе: {e}")
-
-# Регистрируем функцию — она вызовется при выходе из программы
-atexit.register(_save_log_to_desktop)
+
+class CorrelationFilter(logging.Filter):
+    """Копирует поля корреляции в запись. Работает в потоке вызова, до передачи записи в очередь"""
+
+    def filter(self, record):
+        for name, var in _correlation.items():
+            if not hasattr(record, name):
+                setattr(record, name, var.get())
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON"""
+
+    def format(self, record):
+        payload = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": f"{record.funcName}:{record.lineno}",
+            "message": record.getMessage(),
+        }
+        for name in CORRELATION_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                payload[name] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def _file_handler(path: Path, max_bytes: int, backup_count: int, when: str) -> logging.Handler:
+    # delay=True: файл открывается при первой записи, а не при настройке
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+    )
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_atexit_registered = False
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    path=None,
+    json_format: Optional[bool] = None,
+    max_bytes: Optional[int] = None,
+    backup_count: Optional[int] = None,
+    when: Optional[str] = None,
+    handlers=None,
+) -> logging.Logger:
+    """Настраивает AppLogger: запись в файл идёт в отдельном потоке QueueListener,
+    вызов logger.error в event loop только кладёт запись в очередь.
+    Незаданные параметры берутся из настроек (LOG_*).
+
+    handlers: свои обработчики вместо файла (например, для тестов)
+    """
+    global _listener, _queue_handler, _atexit_registered
+    shutdown_logging()
+    _remove_bootstrap()
+    level = c.LOG_LEVEL if level is None else level
+    json_format = c.LOG_FORMAT == "json" if json_format is None else json_format
+
+    if handlers is None:
+        handlers = [_file_handler(
+            Path(c.LOG_FILE_PATH if path is None else path),
+            c.LOG_MAX_BYTES if max_bytes is None else max_bytes,
+            c.LOG_BACKUP_COUNT if backup_count is None else backup_count,
+            c.LOG_ROTATE_WHEN if when is None else when,
+        )]
+    formatter = JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _queue_handler.addFilter(CorrelationFilter())
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    logger.setLevel(level)
+    logger.addHandler(_queue_handler)
+    if not _atexit_registered:
+        # При выходе только сбрасываем очередь, файл не копируется
+        atexit.register(shutdown_logging)
+        _atexit_registered = True
+    return logger
+
+
+def shutdown_logging():
+    """Дописывает оставшиеся в очереди записи и закрывает файлы"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logger.removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+class _BootstrapHandler(logging.Handler):
+    """Настраивает логирование при первой записи и передаёт ей эту запись.
+    Импорт модуля не читает настройки и не трогает файлы; до настройки логгер пропускает
+    все уровни, а отбор по LOG_LEVEL делается здесь, уже после configure_logging"""
+
+    def handle(self, record):
+        with _bootstrap_lock:
+            if _listener is None:
+                try:
+                    configure_logging()
+                except Exception:
+                    # Неверные LOG_* или недоступный файл лога не должны ронять вызывающий код:
+                    # пишем в stderr и сообщаем об ошибке настройки стандартным способом logging
+                    configure_logging(level="ERROR", json_format=False, handlers=[logging.StreamHandler(sys.stderr)])
+                    self.handleError(record)
+        if _queue_handler is not None and record.levelno >= logger.getEffectiveLevel():
+            _queue_handler.handle(record)
+        return True
+
+    def emit(self, record):
+        pass
+
+
+_bootstrap_lock = threading.Lock()
+_bootstrap = _BootstrapHandler()
+
+
+def _remove_bootstrap():
+    logger.removeHandler(_bootstrap)
+
+
+# Создаём логгер; записи также уходят в корневой логгер (propagate)
+logger = logging.getLogger("AppLogger")
+
+# Предотвращаем дублирование логов при повторном импорте
+if not logger.handlers:
+    logger.addFilter(CorrelationFilter())
+    logger.addHandler(_bootstrap)
+    # Иначе действует WARNING корневого логгера и INFO до первой ошибки не дошёл бы до _bootstrap
+    logger.setLevel(logging.DEBUG)
 
 # Экспортируем логгер
-__all__ = ["logger"]
\ No newline at end of file
+__all__ = ["logger", "configure_logging", "shutdown_logging", "log_context", "new_refresh_id"]
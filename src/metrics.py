@@ -0,0 +1,232 @@
+# src/metrics.py
+
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values) -> "_Metric":
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name}: нужны метки {self.labelnames}")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def get(self) -> float:
+        return float(self.function()) if self.function else self.value
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик"""
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0, *labels):
+        child = self.labels(*labels) if labels else self._default()
+        child.value += amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}"
+            for key, child in self._children.items()
+        ]
+
+
+class Gauge(Counter):
+    """Значение, которое может расти и убывать; может вычисляться функцией при каждом сборе"""
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        (self.labels(*labels) if labels else self._default()).value = value
+
+    def dec(self, amount: float = 1.0, *labels):
+        self.inc(-amount, *labels)
+
+    def set_function(self, function: Callable[[], float], *labels):
+        (self.labels(*labels) if labels else self._default()).function = function
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+                break
+
+
+class Histogram(_Metric):
+    """Распределение значений (например, длительностей) по корзинам"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float, *labels):
+        (self.labels(*labels) if labels else self._default()).observe(value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    """Набор метрик, отдаваемых в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+PHASE_SECONDS = REGISTRY.register(Histogram(
+    "token_refresh_phase_seconds", "Длительность этапов обновления токена", ["phase"]
+))
+REFRESH_TOTAL = REGISTRY.register(Counter(
+    "token_refresh_total", "Обновления токенов по результату, причине сбоя и ИНН", ["result", "cause", "inn"]
+))
+REFRESH_IN_FLIGHT = REGISTRY.register(Gauge(
+    "token_refresh_in_flight", "Обновления токенов, выполняющиеся сейчас"
+))
+LIMITER_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "rate_limiter_wait_seconds", "Ожидание в клиентском лимитере частоты запросов", ["host", "endpoint"]
+))
+CACHE_HITS = REGISTRY.register(Gauge("token_cache_hits", "Попадания в кэш токенов"))
+CACHE_MISSES = REGISTRY.register(Gauge("token_cache_misses", "Промахи кэша токенов"))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge("token_cache_hit_ratio", "Доля попаданий в кэш токенов"))
+CACHE_SIZE = REGISTRY.register(Gauge("token_cache_size", "Количество токенов в кэше"))
+
+
+def observe_refresh(result):
+    """Учитывает результат обновления (RefreshResult): длительности этапов и исход"""
+    for phase, seconds in result.timings.items():
+        PHASE_SECONDS.observe(seconds, phase)
+    if result.ok:
+        REFRESH_TOTAL.inc(1, "success", "", result.inn)
+    else:
+        REFRESH_TOTAL.inc(1, "failure", result.cause or "error", result.inn)
+
+
+def refresh_started(count: int = 1):
+    """Начало обновления организаций — в refresh_one, конвейере или процессах обновления"""
+    REFRESH_IN_FLIGHT.inc(count)
+
+
+def refresh_finished(result=None):
+    """Конец обновления одной организации; result учитывается в метриках, None — обновление отменено"""
+    REFRESH_IN_FLIGHT.dec()
+    if result is not None:
+        observe_refresh(result)
+
+
+def track_cache(cache):
+    """Метрики кэша читаются из его счётчиков в момент сбора"""
+    CACHE_HITS.set_function(lambda: cache.hits)
+    CACHE_MISSES.set_function(lambda: cache.misses)
+    CACHE_HIT_RATIO.set_function(lambda: cache.stats["hit_ratio"])
+    CACHE_SIZE.set_function(lambda: len(cache))
+
+
+async def start_metrics_server(host: str = "0.0.0.0", port: int = 9100, registry: Registry = REGISTRY):
+    """Отдельный HTTP-сервер с /metrics; остановка — await runner.cleanup()"""
+    from aiohttp import web  # серверная часть aiohttp нужна только здесь
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(body=registry.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,249 @@
+# src/organizations.py
+
+import asyncio
+import csv
+import io
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import consts as c
+from .logger_setup import logger
+
+# Строка исходного формата organization.json: "Название":ИНН
+_LEGACY_LINE = re.compile(r'^\s*"(?P<name>[^"]*)"\s*:\s*"?(?P<inn>\d+)"?\s*,?\s*$')
+
+# Веса контрольных цифр ИНН
+_INN10_WEIGHTS = (2, 4, 10, 3, 5, 9, 4, 6, 8)
+_INN12_WEIGHTS_1 = (7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+_INN12_WEIGHTS_2 = (3, 7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+
+
+def _check_digit(digits: List[int], weights: Tuple[int, ...]) -> int:
+    return sum(d * w for d, w in zip(digits, weights)) % 11 % 10
+
+
+def is_valid_inn(inn: str) -> bool:
+    """Проверка контрольных цифр ИНН: 10 цифр — юрлицо, 12 — физлицо/ИП"""
+    if not inn.isdigit():
+        return False
+    digits = [int(d) for d in inn]
+    if len(digits) == 10:
+        return _check_digit(digits, _INN10_WEIGHTS) == digits[9]
+    if len(digits) == 12:
+        return (_check_digit(digits, _INN12_WEIGHTS_1) == digits[10]
+                and _check_digit(digits, _INN12_WEIGHTS_2) == digits[11])
+    return False
+
+
+def normalize_thumbprint(thumbprint: Optional[str]) -> Optional[str]:
+    """Отпечаток без пробелов в верхнем регистре (так его отдаёт CAdESCOM)"""
+    if not thumbprint:
+        return None
+    return "".join(thumbprint.split()).upper()
+
+
+class Organization:
+    """Запись реестра; __slots__ — тысячи организаций без словаря на каждую"""
+
+    __slots__ = ("inn", "name", "thumbprint")
+
+    def __init__(self, inn: str, name: str = "", thumbprint: Optional[str] = None):
+        self.inn = str(inn)
+        self.name = name
+        self.thumbprint = normalize_thumbprint(thumbprint)
+
+    def __eq__(self, other):
+        if not isinstance(other, Organization):
+            return NotImplemented
+        return (self.inn, self.name, self.thumbprint) == (other.inn, other.name, other.thumbprint)
+
+    def __hash__(self):
+        return hash((self.inn, self.name, self.thumbprint))
+
+    def __repr__(self):
+        return f"Organization(inn={self.inn!r}, name={self.name!r}, thumbprint={self.thumbprint!r})"
+
+
+def parse_legacy(text: str) -> List[Organization]:
+    """Исходный формат: строки "Название":ИНН без фигурных скобок"""
+    records = []
+    for line in text.splitlines():
+        match = _LEGACY_LINE.match(line)
+        if match:
+            records.append(Organization(match.group("inn"), match.group("name")))
+    return records
+
+
+def _pair(key, value) -> Organization:
+    """Пара объекта JSON; ИНН — сторона из одних цифр, поэтому подходят и {"Название": ИНН}
+    (исходный файл в фигурных скобках), и {"ИНН": "Название"}"""
+    key, value = str(key).strip(), str(value).strip()
+    if value.isdigit() and not key.isdigit():
+        return Organization(value, key)
+    return Organization(key, value)
+
+
+def parse_json(text: str) -> List[Organization]:
+    """JSON: {"Название": ИНН}, {"ИНН": "Название"} или [{"inn": ..., "name": ..., "thumbprint": ...}]"""
+    data = json.loads(text)
+    if isinstance(data, dict):
+        return [_pair(key, value) for key, value in data.items()]
+    if not isinstance(data, list):
+        raise ValueError("Ожидается объект или список организаций")
+    return [Organization(item["inn"], item.get("name", ""), item.get("thumbprint")) for item in data]
+
+
+def parse_csv(text: str) -> List[Organization]:
+    """CSV с заголовком inn,name,thumbprint; разделитель — запятая или точка с запятой"""
+    try:
+        dialect = csv.Sniffer().sniff(text.partition("\n")[0], delimiters=",;")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+    records = []
+    for row in reader:
+        row = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+        if row.get("inn"):
+            records.append(Organization(row["inn"], row.get("name", ""), row.get("thumbprint")))
+    return records
+
+
+def parse_organizations(text: str, suffix: str = "") -> List[Organization]:
+    """Формат по расширению; .json без скобок (исходный organization.json) читается построчно"""
+    if suffix.lower() == ".csv":
+        return parse_csv(text)
+    try:
+        return parse_json(text)
+    except json.JSONDecodeError:
+        return parse_legacy(text)
+
+
+class RegistryDiff(NamedTuple):
+    """ИНН, которые нужно начать, прекратить или перезапустить обновлять"""
+    added: List[str]
+    removed: List[str]
+    changed: List[str]
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+class OrganizationRegistry:
+    """Проверенные организации с индексами по ИНН и по отпечатку сертификата.
+
+    ИНН проверяется один раз при загрузке: записи с неверной контрольной суммой
+    не попадают в реестр, а остаются в invalid. Повторный ИНН не перезаписывает первую запись.
+    """
+
+    def __init__(self, records: Iterable[Organization] = ()):
+        self._by_inn: Dict[str, Organization] = {}
+        self._by_thumbprint: Dict[str, Organization] = {}
+        self.invalid: List[Organization] = []
+        for record in records:
+            if record.inn in self._by_inn:
+                continue
+            if not is_valid_inn(record.inn):
+                self.invalid.append(record)
+                continue
+            self._by_inn[record.inn] = record
+            if record.thumbprint:
+                self._by_thumbprint.setdefault(record.thumbprint, record)
+        if self.invalid:
+            logger.error(
+                "Неверный ИНН у организаций: " + ", ".join(f"{r.name} ({r.inn})" for r in self.invalid)
+            )
+
+    @classmethod
+    def from_file(cls, path=None) -> "OrganizationRegistry":
+        path = Path(c.ORGANIZATIONS_PATH if path is None else path)
+        return cls(parse_organizations(path.read_text(encoding="utf-8"), path.suffix))
+
+    def get(self, inn: str) -> Optional[Organization]:
+        return self._by_inn.get(str(inn))
+
+    def by_thumbprint(self, thumbprint: str) -> Optional[Organization]:
+        return self._by_thumbprint.get(normalize_thumbprint(thumbprint))
+
+    def inns(self) -> List[str]:
+        return list(self._by_inn)
+
+    def as_dict(self) -> Dict[str, str]:
+        """{ИНН: название} в порядке файла"""
+        return {inn: record.name for inn, record in self._by_inn.items()}
+
+    def diff(self, new: "OrganizationRegistry") -> RegistryDiff:
+        """Что изменилось в new относительно текущего реестра"""
+        return RegistryDiff(
+            added=[inn for inn in new._by_inn if inn not in self._by_inn],
+            removed=[inn for inn in self._by_inn if inn not in new._by_inn],
+            changed=[inn for inn, record in new._by_inn.items()
+                     if inn in self._by_inn and self._by_inn[inn] != record],
+        )
+
+    def __len__(self):
+        return len(self._by_inn)
+
+    def __iter__(self) -> Iterator[Organization]:
+        return iter(self._by_inn.values())
+
+    def __contains__(self, inn):
+        return str(inn) in self._by_inn
+
+
+def apply_diff(scheduler, diff: RegistryDiff):
+    """Передаёт изменения планировщику: обновляются только затронутые организации"""
+    for inn in diff.removed:
+        scheduler.remove(inn)
+    for inn in diff.changed:
+        scheduler.remove(inn)
+        scheduler.add(inn)
+    for inn in diff.added:
+        scheduler.add(inn)
+
+
+class OrganizationWatcher:
+    """Перечитывает файл организаций при изменении mtime/размера и сообщает разницу"""
+
+    def __init__(self, path=None, interval: Optional[float] = None):
+        self.path = Path(c.ORGANIZATIONS_PATH if path is None else path)
+        self.interval = c.ORGANIZATIONS_RELOAD_INTERVAL if interval is None else interval
+        self._signature = self._stat()
+        self.registry = OrganizationRegistry.from_file(self.path)
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> Optional[RegistryDiff]:
+        """Разница с прошлой загрузкой или None, если файл не менялся.
+        Ошибка чтения оставляет прежний реестр"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return None
+        try:
+            registry = OrganizationRegistry.from_file(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Не удалось перечитать {self.path}: {e}")
+            return None
+        self._signature = signature
+        diff, self.registry = self.registry.diff(registry), registry
+        return diff
+
+    async def watch(self, scheduler):
+        """Следит за файлом до отмены задачи и передаёт изменения планировщику"""
+        while True:
+            await asyncio.sleep(self.interval)
+            # Чтение и разбор файла — вне event loop
+            diff = await asyncio.get_running_loop().run_in_executor(None, self.check)
+            if diff:
+                logger.info(
+                    f"Организации: добавлено {len(diff.added)}, удалено {len(diff.removed)}, "
+                    f"изменено {len(diff.changed)}"
+                )
+                apply_diff(scheduler, diff)
@@ -0,0 +1,151 @@
+# src/pipeline.py
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional, Set
+
+from . import consts as c
+from . import metrics
+from .batch_refresh import BatchRefresher, RefreshResult
+from .logger_setup import log_context, new_refresh_id
+from .retry import deadline_scope
+from .timeouts import PHASE_KEY, PHASE_SIGN, PHASE_TOKEN, PhaseTimer
+
+# Сигнал остановки для воркеров следующего этапа
+_DONE = object()
+
+
+async def refresh_pipelined(
+    refresher: BatchRefresher,
+    inns: Iterable[str],
+    prefetch: Optional[int] = None,
+) -> Dict[str, RefreshResult]:
+    """Пакетное обновление конвейером: ключ → подпись → токен.
+
+    Challenge для следующих организаций запрашиваются, пока текущие подписываются,
+    а обмен на токен идёт параллельно с подписью следующих. Между этапами — очереди
+    размером prefetch, поэтому challenge не успевают устареть, а пропускная способность
+    определяется самым медленным этапом, а не суммой всех.
+
+    Как и refresh(), конвейер соблюдает общий лимит concurrency, разделяет обновление
+    одного ИНН с параллельными вызовами и укладывает каждую организацию в timeouts.refresh.
+    """
+    prefetch = c.PIPELINE_PREFETCH if prefetch is None else prefetch
+    unique_inns = list(dict.fromkeys(str(inn) for inn in inns))
+    results: Dict[str, RefreshResult] = {}
+    if not unique_inns:
+        return results
+    loop = asyncio.get_running_loop()
+
+    pending: asyncio.Queue = asyncio.Queue()
+    owned: Dict[str, asyncio.Future] = {}  # ИНН, которые обновляет конвейер
+    joined: List[asyncio.Future] = []  # ИНН, уже обновляемые вне конвейера (refresh, брокер)
+    for inn in unique_inns:
+        # Через общий SingleFlight: параллельный refresh(inn) дождётся конвейера, и наоборот
+        own = loop.create_future()
+        shared = refresher._flights.join(inn, lambda: own)
+        if shared is own:
+            owned[inn] = own
+            pending.put_nowait(inn)
+        else:
+            joined.append(shared)
+    challenges: asyncio.Queue = asyncio.Queue(maxsize=max(1, prefetch))
+    signed: asyncio.Queue = asyncio.Queue(maxsize=max(1, prefetch))
+    holding: Set[str] = set()  # ИНН в работе: заняли место в лимите concurrency и учтены в REFRESH_IN_FLIGHT
+
+    @asynccontextmanager
+    async def stage(deadline: float, timer: PhaseTimer, phase: str):
+        # Один срок timeouts.refresh на всю организацию: и для повторов запросов, и для ожидания этапа
+        with deadline_scope(deadline - loop.time()), timer.phase(phase):
+            async with asyncio.timeout_at(deadline):
+                yield
+
+    def finish(inn: str, result: RefreshResult):
+        results[inn] = result
+        if not owned[inn].done():
+            owned[inn].set_result(result)
+        if inn in holding:
+            holding.discard(inn)
+            refresher._semaphore.release()
+            metrics.refresh_finished(result)
+
+    async def fetch_worker():
+        while not pending.empty():
+            inn = pending.get_nowait()
+            # Общий с refresh() лимит одновременных обновлений; место занято до конца обмена на токен
+            await refresher._semaphore.acquire()
+            holding.add(inn)
+            metrics.refresh_started()
+            timer = PhaseTimer()
+            deadline = loop.time() + refresher.timeouts.refresh
+            # Одна организация проходит этапы в разных задачах; refresh_id связывает их записи
+            context = {"refresh_id": new_refresh_id(), "inn": inn}
+            with log_context(**context):
+                try:
+                    async with stage(deadline, timer, PHASE_KEY):
+                        challenge = await refresher.fetch_challenge()
+                except Exception as e:
+                    finish(inn, refresher.failure(inn, e, timer))
+                    continue
+            await challenges.put((inn, timer, context, deadline, challenge))
+
+    async def sign_worker():
+        while (item := await challenges.get()) is not _DONE:
+            inn, timer, context, deadline, challenge = item
+            with log_context(**context):
+                try:
+                    async with stage(deadline, timer, PHASE_SIGN):
+                        signature = await refresher.sign_challenge(inn, challenge)
+                except Exception as e:
+                    finish(inn, refresher.failure(inn, e, timer))
+                    continue
+            if not signature:
+                finish(inn, RefreshResult(inn, error="Подпись не создана", cause="sign_failed", timings=timer.timings))
+                continue
+            await signed.put((inn, timer, context, deadline, challenge, signature))
+
+    async def exchange_worker():
+        while (item := await signed.get()) is not _DONE:
+            inn, timer, context, deadline, challenge, signature = item
+            with log_context(**context):
+                try:
+                    async with stage(deadline, timer, PHASE_TOKEN):
+                        result = await refresher.exchange_token(inn, challenge, signature)
+                except Exception as e:
+                    result = refresher.failure(inn, e, timer)
+            result.timings = timer.timings
+            finish(inn, result)
+
+    def start(worker, count: int) -> List[asyncio.Task]:
+        return [asyncio.create_task(worker()) for _ in range(max(1, count))]
+
+    network_workers = min(refresher.concurrency, max(1, len(owned)))
+    sign_workers = min(getattr(refresher.signer, "max_workers", 1), max(1, len(owned)))
+    fetchers = start(fetch_worker, network_workers)
+    signers = start(sign_worker, sign_workers)
+    exchangers = start(exchange_worker, network_workers)
+    try:
+        # Этапы завершаются по очереди: следующий получает _DONE, когда предыдущий всё отдал
+        await asyncio.gather(*fetchers)
+        for _ in signers:
+            await challenges.put(_DONE)
+        await asyncio.gather(*signers)
+        for _ in exchangers:
+            await signed.put(_DONE)
+        await asyncio.gather(*exchangers)
+        for result in await asyncio.gather(*(asyncio.shield(future) for future in joined)):
+            results[result.inn] = result
+    finally:
+        for task in fetchers + signers + exchangers:
+            task.cancel()
+        # При отмене конвейера ожидающие в SingleFlight не должны зависнуть
+        for inn, future in owned.items():
+            if not future.done():
+                future.cancel()
+        for _ in holding:
+            refresher._semaphore.release()
+            metrics.refresh_finished()
+        holding.clear()
+    if refresher.cache is not None:
+        await refresher.cache.aflush()
+    return {inn: results[inn] for inn in unique_inns}
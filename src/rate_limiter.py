@@ -0,0 +1,110 @@
+# src/rate_limiter.py
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from . import consts as c
+from . import metrics
+
+# Имена эндпоинтов для лимитов
+ENDPOINT_KEY = "key"
+ENDPOINT_TOKEN = "token"
+HOST_WIDE = "*"  # bucket лимита хоста, общий для всех эндпоинтов
+
+
+class TokenBucket:
+    """Token bucket: rate запросов в секунду, всплеск до capacity.
+    Ожидающие обслуживаются по очереди (asyncio.Lock пропускает в порядке FIFO)"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Берёт один токен, при необходимости ждёт; возвращает время ожидания в секундах"""
+        started = time.monotonic()
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+        return time.monotonic() - started
+
+
+class LimiterStats:
+    """Сколько раз и сколько времени вызовы ждали лимитера"""
+
+    __slots__ = ("acquired", "waited", "total_wait", "max_wait")
+
+    def __init__(self):
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.acquired += 1
+        if wait > 0.001:
+            self.waited += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+class RateLimiter:
+    """Общий лимитер для всех запросов к True API: отдельный bucket на пару (хост, эндпоинт).
+
+    endpoint_rates: лимит по эндпоинту ("key", "token"), default_rate — для остальных эндпоинтов;
+    host_rates: общий лимит хоста на все его эндпоинты вместе — запрос ждёт оба bucket.
+    """
+
+    def __init__(
+        self,
+        default_rate: Optional[float] = None,
+        endpoint_rates: Optional[Dict[str, float]] = None,
+        host_rates: Optional[Dict[str, float]] = None,
+    ):
+        self.default_rate = c.RATE_LIMIT_DEFAULT if default_rate is None else default_rate
+        self.endpoint_rates = (
+            endpoint_rates
+            if endpoint_rates is not None
+            else {ENDPOINT_KEY: c.RATE_LIMIT_KEY, ENDPOINT_TOKEN: c.RATE_LIMIT_TOKEN}
+        )
+        self.host_rates = host_rates or {}
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self.stats: Dict[Tuple[str, str], LimiterStats] = {}
+
+    def rate_for(self, host: str, endpoint: str) -> float:
+        """Итоговый лимит пары (хост, эндпоинт): лимит хоста ограничивает и его эндпоинты"""
+        rate = self.endpoint_rates.get(endpoint, self.default_rate)
+        if host in self.host_rates:
+            rate = min(rate, self.host_rates[host])
+        return rate
+
+    def _bucket(self, key: Tuple[str, str], rate: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate)
+        return bucket
+
+    async def acquire(self, url_or_host: str, endpoint: str) -> float:
+        """Ждёт разрешения на запрос; возвращает время ожидания"""
+        host = urlsplit(url_or_host).hostname or url_or_host
+        wait = 0.0
+        if host in self.host_rates:
+            wait += await self._bucket((host, HOST_WIDE), self.host_rates[host]).acquire()
+        key = (host, endpoint)
+        wait += await self._bucket(key, self.endpoint_rates.get(endpoint, self.default_rate)).acquire()
+        self.stats.setdefault(key, LimiterStats()).record(wait)
+        metrics.LIMITER_WAIT_SECONDS.observe(wait, host, endpoint)
+        return wait
@@ -0,0 +1,84 @@
+# src/responses.py
+
+import json
+from typing import Optional
+
+from .token_cache import parse_token_expiry
+
+try:
+    import orjson  # необязательная зависимость: разбор JSON в несколько раз быстрее stdlib
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+# orjson.JSONDecodeError наследует json.JSONDecodeError, ловить можно одно исключение
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(body: bytes):
+    """JSON из байтов тела ответа без промежуточной строки"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def loads_object(body: bytes) -> dict:
+    """Тело ответа API — всегда JSON-объект; иначе JSONDecodeError, как для битого JSON"""
+    payload = loads(body)
+    if not isinstance(payload, dict):
+        raise JSONDecodeError("Ожидается JSON-объект", body.decode("utf-8", "replace")[:100], 0)
+    return payload
+
+
+def error_message(body: bytes, default: str = "Неизвестная ошибка") -> str:
+    """Поле message из тела ошибки; тело уже прочитано, повторно не запрашивается"""
+    try:
+        payload = loads(body)
+    except (JSONDecodeError, UnicodeDecodeError):
+        return default
+    if isinstance(payload, dict) and payload.get("message"):
+        return str(payload["message"])
+    return default
+
+
+class AuthChallenge:
+    """Ответ /auth/key: uuid запроса и data для подписи"""
+
+    __slots__ = ("uuid", "data")
+
+    def __init__(self, uuid: Optional[str], data: Optional[str]):
+        self.uuid = uuid
+        self.data = data
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "AuthChallenge":
+        payload = loads_object(body)
+        return cls(payload.get("uuid"), payload.get("data"))
+
+    def as_dict(self) -> dict:
+        """Словарь в прежнем формате ответа (только присутствовавшие поля)"""
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+    def __repr__(self):
+        return f"AuthChallenge(uuid={self.uuid!r})"
+
+
+class AuthToken:
+    """Ответ обмена подписи: токен и момент истечения из поля exp JWT (None, если токен не JWT)"""
+
+    __slots__ = ("token", "expires_at")
+
+    def __init__(self, token: Optional[str], expires_at: Optional[float] = None):
+        self.token = token
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "AuthToken":
+        token = loads_object(body).get("token")
+        return cls(token, parse_token_expiry(token) if isinstance(token, str) else None)
+
+    def as_dict(self) -> dict:
+        """Словарь в прежнем формате ответа {"token": ...}"""
+        return {"token": self.token} if self.token is not None else {}
+
+    def __repr__(self):
+        return f"AuthToken(expires_at={self.expires_at!r})"
@@ -0,0 +1,95 @@
+# src/retry.py
+
+import asyncio
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, FrozenSet, Optional
+
+from aiohttp import ClientError
+from . import consts as c
+from .errors import HTTPError
+from .tracing import current_span
+
+# Абсолютный (time.monotonic) срок текущего обновления токена, общий для всех его запросов
+_deadline_at: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("refresh_deadline_at", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Задаёт общий срок для всех повторов внутри блока (например, одного обновления токена)"""
+    token = _deadline_at.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline_at.reset(token)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах: число или HTTP-дата"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Политика повторов: экспоненциальная задержка с jitter, учёт Retry-After, общий срок"""
+    max_attempts: int = field(default_factory=lambda: c.RETRY_MAX_ATTEMPTS)
+    base_delay: float = field(default_factory=lambda: c.RETRY_BASE_DELAY)
+    max_delay: float = field(default_factory=lambda: c.RETRY_MAX_DELAY)
+    deadline: Optional[float] = field(default_factory=lambda: c.REFRESH_DEADLINE)
+    retry_statuses: FrozenSet[int] = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Сетевые ошибки, таймауты и 429/5xx повторяем; остальные 4xx — нет"""
+        if isinstance(error, HTTPError):
+            return error.status_code in self.retry_statuses
+        return isinstance(error, (ClientError, asyncio.TimeoutError))
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: случайная задержка от 0 до min(max_delay, base_delay * 2^attempt)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def delay_for(self, error: Exception, attempt: int) -> float:
+        headers = getattr(error, "headers", None) or {}
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        if retry_after is not None:
+            return retry_after  # сервер знает лучше; слишком долгое ожидание отсечёт deadline
+        return self.backoff(attempt)
+
+
+async def call_with_retry(func: Callable[[], Awaitable[Any]], policy: Optional[RetryPolicy] = None) -> Any:
+    """Вызывает func() с повторами по policy; без policy — один вызов"""
+    if policy is None:
+        return await func()
+
+    deadline_at = _deadline_at.get()
+    if deadline_at is None and policy.deadline:
+        deadline_at = time.monotonic() + policy.deadline
+
+    attempt = 0
+    while True:
+        try:
+            return await func()
+        except Exception as error:
+            attempt += 1
+            if attempt >= policy.max_attempts or not policy.is_retryable(error):
+                raise
+            delay = policy.delay_for(error, attempt)
+            if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+                raise
+            span = current_span()
+            span.set_attribute("retry.count", attempt)
+            span.add_event("retry", **{"retry.attempt": attempt, "retry.delay": delay, "error": str(error)})
+            await asyncio.sleep(delay)
@@ -0,0 +1,100 @@
+# src/scheduler.py
+
+import asyncio
+import random
+import time
+from typing import Dict, Iterable, Optional
+
+from . import consts as c
+from .batch_refresh import BatchRefresher
+from .logger_setup import logger
+from .token_cache import TokenCache
+
+
+class RefreshScheduler:
+    """Фоновое упреждающее обновление токенов до истечения их срока"""
+
+    def __init__(
+        self,
+        refresher: BatchRefresher,
+        cache: TokenCache,
+        lead_time: Optional[float] = None,
+        jitter: Optional[float] = None,
+        retry_delay: Optional[float] = None,
+    ):
+        self.refresher = refresher
+        self.cache = cache
+        self.lead_time = c.REFRESH_LEAD_TIME if lead_time is None else lead_time
+        self.jitter = c.REFRESH_JITTER if jitter is None else jitter
+        self.retry_delay = c.REFRESH_RETRY_DELAY if retry_delay is None else retry_delay
+        # Токены пишет refresher, читатели берут их из того же кэша
+        self.refresher.cache = cache
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stop: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._stop is not None and not self._stop.is_set()
+
+    def get_token(self, inn: str) -> Optional[str]:
+        """Токен из кэша без обращения к API"""
+        return self.cache.get(inn)
+
+    def next_delay(self, inn: str, now: Optional[float] = None) -> float:
+        """Через сколько секунд обновлять токен: за lead_time (минус случайный jitter) до истечения"""
+        entry = self.cache.peek(inn)
+        if entry is None:
+            return 0.0
+        now = time.time() if now is None else now
+        renew_at = entry.expires_at - self.lead_time - random.uniform(0, self.jitter)
+        return max(0.0, renew_at - now)
+
+    async def _wait(self, delay: float) -> bool:
+        """Ожидание delay секунд; True, если за это время пришла команда остановки"""
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run(self, inn: str):
+        delay = self.next_delay(inn)
+        while not await self._wait(delay):
+            result = await self.refresher.refresh(inn)
+            if result.ok:
+                delay = self.next_delay(inn)
+            else:
+                logger.error(f"Фоновое обновление токена для ИНН {inn} не удалось: {result.error}")
+                delay = self.retry_delay + random.uniform(0, self.retry_delay)
+
+    def add(self, inn: str):
+        """Начинает отслеживать организацию"""
+        inn = str(inn)
+        if self.running and inn not in self._tasks:
+            self._tasks[inn] = asyncio.create_task(self._run(inn), name=f"refresh-{inn}")
+
+    def remove(self, inn: str):
+        """Прекращает отслеживать организацию"""
+        task = self._tasks.pop(str(inn), None)
+        if task:
+            task.cancel()
+
+    async def start(self, inns: Iterable[str]):
+        self._stop = asyncio.Event()
+        for inn in inns:
+            self.add(inn)
+
+    async def stop(self):
+        """Плавная остановка: текущие обновления дорабатывают, новые не начинаются"""
+        if self._stop is None:
+            return
+        self._stop.set()
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
@@ -1,93 +1,232 @@
 # src/send_request.py
 
 from . import consts as c
-import json
-import logging
 import base64
+import math
 import uuid
-from typing import Optional
-from fastapi import HTTPException
-from aiohttp import ClientSession, ClientError
+from typing import Iterable, List, Optional, Union
+from aiohttp import ClientSession, ClientError, ClientTimeout
 import asyncio
 
-async def get_auth_token(uuid_val: str, signature: str) -> Optional[dict]:
-    """Получение токена авторизации через внешний API"""
-    url = "https://api.mdlp.crpt.ru/api/v1/token"
+from .circuit_breaker import CircuitBreakers, CircuitOpenError
+from .errors import HTTPError, http_error
+from .logger_setup import logger
+from .rate_limiter import ENDPOINT_KEY, ENDPOINT_TOKEN, RateLimiter
+from .responses import AuthChallenge, AuthToken, JSONDecodeError, error_message
+from .retry import RetryPolicy, call_with_retry
+from .signer_backend import PAYLOAD_BYTES, PAYLOAD_TEXT
+from .tracing import set_attribute, tracer
+
+# Данные challenge: строка из ответа API или уже готовые байты (без копирования для memoryview)
+ChallengeData = Union[str, bytes, bytearray, memoryview]
+
+
+def _retry_headers(resp) -> Optional[dict]:
+    """Retry-After ответа сервера для политики повторов"""
+    retry_after = resp.headers.get("Retry-After")
+    return {"Retry-After": retry_after} if retry_after else None
+
+def _b64(data: Optional[ChallengeData], payload_format: str) -> Union[bytes, str]:
+    if not data:
+        return "" if payload_format == PAYLOAD_TEXT else b""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    # b64encode принимает любой bytes-like объект, memoryview не копируется
+    encoded = base64.b64encode(data)
+    return encoded.decode("ascii") if payload_format == PAYLOAD_TEXT else encoded
+
+
+def encode_challenge(data: Optional[ChallengeData], payload_format: str = PAYLOAD_BYTES) -> Union[bytes, str]:
+    """base64 от data challenge в формате подписанта: PAYLOAD_BYTES — bytes, PAYLOAD_TEXT — str.
+    Неподдерживаемый тип данных записывается в лог, результат — пустое значение"""
+    with tracer.span("decode_data") as span:
+        try:
+            encoded = _b64(data, payload_format)
+        except TypeError as e:
+            logger.error(f"Ошибка при кодировании в Base64: {e}")
+            return "" if payload_format == PAYLOAD_TEXT else b""
+        span.set_attribute("data.length", len(data) if data else 0)
+        return encoded
+
+
+def encode_challenges(items: Iterable[Optional[ChallengeData]], payload_format: str = PAYLOAD_BYTES) -> List[Union[bytes, str]]:
+    """Пакетное кодирование: один интервал трассировки на весь пакет. Ошибка типа — TypeError"""
+    with tracer.span("decode_data.batch") as span:
+        encoded = [_b64(data, payload_format) for data in items]
+        span.set_attribute("batch.size", len(encoded))
+        return encoded
+
+
+def _timeout_kwargs(timeout: Optional[ClientTimeout]) -> dict:
+    return {"timeout": timeout} if timeout is not None else {}
+
+async def _post_token(
+    session: ClientSession, url: str, params: dict, timeout: Optional[ClientTimeout] = None
+) -> Optional[AuthToken]:
+    """Отправка POST-запроса за токеном в переданной сессии; тело ответа читается один раз"""
+    async with session.post(url.strip(), json=params, **_timeout_kwargs(timeout)) as resp:
+        set_attribute("http.status_code", resp.status)
+        body = await resp.read()
+        if resp.status == 200:
+            try:
+                return AuthToken.from_body(body)
+            except JSONDecodeError:
+                logger.error("Ответ от API не является валидным JSON")
+                return None
+        else:
+            logger.error(f"Token request failed: {resp.status}")
+            error_text = body.decode("utf-8", "replace")
+            if error_text:
+                logger.error(f"Текст ответа ошибки: {error_text}")
+            # Исключение нужно политике повторов, наружу get_auth_token вернёт None
+            raise http_error(
+                status_code=resp.status,
+                detail=error_text or "Token request failed",
+                headers=_retry_headers(resp),
+            )
+
+async def fetch_auth_token(
+    uuid_val: str,
+    signature: str,
+    session: Optional[ClientSession] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    circuit_breakers: Optional[CircuitBreakers] = None,
+    timeout: Optional[ClientTimeout] = None,
+    url: Optional[str] = None,
+) -> Optional[AuthToken]:
+    """Получение токена авторизации через внешний API (токен и срок его действия)
+
+    session: общая сессия (например, SessionManager.session); без неё создаётся временная
+    retry_policy: повторы при сетевых ошибках, 429 и 5xx; без неё — одна попытка
+    rate_limiter: общий лимитер частоты запросов; каждая попытка ждёт своей очереди
+    circuit_breakers: при недоступном хосте запрос отклоняется сразу, без ожидания таймаута
+    timeout: таймауты подключения/чтения/всего запроса (например, PhaseTimeouts().token.client_timeout())
+    url: адрес обмена подписи на токен (по умолчанию URL_AUTH_TOKEN)
+    """
+    url = c.URL_AUTH_TOKEN if url is None else url
     params = {
         'code': uuid_val,
         'signature': signature
     }
-    try:
-        async with ClientSession() as session:
-            async with session.post(url.strip(), json=params) as resp:
-                if resp.status == 200:
-                    try:
-                        return await resp.json()
-                    except json.JSONDecodeError:
-                        logging.error("Ответ от API не является валидным JSON")
-                        return None
-                else:
-                    logging.error(f"Token request failed: {resp.status}")
-                    # Опционально: попробовать прочитать текст ошибки
-                    try:
-                        error_text = await resp.text()
-                        logging.error(f"Текст ответа ошибки: {error_text}")
-                    except:
-                        pass
-                    return None
-    except Exception as e:
-        logging.error(f"Token request failed: {e}")
-        return None
+
+    async def send():
+        if rate_limiter is not None:
+            await rate_limiter.acquire(url, ENDPOINT_TOKEN)
+        if session is not None:
+            return await _post_token(session, url, params, timeout)
+        async with ClientSession(**_timeout_kwargs(timeout)) as own_session:
+            return await _post_token(own_session, url, params, timeout)
+
+    async def attempt():
+        if circuit_breakers is None:
+            return await send()
+        return await circuit_breakers.for_url(url).call(send)
+
+    with tracer.span("auth_token.request", **{"http.url": url, "auth.uuid": uuid_val}):
+        try:
+            return await call_with_retry(attempt, retry_policy)
+        except HTTPError:
+            return None  # ошибка ответа уже записана в лог
+        except Exception as e:
+            logger.error(f"Token request failed: {e}")
+            return None
+
+
+async def get_auth_token(uuid_val: str, signature: str, **kwargs) -> Optional[dict]:
+    """То же, что fetch_auth_token, в виде словаря ответа API {"token": ...}
+
+    kwargs: session, retry_policy, rate_limiter, circuit_breakers, timeout, url
+    """
+    token = await fetch_auth_token(uuid_val, signature, **kwargs)
+    return token.as_dict() if token is not None else None
 
 class AsyncAPIHandler:
     """Асинхронный класс для обработки запросов к API Честный знак"""
 
-    def __init__(self, base_url: str = c.URL_TOKEN):
+    def __init__(
+        self,
+        base_url: str = c.URL_TOKEN,
+        session: Optional[ClientSession] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breakers: Optional[CircuitBreakers] = None,
+        timeout: Optional[ClientTimeout] = None,
+    ):
         self.base_url = base_url.strip()  # Убираем лишние пробелы
-        self.session = None
+        self.session = session
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.circuit_breakers = circuit_breakers
+        self.timeout = timeout
+        # Переданную извне сессию не закрываем — ею владеет пул
+        self._owns_session = session is None
 
     async def __aenter__(self):
-        self.session = ClientSession()
+        if self._owns_session:
+            self.session = ClientSession(**_timeout_kwargs(self.timeout))
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        if self._owns_session and self.session:
             await self.session.close()
 
-    async def _make_request(self):
-        """Асинхронный базовый метод для выполнения GET-запросов"""
+    async def _make_request(self) -> dict:
+        """Асинхронный базовый метод для выполнения GET-запросов (с повторами по retry_policy)"""
+        return (await self.fetch_challenge()).as_dict()
+
+    async def fetch_challenge(self) -> AuthChallenge:
+        """Запрос challenge: uuid и data для подписи"""
+        with tracer.span("auth_key.request", **{"http.url": self.base_url}) as span:
+            try:
+                challenge = await call_with_retry(self._attempt, self.retry_policy)
+            except CircuitOpenError as e:
+                logger.error(f"Хост недоступен, запрос отклонён: {e}")
+                raise http_error(
+                    status_code=503,
+                    detail="Service unavailable (circuit open)",
+                    headers={"Retry-After": str(math.ceil(e.retry_after))},
+                )
+            if challenge.uuid is not None:
+                span.set_attribute("auth.uuid", challenge.uuid)
+            return challenge
+
+    async def _attempt(self):
+        if self.circuit_breakers is None:
+            return await self._get_once()
+        return await self.circuit_breakers.for_url(self.base_url).call(self._get_once)
+
+    async def _get_once(self) -> AuthChallenge:
+        """Одна попытка GET-запроса; тело ответа читается один раз"""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(self.base_url, ENDPOINT_KEY)
         try:
-            async with self.session.get(self.base_url) as response:
+            async with self.session.get(self.base_url, **_timeout_kwargs(self.timeout)) as response:
+                set_attribute("http.status_code", response.status)
+                body = await response.read()
                 if response.status != 200:
-                    try:
-                        error_data = await response.json()
-                    except json.JSONDecodeError:
-                        error_data = {}
-                    error_msg = error_data.get("message", "Неизвестная ошибка")
-                    logging.error(f"Ошибка сервера: {error_msg}")
-                    raise HTTPException(status_code=response.status, detail=error_msg)
-                return await response.json()
-        except ClientError as e:
-            logging.error(f"Ошибка соединения: {str(e)}")
-            raise HTTPException(status_code=503, detail="Service unavailable")
-        except json.JSONDecodeError:
-            logging.error("Ошибка декодирования JSON")
-            raise HTTPException(status_code=500, detail="Invalid JSON response")
+                    error_msg = error_message(body)
+                    logger.error(f"Ошибка сервера: {error_msg}")
+                    raise http_error(
+                        status_code=response.status,
+                        detail=error_msg,
+                        headers=_retry_headers(response),
+                    )
+                return AuthChallenge.from_body(body)
         except asyncio.TimeoutError:
-            logging.error("Таймаут запроса")
-            raise HTTPException(status_code=504, detail="Request timeout")
+            # Раньше ClientError: таймауты aiohttp наследуют оба класса
+            logger.error("Таймаут запроса")
+            raise http_error(status_code=504, detail="Request timeout")
+        except ClientError as e:
+            logger.error(f"Ошибка соединения: {str(e)}")
+            raise http_error(status_code=503, detail="Service unavailable")
+        except (JSONDecodeError, UnicodeDecodeError):
+            logger.error("Ошибка декодирования JSON")
+            raise http_error(status_code=500, detail="Invalid JSON response")
 
     @staticmethod
-    async def decode_data(data:str) -> bytes:
-        """Кодирует строку в base64"""
-        try:
-            if data is None or data == "":
-                logging.info("Пустая строка или None для кодирования")
-                return b"" 
-            data_str = str(data)
-            return base64.b64encode(data_str.encode("utf-8"))
-        except Exception as e:
-            logging.error(f"Ошибка при кодировании в Base64: {e}")
-            return b""
+    def decode_data(data: Optional[ChallengeData], payload_format: str = PAYLOAD_BYTES) -> Union[bytes, str]:
+        """Кодирует data в base64 (см. encode_challenge); синхронно — работа только на CPU"""
+        return encode_challenge(data, payload_format)
 
     
\ No newline at end of file
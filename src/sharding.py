@@ -0,0 +1,220 @@
+# src/sharding.py
+
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import queue
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+from . import consts as c
+from . import metrics
+from .async_signer import AsyncSigner
+from .batch_refresh import BatchRefresher, RefreshResult
+from .logger_setup import logger
+from .pipeline import refresh_pipelined
+from .rate_limiter import ENDPOINT_KEY, ENDPOINT_TOKEN, RateLimiter
+from .signer_backend import create_signer_backend
+from .token_cache import TokenCache
+
+
+def _hash(key: str) -> int:
+    # hash() строк случаен в каждом процессе, поэтому — стабильный blake2b
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Консистентное хеширование: при изменении числа узлов переезжает ~1/N ключей.
+
+    replicas: виртуальных точек на узел — чем больше, тем ровнее распределение
+    """
+
+    def __init__(self, nodes: Iterable[Hashable], replicas: int = 100):
+        self.nodes = list(nodes)
+        if not self.nodes:
+            raise ValueError("Нужен хотя бы один узел")
+        points = sorted((_hash(f"{node}#{replica}"), node) for node in self.nodes for replica in range(replicas))
+        self._positions = [position for position, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node_for(self, key: str) -> Hashable:
+        index = bisect.bisect(self._positions, _hash(str(key))) % len(self._positions)
+        return self._owners[index]
+
+    def assign(self, keys: Iterable[str]) -> Dict[Hashable, List[str]]:
+        """{узел: ключи} без повторов; у каждого узла есть запись, даже пустая"""
+        shards: Dict[Hashable, List[str]] = {node: [] for node in self.nodes}
+        for key in dict.fromkeys(str(key) for key in keys):
+            shards[self.node_for(key)].append(key)
+        return shards
+
+
+@dataclass
+class ShardOptions:
+    """Параметры процесса-обработчика. Передаются в дочерний процесс (spawn),
+    поэтому signer_factory должна сериализоваться pickle: класс или функция уровня модуля"""
+
+    signer_factory: Callable = create_signer_backend
+    sign_workers: int = 1  # потоков подписи в процессе; 1 — один CryptoProSigner на процесс
+    concurrency: Optional[int] = None
+    key_url: str = c.URL_KEY
+    token_url: Optional[str] = None
+    rate_limit: Optional[float] = None  # общий лимит всех процессов, запросов/с; None — RATE_LIMIT_*
+    rate_share: float = 1.0  # доля общего лимита на процесс
+    payload_format: Optional[str] = None
+    pipelined: bool = False  # конвейер ключ → подпись → токен внутри процесса (refresh_pipelined)
+
+
+def _shard_rate_limiter(options: ShardOptions) -> RateLimiter:
+    """Каждый процесс получает долю лимитов, чтобы вместе не превысить квоты API"""
+    share = options.rate_share
+    if options.rate_limit is not None:
+        rate = options.rate_limit * share
+        return RateLimiter(default_rate=rate, endpoint_rates={ENDPOINT_KEY: rate, ENDPOINT_TOKEN: rate})
+    return RateLimiter(
+        default_rate=c.RATE_LIMIT_DEFAULT * share,
+        endpoint_rates={ENDPOINT_KEY: c.RATE_LIMIT_KEY * share, ENDPOINT_TOKEN: c.RATE_LIMIT_TOKEN * share},
+    )
+
+
+async def _refresh_shard(shard_id: int, inns: List[str], results, options: ShardOptions):
+    signer = AsyncSigner(
+        signer_factory=options.signer_factory,
+        max_workers=options.sign_workers,
+        payload_format=options.payload_format,
+    )
+    try:
+        async with BatchRefresher(
+            signer,
+            key_url=options.key_url,
+            token_url=options.token_url,
+            concurrency=options.concurrency,
+            rate_limiter=_shard_rate_limiter(options),
+        ) as refresher:
+            if options.pipelined:
+                for result in (await refresh_pipelined(refresher, inns)).values():
+                    results.put((shard_id, result))
+                return
+            # Результат уходит родителю сразу, не дожидаясь всего шарда
+            for finished in asyncio.as_completed([refresher.refresh(inn) for inn in inns]):
+                results.put((shard_id, await finished))
+    finally:
+        signer.close()
+
+
+def run_shard(shard_id: int, inns: List[str], results, options: ShardOptions):
+    """Точка входа дочернего процесса: свой event loop, своя сессия aiohttp и свой подписант.
+    По завершении в очередь кладётся (shard_id, None)"""
+    try:
+        asyncio.run(_refresh_shard(shard_id, inns, results, options))
+    finally:
+        results.put((shard_id, None))
+
+
+def _next_message(results, timeout: float):
+    try:
+        return results.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+
+@dataclass
+class ShardedRefresher:
+    """Обновление токенов в нескольких процессах: ИНН распределяются по процессам
+    консистентным хешированием, токены возвращаются в кэш родителя через очередь.
+
+    Процесс COM-подписи привязан к одному ядру из-за GIL; несколько процессов используют все ядра.
+    """
+
+    workers: int = field(default_factory=lambda: c.REFRESH_WORKERS)
+    cache: Optional[TokenCache] = None
+    options: ShardOptions = field(default_factory=ShardOptions)
+    start_method: str = "spawn"  # как на Windows; fork небезопасен для COM и потоков
+    poll_interval: float = 0.5
+
+    def __post_init__(self):
+        self.workers = max(1, self.workers)
+        self.ring = HashRing(range(self.workers))
+
+    def _record(self, shard_id: int, result: RefreshResult, pending, results):
+        """Результат дочернего процесса: метрики и кэш родителя"""
+        pending.get(shard_id, set()).discard(result.inn)
+        results[result.inn] = result
+        metrics.refresh_finished(result)
+        if result.ok and self.cache is not None and result.token.get("token"):
+            self.cache.put(result.inn, result.token["token"])
+
+    def _handle(self, message, pending, results):
+        shard_id, result = message
+        if result is None:
+            for inn in pending.pop(shard_id, ()):  # процесс завершился, не вернув часть ИНН
+                self._record(shard_id, self._worker_failed(inn, shard_id), pending, results)
+        elif result.inn in pending.get(shard_id, ()):  # иначе ИНН уже учтён как worker_failed
+            self._record(shard_id, result, pending, results)
+
+    async def refresh_all(self, inns: Iterable[str]) -> Dict[str, RefreshResult]:
+        """Обновляет все организации; упавший процесс даёт ошибку worker_failed его оставшимся ИНН"""
+        shards = {shard: shard_inns for shard, shard_inns in self.ring.assign(inns).items() if shard_inns}
+        if not shards:
+            return {}
+        context = multiprocessing.get_context(self.start_method)
+        results_queue = context.Queue()
+        options = replace(self.options, rate_share=self.options.rate_share / len(shards))
+        processes = {}
+        for shard_id, shard_inns in shards.items():
+            process = context.Process(
+                target=run_shard,
+                args=(shard_id, shard_inns, results_queue, options),
+                name=f"refresh-shard-{shard_id}",
+                daemon=True,
+            )
+            process.start()
+            processes[shard_id] = process
+
+        pending = {shard_id: set(shard_inns) for shard_id, shard_inns in shards.items()}
+        results: Dict[str, RefreshResult] = {}
+        # Дочерние процессы пишут метрики в свои реестры; родитель учитывает их результаты в своём
+        metrics.refresh_started(sum(len(shard_inns) for shard_inns in shards.values()))
+        loop = asyncio.get_running_loop()
+        try:
+            while pending:
+                # Блокирующее чтение очереди — в потоке, event loop родителя свободен
+                message = await loop.run_in_executor(None, _next_message, results_queue, self.poll_interval)
+                if message is None:
+                    self._collect_dead(processes, pending, results, results_queue)
+                    continue
+                self._handle(message, pending, results)
+        finally:
+            for shard_inns in pending.values():  # прерванное ожидание: эти ИНН больше не в работе
+                for _ in shard_inns:
+                    metrics.refresh_finished()
+            for process in processes.values():
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            results_queue.close()
+        if self.cache is not None:
+            await self.cache.aflush()
+        return results
+
+    def _collect_dead(self, processes, pending, results, results_queue):
+        dead = [shard_id for shard_id in pending if not processes[shard_id].is_alive()]
+        if not dead:
+            return
+        # Процесс мог успеть отдать результаты перед смертью: сначала забираем всё из очереди
+        while True:
+            try:
+                self._handle(results_queue.get_nowait(), pending, results)
+            except queue.Empty:
+                break
+        for shard_id in dead:
+            if shard_id not in pending:
+                continue
+            process = processes[shard_id]
+            logger.error(f"Процесс обновления {process.name} завершился с кодом {process.exitcode}")
+            for inn in pending.pop(shard_id):
+                self._record(shard_id, self._worker_failed(inn, shard_id), pending, results)
+
+    def _worker_failed(self, inn: str, shard_id: int) -> RefreshResult:
+        return RefreshResult(inn, error=f"Процесс обновления {shard_id} завершился с ошибкой", cause="worker_failed")
@@ -0,0 +1,84 @@
+# src/signer_backend.py
+
+from typing import Iterable, List, NamedTuple, Optional, Protocol, runtime_checkable
+
+# Какие данные бэкенд принимает на подпись: base64 строкой (COM) или теми же base64-байтами
+PAYLOAD_TEXT = "text"
+PAYLOAD_BYTES = "bytes"
+
+
+class SignResult(NamedTuple):
+    """Результат подписания одного элемента пакета"""
+    signature: Optional[str]
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.signature is not None
+
+
+@runtime_checkable
+class SignerBackend(Protocol):
+    """Интерфейс подписанта: хранилище сертификатов, выбор сертификата, открепленная подпись
+
+    payload_format (атрибут класса, необязательный): PAYLOAD_TEXT или PAYLOAD_BYTES
+    """
+
+    def initialize_store(self, store_location=3) -> bool:
+        """Открывает хранилище сертификатов"""
+
+    def select_certificate(self, thumbprint=None) -> bool:
+        """Выбирает сертификат по отпечатку (или первый доступный)"""
+
+    def select_certificate_by_inn(self, inn) -> bool:
+        """Выбирает сертификат организации по ИНН"""
+
+    def sign_data(self, data_to_sign, detached=True) -> Optional[str]:
+        """Подписывает данные выбранным сертификатом, возвращает подпись в base64"""
+
+    def verify_signature(self, signature, original_data=None) -> bool:
+        """Проверяет подпись"""
+
+    def close(self):
+        """Закрывает хранилище"""
+
+
+def sign_each(backend: SignerBackend, payloads: Iterable, detached=True) -> List[SignResult]:
+    """Пакетное подписание выбранным сертификатом: sign_many бэкенда, если он есть, иначе sign_data по одному"""
+    sign_many = getattr(backend, "sign_many", None)
+    if sign_many is not None:
+        return sign_many(payloads, detached)
+    results = []
+    for data in payloads:
+        signature = backend.sign_data(data, detached)
+        results.append(SignResult(signature, None if signature else "Подпись не создана"))
+    return results
+
+
+def payload_format_of(backend_or_factory, default: str = PAYLOAD_TEXT) -> str:
+    """Формат данных для подписи у бэкенда (или класса бэкенда); по умолчанию — base64 строкой"""
+    return getattr(backend_or_factory, "payload_format", default)
+
+
+def backend_payload_format(name: Optional[str] = None) -> str:
+    """Формат данных бэкенда по имени (SIGNER_BACKEND) без создания подписанта"""
+    from . import consts as c
+
+    name = (name or c.SIGNER_BACKEND).lower()
+    return PAYLOAD_BYTES if name == "local" else PAYLOAD_TEXT
+
+
+def create_signer_backend(name: Optional[str] = None) -> SignerBackend:
+    """Подписант по имени бэкенда (SIGNER_BACKEND): cryptopro или local"""
+    from . import consts as c
+
+    name = (name or c.SIGNER_BACKEND).lower()
+    if name == "cryptopro":
+        from .to_sign_data import CryptoProSigner
+
+        return CryptoProSigner()
+    if name == "local":
+        from .local_signer import LocalCMSSigner
+
+        return LocalCMSSigner(c.LOCAL_CERTIFICATES_DIR)
+    raise ValueError(f"Неизвестный бэкенд подписи: {name}")
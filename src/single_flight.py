@@ -0,0 +1,37 @@
+# src/single_flight.py
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Объединяет одновременные вызовы с одним ключом в один общий future"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def join(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Общий future по ключу: запускает func(), только если активного вызова нет.
+        func может вернуть и готовый future, который вызывающий завершит сам"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Запускает func(), если по ключу нет активного вызова, иначе ждёт уже запущенный.
+        Все ожидающие получают один и тот же результат или одно и то же исключение."""
+        # shield: отмена одного ожидающего не отменяет общий вызов для остальных
+        return await asyncio.shield(self.join(key, func))
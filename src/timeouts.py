@@ -0,0 +1,53 @@
+# src/timeouts.py
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from aiohttp import ClientTimeout
+
+from . import consts as c
+
+# Этапы обновления токена
+PHASE_KEY = "key"
+PHASE_SIGN = "sign"
+PHASE_TOKEN = "token"
+
+
+@dataclass
+class HttpTimeouts:
+    """Таймауты одного HTTP-этапа: подключение, чтение и всё время запроса"""
+    connect: float = field(default_factory=lambda: c.TIMEOUT_CONNECT)
+    read: float = field(default_factory=lambda: c.TIMEOUT_READ)
+    total: float = field(default_factory=lambda: c.TIMEOUT_KEY_TOTAL)
+
+    def client_timeout(self) -> ClientTimeout:
+        return ClientTimeout(total=self.total, connect=self.connect, sock_read=self.read)
+
+
+@dataclass
+class PhaseTimeouts:
+    """Таймауты всех этапов: получение ключа, подпись, обмен на токен и общий бюджет обновления"""
+    key: HttpTimeouts = field(default_factory=lambda: HttpTimeouts(total=c.TIMEOUT_KEY_TOTAL))
+    token: HttpTimeouts = field(default_factory=lambda: HttpTimeouts(total=c.TIMEOUT_TOKEN_TOTAL))
+    sign: float = field(default_factory=lambda: c.TIMEOUT_SIGN)
+    refresh: float = field(default_factory=lambda: c.REFRESH_DEADLINE)
+
+
+class PhaseTimer:
+    """Замер времени этапов; при сбое current указывает этап, на котором он произошёл"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.current: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        self.current = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - started
+        self.current = None
@@ -1,34 +1,69 @@
-import win32com.client
+from typing import Iterable, List
+
+from .cert_index import CertificateIndex
+from .signer_backend import PAYLOAD_TEXT, SignerBackend, SignResult
+from .tracing import tracer
+
+
+def _dispatch(prog_id: str):
+    """COM-объект CryptoPro; win32com загружается при первом обращении, а не при импорте"""
+    import win32com.client
+
+    return win32com.client.Dispatch(prog_id)
+
+
+class CryptoProSigner(SignerBackend):
+    """Подписант на CryptoPro CAdESCOM (только Windows)"""
+
+    payload_format = PAYLOAD_TEXT  # CadesSignedData.Content — строка
 
-class CryptoProSigner:
     def __init__(self):
         self.store = None
         self.certificate = None
+        self.index = None
+        self._store_location = None
+        self._cp_signers = {}  # отпечаток сертификата → CAdESCOM.CPSigner
     
     def initialize_store(self, store_location=3):
         """
         Инициализация хранилища сертификатов для получения доступа к сертификатам
         store_location: 3 - Current User, 2 - Local Machine
         """
+        if self.store is not None and self._store_location == store_location:
+            return True  # хранилище уже открыто, повторно не открываем
         try:
-            self.store = win32com.client.Dispatch("CAdESCOM.Store")
+            self.store = _dispatch("CAdESCOM.Store")
             self.store.Open(store_location)
+            self._store_location = store_location
+            self.index = CertificateIndex(self.store)
             return True
         except Exception as e:
             print(f"Ошибка инициализации хранилища: {e}")
             return False
     
     def select_certificate(self, thumbprint=None):
+        with tracer.span("cryptopro.select_certificate", **{"certificate.thumbprint": thumbprint or ""}) as span:
+            selected = self._select_certificate(thumbprint)
+            span.set_attribute("certificate.found", selected)
+            return selected
+
+    def _select_certificate(self, thumbprint=None):
         try:
             if not self.store:
                 raise Exception("Хранилище не инициализировано")
 
-            certificates = self.store.Certificates
-
             if thumbprint:
-                certificates = certificates.Find(0, thumbprint, False)
-            else:
-                certificates = certificates.Find(1, "", False)
+                # По отпечатку — через индекс хранилища, без Find на каждый вызов
+                if self.index is None:
+                    self.index = CertificateIndex(self.store)
+                certificate = self.index.by_thumbprint(thumbprint)
+                if certificate is None:
+                    raise Exception("Сертификат не найден")
+                self.certificate = certificate
+                print(f"Выбран сертификат: {self.certificate.SubjectName}")
+                return True
+
+            certificates = self.store.Certificates.Find(1, "", False)
 
             # Сначала проверяем количество
             if certificates.Count == 0:
@@ -42,40 +77,108 @@ class CryptoProSigner:
         except Exception as e:
             print(f"Ошибка выбора сертификата: {e}")
             return False
-    
+
+    def select_certificate_by_inn(self, inn):
+        """
+        Выбор сертификата организации по ИНН из имени субъекта
+        через индекс хранилища (без Find на каждый вызов)
+        """
+        with tracer.span("cryptopro.select_certificate", inn=str(inn)) as span:
+            selected = self._select_certificate_by_inn(inn)
+            span.set_attribute("certificate.found", selected)
+            return selected
+
+    def _select_certificate_by_inn(self, inn):
+        try:
+            if not self.store:
+                raise Exception("Хранилище не инициализировано")
+            if self.index is None:
+                self.index = CertificateIndex(self.store)
+
+            certificate = self.index.by_inn(inn)
+            if certificate is None:
+                raise Exception(f"Сертификат для ИНН {inn} не найден")
+
+            self.certificate = certificate
+            return True
+
+        except Exception as e:
+            print(f"Ошибка выбора сертификата: {e}")
+            return False
+
     def sign_data(self, data_to_sign, detached=True):
         """
         Подписание данных
         """
+        with tracer.span("cryptopro.sign_data", **{"data.length": len(data_to_sign or "")}) as span:
+            signature = self._sign_data(data_to_sign, detached)
+            span.set_attribute("signature.created", signature is not None)
+            return signature
+
+    def _sign_data(self, data_to_sign, detached=True):
         try:
             if not self.certificate:
                 raise Exception("Сертификат не выбран")
-            
-            # Создание объекта для подписания
-            signed_data = win32com.client.Dispatch("CAdESCOM.CadesSignedData")
-            signed_data.Content = data_to_sign
-            
-            # Настройка подписи
-            signer = win32com.client.Dispatch("CAdESCOM.CPSigner")
-            signer.Certificate = self.certificate
-            
-            # Подписание
-            # 0 - CAdES BES
-            # 1 - CAdES-X Long Type 1  
-            signature = signed_data.SignCades(signer, 0, detached)
-            
-            return signature
+            return self._sign_with(self.certificate, data_to_sign, detached)
             
         except Exception as e:
             print(f"Ошибка подписания: {e}")
             return None
+
+    def _cp_signer(self, certificate):
+        """
+        Настройка подписи: CPSigner создаётся один раз на сертификат и переиспользуется
+        """
+        key = certificate.Thumbprint
+        signer = self._cp_signers.get(key)
+        if signer is None:
+            signer = _dispatch("CAdESCOM.CPSigner")
+            signer.Certificate = certificate
+            self._cp_signers[key] = signer
+        return signer
+
+    def _sign_with(self, certificate, data_to_sign, detached=True):
+        # CadesSignedData хранит состояние одной подписи, поэтому создаётся на каждые данные
+        signed_data = _dispatch("CAdESCOM.CadesSignedData")
+        signed_data.Content = data_to_sign
+
+        # Подписание
+        # 0 - CAdES BES
+        # 1 - CAdES-X Long Type 1  
+        try:
+            return signed_data.SignCades(self._cp_signer(certificate), 0, detached)
+        except Exception:
+            # Сертификат мог быть заменён или отозван: забываем CPSigner и перестраиваем индекс
+            self._cp_signers.pop(certificate.Thumbprint, None)
+            if self.index is not None:
+                self.index.invalidate()
+            raise
+
+    def sign_many(self, payloads: Iterable, detached=True) -> List[SignResult]:
+        """
+        Пакетное подписание выбранным сертификатом с одним CPSigner на весь пакет.
+        Результаты в порядке payloads; ошибка одного элемента не прерывает остальные
+        """
+        payloads = list(payloads)
+        with tracer.span("cryptopro.sign_many", **{"batch.size": len(payloads)}) as span:
+            if not self.certificate:
+                return [SignResult(None, "Сертификат не выбран") for _ in payloads]
+            results = []
+            for data in payloads:
+                try:
+                    results.append(SignResult(self._sign_with(self.certificate, data, detached)))
+                except Exception as e:
+                    print(f"Ошибка подписания: {e}")
+                    results.append(SignResult(None, str(e)))
+            span.set_attribute("batch.errors", sum(1 for result in results if not result.ok))
+            return results
     
     def verify_signature(self, signature, original_data=None):
         """
         Проверка подписи
         """
         try:
-            signed_data = win32com.client.Dispatch("CAdESCOM.CadesSignedData")
+            signed_data = _dispatch("CAdESCOM.CadesSignedData")
             
             if original_data:
                 signed_data.Content = original_data
@@ -95,4 +198,7 @@ class CryptoProSigner:
         if self.store:
             self.store.Close()
             self.store = None
+            self.index = None
+            self._store_location = None
+        self._cp_signers.clear()
 
@@ -0,0 +1,287 @@
+# src/token_cache.py
+
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from . import consts as c
+from .file_lock import file_lock
+from .logger_setup import logger
+
+
+@dataclass
+class CachedToken:
+    """Токен и момент его истечения (unix time)"""
+    token: str
+    expires_at: float
+
+    def is_valid(self, now: Optional[float] = None, skew: float = 0) -> bool:
+        now = time.time() if now is None else now
+        return self.expires_at - skew > now
+
+
+def parse_token_expiry(token: str) -> Optional[float]:
+    """Достаёт поле exp из JWT без проверки подписи; None, если токен не JWT"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class FileTokenBackend:
+    """Хранение токенов в локальном JSON-файле"""
+
+    def __init__(self, path=None):
+        self.path = Path(c.TOKEN_CACHE_PATH if path is None else path)
+
+    def load(self) -> Dict[str, CachedToken]:
+        """Новый словарь на каждый вызов: состояния между потоками нет, reload() из одного
+        потока не подменит записи, которые write() сливает в другом"""
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            return {key: CachedToken(**value) for key, value in raw.items()}
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Не удалось прочитать кэш токенов {self.path}: {e}")
+            return {}
+
+    def get(self, key: str) -> Optional[CachedToken]:
+        """Запись из файла, включая записанные другими процессами"""
+        return self.load().get(key)
+
+    def _save(self, entries: Dict[str, CachedToken]):
+        # Пишем в уникальный временный файл и подменяем, чтобы не оставить битый кэш при сбое
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({key: asdict(entry) for key, entry in entries.items()}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def write(self, puts: Dict[str, CachedToken], deletes: Iterable[str] = ()):
+        """Пачка изменений за одну перезапись файла"""
+        # Чтение, слияние и запись — под блокировкой, иначе процессы затрут изменения друг друга
+        with file_lock(self.path.with_name(self.path.name + ".lock")):
+            entries = self.load()
+            entries.update(puts)
+            for key in deletes:
+                entries.pop(key, None)
+            self._save(entries)
+
+    def put(self, key: str, entry: CachedToken):
+        self.write({key: entry})
+
+    def delete(self, *keys: str):
+        self.write({}, keys)
+
+
+class RedisTokenBackend:
+    """Хранение токенов в Redis; истёкшие ключи Redis удаляет сам"""
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "refresh_token:", client=None):
+        self.url = c.REDIS_URL if url is None else url
+        self.prefix = prefix
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis  # необязательная зависимость
+
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def load(self) -> Dict[str, CachedToken]:
+        entries = {}
+        for raw_key in self.client.scan_iter(match=self.prefix + "*"):
+            raw_value = self.client.get(raw_key)
+            if raw_value is None:
+                continue
+            key = raw_key.decode() if isinstance(raw_key, bytes) else raw_key
+            entries[key[len(self.prefix):]] = CachedToken(**json.loads(raw_value))
+        return entries
+
+    def get(self, key: str) -> Optional[CachedToken]:
+        raw_value = self.client.get(self.prefix + key)
+        return CachedToken(**json.loads(raw_value)) if raw_value is not None else None
+
+    def put(self, key: str, entry: CachedToken):
+        self.client.set(
+            self.prefix + key,
+            json.dumps(asdict(entry)),
+            pxat=int(entry.expires_at * 1000),
+        )
+
+    def delete(self, *keys: str):
+        self.client.delete(*(self.prefix + key for key in keys))
+
+    def write(self, puts: Dict[str, CachedToken], deletes: Iterable[str] = ()):
+        """Пачка изменений одним pipeline — один обмен с сервером"""
+        pipe = self.client.pipeline(transaction=False)
+        for key, entry in puts.items():
+            pipe.set(self.prefix + key, json.dumps(asdict(entry)), pxat=int(entry.expires_at * 1000))
+        deletes = [self.prefix + key for key in deletes]
+        if deletes:
+            pipe.delete(*deletes)
+        pipe.execute()
+
+
+class TokenCache:
+    """Кэш токенов по ИНН/отпечатку сертификата с учётом срока действия.
+
+    Изменения копятся в памяти и уходят в хранилище одной пачкой: внутри event loop —
+    через flush_delay секунд в отдельном потоке (aflush), вне его — сразу (flush)
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        default_ttl: Optional[float] = None,
+        skew: Optional[float] = None,
+        flush_delay: Optional[float] = None,
+    ):
+        self.backend = backend
+        self.default_ttl = c.TOKEN_DEFAULT_TTL if default_ttl is None else default_ttl
+        self.skew = c.TOKEN_EXPIRY_SKEW if skew is None else skew
+        self.flush_delay = c.TOKEN_CACHE_FLUSH_DELAY if flush_delay is None else flush_delay
+        self.hits = 0
+        self.misses = 0
+        self._dirty: Dict[str, Optional[CachedToken]] = {}  # ключ → новая запись или None (удаление)
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # сбросы по очереди, иначе старая пачка затрёт новую
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._entries: Dict[str, CachedToken] = backend.load() if backend else {}
+        self.evict_expired()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def peek(self, key: str) -> Optional[CachedToken]:
+        """Запись как есть, без учёта в статистике и без проверки срока"""
+        return self._entries.get(key)
+
+    def get_entry(self, key: str) -> Optional[CachedToken]:
+        """Действующая запись или None; истёкшая запись удаляется"""
+        entry = self._entries.get(key)
+        if entry is not None and not entry.is_valid(skew=self.skew):
+            self.delete(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry.token if entry else None
+
+    def reload(self, key: str) -> Optional[CachedToken]:
+        """Перечитывает запись из общего хранилища (её мог обновить другой узел).
+        Обращается к хранилищу синхронно — из event loop вызывать через поток"""
+        with self._dirty_lock:
+            unsaved = key in self._dirty
+        if not unsaved and self.backend is not None and hasattr(self.backend, "get"):
+            entry = self.backend.get(key)
+            if entry is None:
+                self._entries.pop(key, None)
+            else:
+                self._entries[key] = entry
+        return self._entries.get(key)
+
+    def put(self, key: str, token: str, expires_at: Optional[float] = None) -> CachedToken:
+        """Сохраняет токен; срок берётся из JWT, иначе default_ttl"""
+        if expires_at is None:
+            expires_at = parse_token_expiry(token) or time.time() + self.default_ttl
+        entry = CachedToken(token, expires_at)
+        self._entries[key] = entry
+        self._mark_dirty({key: entry})
+        return entry
+
+    def delete(self, key: str):
+        if self._entries.pop(key, None) is not None:
+            self._mark_dirty({key: None})
+
+    def evict_expired(self) -> int:
+        """Удаляет все истёкшие записи, возвращает их количество"""
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if not entry.is_valid(now, self.skew)]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._mark_dirty(dict.fromkeys(expired))
+        return len(expired)
+
+    def _mark_dirty(self, changes: Dict[str, Optional[CachedToken]]):
+        if not self.backend:
+            return
+        with self._dirty_lock:
+            self._dirty.update(changes)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()  # вне event loop блокировать некого
+            return
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_delay, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        self._flush_task = asyncio.ensure_future(self.aflush())
+
+    def flush(self):
+        """Записывает накопленные изменения в хранилище; при ошибке они остаются до следующего сброса"""
+        with self._flush_lock:
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, {}
+            if not dirty:
+                return
+            puts = {key: entry for key, entry in dirty.items() if entry is not None}
+            deletes = [key for key, entry in dirty.items() if entry is None]
+            try:
+                self.backend.write(puts, deletes)
+            except Exception as e:
+                logger.error(f"Не удалось сохранить кэш токенов: {e}")
+                with self._dirty_lock:
+                    for key, entry in dirty.items():
+                        self._dirty.setdefault(key, entry)
+
+    async def aflush(self):
+        """flush в отдельном потоке: файл и синхронный клиент Redis не блокируют event loop"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self.backend:
+            await asyncio.to_thread(self.flush)
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+def create_token_cache() -> TokenCache:
+    """Кэш с Redis, если задан REDIS_URL, иначе с файлом TOKEN_CACHE_PATH"""
+    if c.REDIS_URL:
+        return TokenCache(RedisTokenBackend(c.REDIS_URL))
+    return TokenCache(FileTokenBackend(c.TOKEN_CACHE_PATH))
@@ -0,0 +1,305 @@
+# src/tracing.py
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Protocol
+
+from aiohttp import TraceConfig
+
+from . import consts as c
+
+STATUS_OK = "OK"
+STATUS_ERROR = "ERROR"
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """Интервал трассировки в модели OpenTelemetry: trace_id/span_id в hex, время в наносекундах"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_time", "end_time",
+                 "attributes", "events", "status", "_tracer")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"] = None, attributes=None):
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.start_time = time.time_ns()
+        self.end_time: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[dict] = []
+        self.status = STATUS_OK
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes):
+        self.events.append({"name": name, "time": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.add_event("exception", **{"exception.type": type(error).__name__, "exception.message": str(error)})
+
+    def end(self):
+        if self.end_time is None:
+            self.end_time = time.time_ns()
+            self._tracer._export(self)
+
+    @property
+    def duration(self) -> float:
+        """Длительность в секундах"""
+        return ((self.end_time or time.time_ns()) - self.start_time) / 1e9
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start_time,
+            "end_time_unix_nano": self.end_time,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": self.status,
+        }
+
+
+class _NoopSpan:
+    """Заглушка при выключенной трассировке: вызовы ничего не стоят"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+    def record_exception(self, error):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter(Protocol):
+    """Получатель завершённых интервалов"""
+
+    def export(self, spans: List[Span]):
+        ...
+
+    def shutdown(self):
+        ...
+
+
+class InMemorySpanExporter:
+    """Хранит интервалы в памяти (для тестов)"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]):
+        self.spans.extend(spans)
+
+    def by_name(self, name: str) -> List[Span]:
+        return [span for span in self.spans if span.name == name]
+
+    def shutdown(self):
+        pass
+
+
+class FileSpanExporter:
+    """Пишет интервалы в файл JSON Lines пачками по batch_size, остаток — при shutdown.
+    Запись пачкой, а не по одному интервалу, чтобы не нагружать event loop файловым I/O"""
+
+    def __init__(self, path, batch_size: int = 256):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()  # подпись идёт в потоках пула
+
+    def export(self, spans: List[Span]):
+        with self._lock:
+            self._buffer.extend(span.to_dict() for span in spans)
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(line, ensure_ascii=False) + "\n" for line in lines)
+
+    def shutdown(self):
+        with self._lock:
+            self._flush()
+
+
+class Tracer:
+    """Создаёт интервалы и передаёт завершённые экспортёру; без экспортёра трассировка выключена.
+
+    exporter_factory: создаёт экспортёр при первом обращении (например, по настройкам)
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, exporter_factory=None):
+        self._exporter = exporter
+        self._exporter_factory = None if exporter is not None else exporter_factory
+
+    @property
+    def exporter(self) -> Optional[SpanExporter]:
+        if self._exporter_factory is not None:
+            factory, self._exporter_factory = self._exporter_factory, None
+            self._exporter = factory()
+        return self._exporter
+
+    @exporter.setter
+    def exporter(self, exporter: Optional[SpanExporter]):
+        self._exporter_factory = None
+        self._exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(self, name: str, attributes=None, parent: Optional[Span] = None):
+        """Интервал без смены текущего; завершается вызовом end()"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, parent or _current_span.get(), attributes)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Интервал вокруг блока; вложенные интервалы становятся его потомками"""
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        span = Span(self, name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def _export(self, span: Span):
+        if self.exporter is not None:
+            self.exporter.export([span])
+
+    def shutdown(self):
+        # Ещё не созданный экспортёр создавать ради остановки незачем
+        if self._exporter is not None:
+            self._exporter.shutdown()
+
+
+def _exporter_from_settings() -> Optional[SpanExporter]:
+    if not c.TRACE_EXPORT_PATH:
+        return None
+    # При выходе дописываем буфер экспортёра
+    atexit.register(lambda: tracer.shutdown())
+    return FileSpanExporter(c.TRACE_EXPORT_PATH)
+
+
+# Экспортёр из TRACE_EXPORT_PATH создаётся при первом интервале, а не при импорте
+tracer = Tracer(exporter_factory=_exporter_from_settings)
+
+
+def set_exporter(exporter: Optional[SpanExporter]):
+    """Подключает экспортёр (None — выключить трассировку); прежний дописывает буфер"""
+    tracer.shutdown()
+    tracer.exporter = exporter
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+def set_attribute(key: str, value):
+    """Атрибут текущего интервала (если трассировка включена)"""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+
+# Время соединения из событий aiohttp: DNS, установка TCP/TLS, повторное использование keep-alive
+
+async def _on_request_start(session, ctx, params):
+    ctx.span = tracer.start_span(
+        "http.request", {"http.method": params.method, "http.url": str(params.url)}
+    )
+    ctx.marks = {}
+
+
+async def _on_dns_start(session, ctx, params):
+    ctx.marks["dns"] = time.perf_counter()
+
+
+async def _on_dns_end(session, ctx, params):
+    ctx.span.set_attribute("http.dns_ms", (time.perf_counter() - ctx.marks.pop("dns")) * 1000)
+
+
+async def _on_dns_cache_hit(session, ctx, params):
+    ctx.span.set_attribute("http.dns_cache_hit", True)
+
+
+async def _on_connection_create_start(session, ctx, params):
+    ctx.marks["connect"] = time.perf_counter()
+
+
+async def _on_connection_create_end(session, ctx, params):
+    ctx.span.set_attribute("http.connect_ms", (time.perf_counter() - ctx.marks.pop("connect")) * 1000)
+    ctx.span.set_attribute("http.connection_reused", False)
+
+
+async def _on_connection_reuse(session, ctx, params):
+    ctx.span.set_attribute("http.connection_reused", True)
+
+
+async def _on_connection_queued_start(session, ctx, params):
+    ctx.marks["queued"] = time.perf_counter()
+
+
+async def _on_connection_queued_end(session, ctx, params):
+    ctx.span.set_attribute("http.pool_wait_ms", (time.perf_counter() - ctx.marks.pop("queued")) * 1000)
+
+
+async def _on_request_end(session, ctx, params):
+    ctx.span.set_attribute("http.status_code", params.response.status)
+    ctx.span.end()
+
+
+async def _on_request_exception(session, ctx, params):
+    ctx.span.record_exception(params.exception)
+    ctx.span.end()
+
+
+def create_trace_config() -> TraceConfig:
+    """TraceConfig для ClientSession: на каждый HTTP-запрос — интервал http.request с временем соединения"""
+    trace_config = TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx=None: SimpleNamespace())
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_dns_resolvehost_start.append(_on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(_on_dns_end)
+    trace_config.on_dns_cache_hit.append(_on_dns_cache_hit)
+    trace_config.on_connection_create_start.append(_on_connection_create_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuse)
+    trace_config.on_connection_queued_start.append(_on_connection_queued_start)
+    trace_config.on_connection_queued_end.append(_on_connection_queued_end)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return trace_config
@@ -0,0 +1,22 @@
+# Moke tests/conftest.py
+
+import os
+import pytest
+from src.consts import reload_settings
+from src.logger_setup import configure_logging, shutdown_logging
+
+
+@pytest.fixture(autouse=True, scope="session")
+def log_file_in_tmp(tmp_path_factory):
+    """Лог тестов пишется во временный каталог, а не в app_errors.log в корне репозитория"""
+    previous = os.environ.get("LOG_FILE_PATH")
+    os.environ["LOG_FILE_PATH"] = str(tmp_path_factory.mktemp("logs") / "app_errors.log")
+    reload_settings()
+    configure_logging()
+    yield
+    shutdown_logging()
+    if previous is None:
+        os.environ.pop("LOG_FILE_PATH", None)
+    else:
+        os.environ["LOG_FILE_PATH"] = previous
+    reload_settings()
@@ -2,6 +2,7 @@
 
 import pytest
 import asyncio
+import base64
 import logging
 from unittest.mock import patch
 from fastapi import HTTPException
@@ -94,12 +95,11 @@ class TestAsyncAPIHandler:
 
     # === Тесты для decode_data ===
 
-    @pytest.mark.asyncio
-    async def test_decode_data_success(self, caplog):
+    def test_decode_data_success(self, caplog):
         """Проверка успешного кодирования """
         data = "Hello"
         with caplog.at_level(logging.ERROR):
-            result = await Handler.decode_data(data)
+            result = Handler.decode_data(data)
             assert len(result) > 0  
             
 
@@ -110,7 +110,7 @@ class TestAsyncAPIHandler:
     async def test_get_auth_token_success(self, mock_aiohttp_session):
         """Успешное получение токена"""
         mock_uuid = "7375daeb-4427-48d8-919d-276073fc4e7f"
-        mock_signature = await Handler.decode_data("await Handler.decode_data")
+        mock_signature = Handler.decode_data("Handler.decode_data", send.PAYLOAD_TEXT)
 
         mock_aiohttp_session.post(
             "https://api.mdlp.crpt.ru/api/v1/token",
@@ -130,4 +130,27 @@ class TestAsyncAPIHandler:
         with caplog.at_level(logging.ERROR):
             result = await send.get_auth_token(uuid_val="uuid", signature="data")
             assert result is None
-            assert "Token request failed" in caplog.text
\ No newline at end of file
+            assert "Token request failed" in caplog.text
+
+class TestEncodeChallenge:
+
+    def test_formats(self):
+        """bytes для подписанта на байтах, str — для CryptoPro"""
+        assert send.encode_challenge("Привет") == base64.b64encode("Привет".encode("utf-8"))
+        assert send.encode_challenge("Привет", send.PAYLOAD_TEXT) == base64.b64encode("Привет".encode("utf-8")).decode("ascii")
+
+    def test_bytes_like_input(self):
+        raw = b"challenge-data"
+        expected = base64.b64encode(raw)
+        assert send.encode_challenge(raw) == expected
+        assert send.encode_challenge(memoryview(raw)) == expected
+
+    def test_empty_and_invalid(self, caplog):
+        assert send.encode_challenge(None) == b""
+        assert send.encode_challenge("", send.PAYLOAD_TEXT) == ""
+        with caplog.at_level(logging.ERROR):
+            assert send.encode_challenge(123) == b""  # type: ignore[arg-type]
+        assert "Base64" in caplog.text
+
+    def test_batch(self):
+        assert send.encode_challenges(["a", b"b", memoryview(b"c")], send.PAYLOAD_TEXT) == ["YQ==", "Yg==", "Yw=="]
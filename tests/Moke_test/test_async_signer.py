@@ -0,0 +1,115 @@
+# Moke tests/test_async_signer.py
+
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from src.async_signer import AsyncSigner
+from src.signer_backend import SignResult
+
+
+class SlowSigner:
+    """Подписант, блокирующий поток как синхронный COM-вызов"""
+
+    created = []
+
+    def __init__(self):
+        self.thread = None
+        self.closed = False
+        SlowSigner.created.append(self)
+
+    def initialize_store(self, store_location=3):
+        self.thread = threading.get_ident()
+        return True
+
+    def select_certificate_by_inn(self, inn):
+        return inn != "unknown"
+
+    def sign_data(self, data, detached=True):
+        time.sleep(0.05)
+        assert threading.get_ident() == self.thread
+        return f"signed:{data}"
+
+    def close(self):
+        self.closed = True
+
+
+class TestAsyncSigner:
+
+    def setup_method(self):
+        SlowSigner.created = []
+
+    @pytest.mark.asyncio
+    async def test_sign_does_not_block_event_loop(self):
+        """Во время подписи event loop продолжает работу"""
+        signer = AsyncSigner(signer_factory=SlowSigner, max_workers=1)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.create_task(ticker())
+        assert await signer.sign("1", "data") == "signed:data"
+        task.cancel()
+        signer.close()
+        assert ticks > 3
+
+    @pytest.mark.asyncio
+    async def test_one_signer_per_worker_thread(self):
+        """Каждый поток создаёт собственный подписант, пул ограничен"""
+        signer = AsyncSigner(signer_factory=SlowSigner, max_workers=2)
+        results = await asyncio.gather(*(signer.sign(str(i), "d") for i in range(6)))
+        signer.close()
+
+        assert results == ["signed:d"] * 6
+        assert len(SlowSigner.created) <= 2
+        assert all(s.closed for s in SlowSigner.created)
+
+    @pytest.mark.asyncio
+    async def test_certificate_not_found(self):
+        signer = AsyncSigner(signer_factory=SlowSigner, max_workers=1)
+        assert await signer.sign("unknown", "data") is None
+        signer.close()
+
+    @pytest.mark.asyncio
+    async def test_store_initialization_failure(self):
+        """Ошибка открытия хранилища возвращает None"""
+        broken = MagicMock()
+        broken.initialize_store.return_value = False
+        signer = AsyncSigner(signer_factory=lambda: broken, max_workers=1)
+        assert await signer.sign("1", "data") is None
+        signer.close()
+
+    @pytest.mark.asyncio
+    async def test_sign_many_async_iterator(self):
+        """Асинхронный поток данных подписывается частями, порядок сохраняется"""
+        backend = MagicMock()
+        backend.initialize_store.return_value = True
+        backend.select_certificate_by_inn.return_value = True
+        backend.sign_many.side_effect = lambda payloads, detached: [SignResult(f"s:{p}") for p in payloads]
+        signer = AsyncSigner(signer_factory=lambda: backend, max_workers=1)
+
+        async def payloads():
+            for i in range(5):
+                yield str(i)
+
+        results = await signer.sign_many("1", payloads(), chunk_size=2)
+        signer.close()
+
+        assert [r.signature for r in results] == ["s:0", "s:1", "s:2", "s:3", "s:4"]
+        assert [len(call.args[0]) for call in backend.sign_many.call_args_list] == [2, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_sign_many_fallback_and_errors(self):
+        """Бэкенд без sign_many подписывает по одному; нет сертификата — ошибка у каждого элемента"""
+        signer = AsyncSigner(signer_factory=SlowSigner, max_workers=1)
+        results = await signer.sign_many("1", ["a", "b"])
+        missing = await signer.sign_many("unknown", ["a", "b"])
+        signer.close()
+
+        assert [r.signature for r in results] == ["signed:a", "signed:b"]
+        assert all(not r.ok and "unknown" in r.error for r in missing)
@@ -0,0 +1,110 @@
+# Moke tests/test_batch_refresh.py
+
+import asyncio
+import time
+import pytest
+import aioresponses
+from unittest.mock import MagicMock
+from src.async_signer import AsyncSigner
+from src.batch_refresh import BatchRefresher, load_organizations
+from src.token_cache import TokenCache
+
+KEY_URL = "https://test-api.com/auth/key"
+TOKEN_URL = "https://api.mdlp.crpt.ru/api/v1/token"
+
+
+class TestLoadOrganizations:
+
+    def test_deduplicates_inn(self, tmp_path):
+        """Повторные ИНН попадают в результат один раз"""
+        path = tmp_path / "organization.json"
+        path.write_text(
+            '"ИП Кузнецов А.В.":644402604072\n'
+            '"ИП Елудин Роман Иванович":645209152711\n'
+            '"ИП Кузнецов А.В.":644402604072\n\n',
+            encoding="utf-8",
+        )
+        result = load_organizations(path)
+        assert list(result) == ["644402604072", "645209152711"]
+        assert result["644402604072"] == "ИП Кузнецов А.В."
+
+    def test_project_file(self):
+        """Файл проекта читается, дубликаты убраны"""
+        result = load_organizations("organization.json")
+        assert len(result) == 17
+
+
+class TestBatchRefresher:
+
+    @pytest.fixture
+    def com_signer(self):
+        com_signer = MagicMock()
+        com_signer.initialize_store.return_value = True
+        com_signer.select_certificate_by_inn.return_value = True
+        com_signer.sign_data.return_value = "signature"
+        return com_signer
+
+    @pytest.fixture
+    def signer(self, com_signer):
+        signer = AsyncSigner(signer_factory=lambda: com_signer, max_workers=2)
+        yield signer
+        signer.close()
+
+    @pytest.fixture
+    def mock_api(self):
+        with aioresponses.aioresponses() as m:
+            yield m
+
+    @pytest.mark.asyncio
+    async def test_refresh_all_success(self, signer, mock_api):
+        """Токены получены для всех уникальных ИНН"""
+        mock_api.get(KEY_URL, payload={"uuid": "u1", "data": "challenge"}, repeat=True)
+        mock_api.post(TOKEN_URL, payload={"token": "abc"}, repeat=True)
+
+        cache = TokenCache()
+        async with BatchRefresher(signer, key_url=KEY_URL, concurrency=2, cache=cache) as refresher:
+            results = await refresher.refresh_all(["1", "2", "1"])
+
+        assert set(results) == {"1", "2"}
+        assert all(r.ok for r in results.values())
+        assert results["1"].token == {"token": "abc"}
+        assert cache.get("2") == "abc"
+
+    @pytest.mark.asyncio
+    async def test_refresh_one_sign_failure(self, signer, com_signer, mock_api):
+        """Ошибка выбора сертификата не ломает остальные организации"""
+        mock_api.get(KEY_URL, payload={"uuid": "u1", "data": "challenge"}, repeat=True)
+        com_signer.select_certificate_by_inn.return_value = False
+
+        async with BatchRefresher(signer, key_url=KEY_URL) as refresher:
+            result = await refresher.refresh_one("1")
+
+        assert not result.ok
+        assert result.error == "Подпись не создана"
+
+    @pytest.mark.asyncio
+    async def test_refresh_one_key_error(self, signer, mock_api):
+        """Ошибка получения challenge возвращается в результате"""
+        mock_api.get(KEY_URL, payload={"message": "Ошибка сервера"}, status=400)
+
+        async with BatchRefresher(signer, key_url=KEY_URL) as refresher:
+            result = await refresher.refresh_one("1")
+
+        assert not result.ok
+        assert result.error == "Ошибка сервера"
+
+    @pytest.mark.asyncio
+    async def test_refresh_all_runs_concurrently(self, signer, monkeypatch):
+        """Время пакета определяется самой медленной организацией"""
+        async def slow_refresh(self, inn):
+            await asyncio.sleep(0.1)
+            return MagicMock(inn=inn)
+
+        monkeypatch.setattr(BatchRefresher, "refresh_one", slow_refresh)
+        refresher = BatchRefresher(signer, concurrency=10)
+
+        started = time.perf_counter()
+        results = await refresher.refresh_all([str(i) for i in range(10)])
+
+        assert len(results) == 10
+        assert time.perf_counter() - started < 0.5
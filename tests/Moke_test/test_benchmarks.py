@@ -0,0 +1,61 @@
+# Moke tests/test_benchmarks.py
+
+import aiohttp
+import pytest
+from benchmarks.mock_api import MockTrueAPI
+from benchmarks.run_refresh import parse_args, percentile, run_benchmark
+from src.token_cache import parse_token_expiry
+
+
+class TestMockTrueAPI:
+
+    @pytest.mark.asyncio
+    async def test_challenge_is_single_use(self):
+        async with MockTrueAPI() as api, aiohttp.ClientSession() as session:
+            async with session.get(api.key_url) as response:
+                challenge = await response.json()
+            body = {"code": challenge["uuid"], "signature": "c2ln"}
+            async with session.post(api.token_url, json=body) as response:
+                assert response.status == 200
+                assert parse_token_expiry((await response.json())["token"]) is not None
+            async with session.post(api.token_url, json=body) as response:
+                assert response.status == 401
+
+    @pytest.mark.asyncio
+    async def test_throttle_injection(self):
+        async with MockTrueAPI(throttle_rate=1.0, retry_after=2) as api, aiohttp.ClientSession() as session:
+            async with session.get(api.key_url) as response:
+                assert response.status == 429
+                assert response.headers["Retry-After"] == "2"
+        assert api.stats.throttled == 1
+
+
+class TestRunBenchmark:
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 95) == 0.0
+
+    @pytest.mark.asyncio
+    async def test_full_flow(self):
+        report = await run_benchmark(organizations=20, concurrency=5)
+
+        assert report.succeeded == 20 and report.failed == 0
+        assert report.throughput > 0
+        assert report.latency["p50"] <= report.latency["p99"]
+        assert set(report.phases) == {"key", "sign", "token"}
+        assert report.peak_memory_mb > 0
+        assert report.api["token_requests"] == 20
+
+    @pytest.mark.asyncio
+    async def test_throttled_requests_are_retried(self):
+        report = await run_benchmark(organizations=10, concurrency=5, pipelined=True, throttle_rate=0.2, seed=7)
+
+        assert report.api["throttled"] > 0
+        assert report.succeeded == 10
+
+    def test_orgs_bounds(self):
+        with pytest.raises(SystemExit):
+            parse_args(["--orgs", "10001"])
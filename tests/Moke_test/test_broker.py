@@ -0,0 +1,83 @@
+# Moke tests/test_broker.py
+
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from src.batch_refresh import BatchRefresher, RefreshResult
+from src.broker import create_app
+from src.token_cache import TokenCache
+
+ORGANIZATIONS = {"644402604072": "ИП Кузнецов А.В.", "645209152711": "ИП Елудин Роман Иванович"}
+
+
+class FakeRefresher(BatchRefresher):
+    """Обновление без сети и подписи; ИНН из fail завершаются ошибкой"""
+
+    def __init__(self, fail=()):
+        super().__init__(signer=None)
+        self.fail = set(fail)
+        self.calls = []
+
+    async def refresh_one(self, inn):
+        self.calls.append(inn)
+        await asyncio.sleep(0.01)
+        if inn in self.fail:
+            return RefreshResult(inn, error="Подпись не создана")
+        self.cache.put(inn, f"token-{inn}", expires_at=time.time() + 3600)
+        return RefreshResult(inn, token={"token": f"token-{inn}"})
+
+
+@pytest.fixture
+def refresher():
+    return FakeRefresher(fail={"645209152711"})
+
+
+@pytest.fixture
+def client(refresher):
+    app = create_app(refresher=refresher, cache=TokenCache(), organizations=ORGANIZATIONS)
+    with TestClient(app) as client:
+        yield client
+
+
+class TestBroker:
+
+    def test_get_token_refreshes_then_serves_cache(self, client, refresher):
+        """Первый запрос обновляет токен, следующий отдаётся из кэша"""
+        first = client.get("/token/644402604072")
+        second = client.get("/token/644402604072")
+
+        assert first.status_code == 200
+        assert first.json()["token"] == "token-644402604072"
+        assert second.json() == first.json()
+        assert refresher.calls == ["644402604072"]
+
+    def test_get_token_refresh_error(self, client):
+        response = client.get("/token/645209152711")
+        assert response.status_code == 502
+        assert response.json()["detail"] == "Подпись не создана"
+
+    def test_unknown_inn(self, client):
+        assert client.get("/token/000000000000").status_code == 404
+
+    def test_bulk_refresh(self, client):
+        """Без тела обновляются все организации"""
+        response = client.post("/refresh")
+        body = response.json()
+
+        assert response.status_code == 200
+        assert body["644402604072"]["ok"] is True
+        assert body["645209152711"] == {"ok": False, "error": "Подпись не создана", "timings": {}}
+
+    def test_bulk_refresh_selected(self, client, refresher):
+        response = client.post("/refresh", json={"inns": ["644402604072"]})
+        assert list(response.json()) == ["644402604072"]
+        assert refresher.calls == ["644402604072"]
+
+    def test_health(self, client):
+        client.get("/token/644402604072")
+        body = client.get("/health").json()
+
+        assert body["status"] == "ok"
+        assert body["organizations"] == 2
+        assert body["cache"]["size"] == 1
@@ -0,0 +1,143 @@
+# Moke tests/test_cert_index.py
+
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from src.cert_index import CertificateIndex, parse_subject_inns
+from src.to_sign_data import CryptoProSigner
+
+
+def make_cert(thumbprint, serial, subject):
+    cert = MagicMock()
+    cert.Thumbprint = thumbprint
+    cert.SerialNumber = serial
+    cert.SubjectName = subject
+    return cert
+
+
+class FakeCertificates:
+    """Коллекция Certificates с нумерацией с 1, как в COM"""
+
+    def __init__(self, certs):
+        self.certs = certs
+        self.item_calls = 0
+
+    @property
+    def Count(self):
+        return len(self.certs)
+
+    def Item(self, position):
+        self.item_calls += 1
+        return self.certs[position - 1]
+
+
+class TestParseSubjectInns:
+
+    def test_cryptopro_subject(self):
+        subject = 'ИНН=644402604072, ОГРНИП=304644434700094, CN=Кузнецов А.В.'
+        assert parse_subject_inns(subject) == ["644402604072"]
+
+    def test_legal_entity_and_oid(self):
+        subject = 'OID.1.2.643.100.4=6450000000, INN=006450000000, CN=ООО'
+        assert parse_subject_inns(subject) == ["6450000000", "006450000000"]
+
+    def test_no_inn(self):
+        assert parse_subject_inns("CN=Test") == []
+
+
+class TestCertificateIndex:
+
+    def setup_method(self):
+        self.certs = FakeCertificates([
+            make_cert("AB CD", "01", "ИНН=644402604072, CN=A"),
+            make_cert("EF01", "02", "ИНН=645209152711, CN=B"),
+        ])
+        self.store = MagicMock()
+        self.store.Certificates = self.certs
+
+    def test_enumerates_store_once(self):
+        """Повторные поиски не перечисляют хранилище заново"""
+        index = CertificateIndex(self.store)
+        assert index.by_inn("644402604072") is self.certs.certs[0]
+        assert index.by_thumbprint("ef01") is self.certs.certs[1]
+        assert index.by_serial("01") is self.certs.certs[0]
+        assert index.by_thumbprint("abcd") is self.certs.certs[0]
+        assert self.certs.item_calls == 2
+
+    def test_rebuilds_when_store_changes(self):
+        """Новый сертификат находится после изменения хранилища"""
+        index = CertificateIndex(self.store)
+        assert index.by_inn("645318572610") is None
+
+        new_cert = make_cert("99", "03", "ИНН=645318572610, CN=C")
+        self.certs.certs.append(new_cert)
+
+        assert index.by_inn("645318572610") is new_cert
+        assert len(index) == 3
+
+    def test_rebuilds_when_certificate_renewed(self):
+        """Продлённый сертификат с тем же ИНН не меняет Count, но находится после сверки отпечатков"""
+        index = CertificateIndex(self.store, check_interval=0)
+        assert index.by_inn("644402604072") is self.certs.certs[0]
+
+        renewed = make_cert("1234", "04", "ИНН=644402604072, CN=A")
+        self.certs.certs[0] = renewed
+
+        assert index.by_inn("644402604072") is renewed
+        assert index.by_thumbprint("abcd") is None
+
+    def test_prefers_valid_certificate_for_inn(self):
+        """Старый и продлённый сертификаты лежат рядом — для ИНН выбирается действующий с ключом"""
+        now = datetime.now()
+        expired = make_cert("01", "11", "ИНН=644402604072, CN=A")
+        expired.ValidFromDate, expired.ValidToDate = now - timedelta(days=400), now - timedelta(days=1)
+        no_key = make_cert("02", "12", "ИНН=644402604072, CN=A")
+        no_key.ValidFromDate, no_key.ValidToDate = now - timedelta(days=1), now + timedelta(days=700)
+        no_key.HasPrivateKey.return_value = False
+        renewed = make_cert("03", "13", "ИНН=644402604072, CN=A")
+        renewed.ValidFromDate, renewed.ValidToDate = now - timedelta(days=1), now + timedelta(days=364)
+        renewed.HasPrivateKey.return_value = True
+        self.store.Certificates = FakeCertificates([expired, no_key, renewed])
+
+        assert CertificateIndex(self.store).by_inn("644402604072") is renewed
+
+    def test_invalidate_forces_rebuild(self):
+        index = CertificateIndex(self.store)
+        index.by_inn("644402604072")
+        renewed = make_cert("1234", "04", "ИНН=644402604072, CN=A")
+        self.certs.certs[0] = renewed
+
+        index.invalidate()
+
+        assert index.by_inn("644402604072") is renewed
+
+    def test_missing_certificate(self):
+        index = CertificateIndex(self.store)
+        assert index.by_inn("000000000000") is None
+
+
+class TestCryptoProSignerIndex:
+
+    @patch("win32com.client.Dispatch")
+    def test_select_certificate_by_inn_uses_index(self, mock_dispatch):
+        """Выбор по ИНН идёт через индекс, без Find"""
+        store = MagicMock()
+        certs = FakeCertificates([make_cert("AB", "01", "ИНН=644402604072, CN=A")])
+        store.Certificates = certs
+        mock_dispatch.return_value = store
+
+        signer = CryptoProSigner()
+        assert signer.initialize_store() is True
+        assert signer.select_certificate_by_inn("644402604072") is True
+        assert signer.select_certificate_by_inn("644402604072") is True
+
+        assert signer.certificate is certs.certs[0]
+        assert certs.item_calls == 1
+        assert signer.select_certificate_by_inn("000000000000") is False
+
+    @patch("win32com.client.Dispatch")
+    def test_initialize_store_opens_once(self, mock_dispatch):
+        """Повторная инициализация не открывает хранилище заново"""
+        signer = CryptoProSigner()
+        signer.initialize_store()
+        signer.initialize_store()
+        assert mock_dispatch.call_count == 1
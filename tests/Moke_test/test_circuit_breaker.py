@@ -0,0 +1,118 @@
+# Moke tests/test_circuit_breaker.py
+
+import asyncio
+import pytest
+import aioresponses
+from aiohttp import ClientError
+from fastapi import HTTPException
+from src import send_request as send
+from src.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers, CircuitOpenError
+from src.send_request import AsyncAPIHandler as Handler
+
+
+async def fail():
+    raise ClientError("connection refused")
+
+
+async def ok():
+    return "ok"
+
+
+async def bad_request():
+    raise HTTPException(status_code=400)
+
+
+class TestCircuitBreaker:
+
+    @pytest.mark.asyncio
+    async def test_opens_after_threshold(self):
+        breaker = CircuitBreaker("a.ru", failure_threshold=2, reset_timeout=60)
+        for _ in range(2):
+            with pytest.raises(ClientError):
+                await breaker.call(fail)
+        assert breaker.state == OPEN
+
+        with pytest.raises(CircuitOpenError) as exc_info:
+            await breaker.call(ok)
+        assert exc_info.value.retry_after > 0
+
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_open(self):
+        """Ответы 4xx не считаются сбоем хоста"""
+        breaker = CircuitBreaker("a.ru", failure_threshold=1)
+        with pytest.raises(HTTPException):
+            await breaker.call(bad_request)
+        assert breaker.state == CLOSED
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_closes(self):
+        """После cool-down пробный запрос закрывает breaker"""
+        breaker = CircuitBreaker("a.ru", failure_threshold=1, reset_timeout=0.01)
+        with pytest.raises(ClientError):
+            await breaker.call(fail)
+        await asyncio.sleep(0.02)
+
+        assert await breaker.call(ok) == "ok"
+        assert breaker.state == CLOSED
+
+    @pytest.mark.asyncio
+    async def test_half_open_limits_probes(self):
+        """В half-open пропускается только ограниченное число проб"""
+        breaker = CircuitBreaker("a.ru", failure_threshold=1, reset_timeout=0.01, half_open_max_calls=1)
+        with pytest.raises(ClientError):
+            await breaker.call(fail)
+        await asyncio.sleep(0.02)
+
+        async def slow():
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        probe = asyncio.ensure_future(breaker.call(slow))
+        await asyncio.sleep(0)
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(ok)
+        assert await probe == "ok"
+
+    @pytest.mark.asyncio
+    async def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker("a.ru", failure_threshold=3, reset_timeout=0.01)
+        breaker.state, breaker.failures = OPEN, 3
+        await asyncio.sleep(0.02)
+        with pytest.raises(ClientError):
+            await breaker.call(fail)
+        assert breaker.state == OPEN
+
+    def test_registry_per_host(self):
+        breakers = CircuitBreakers()
+        assert breakers.for_url("https://a.ru/x") is breakers.for_url("https://a.ru/y")
+        assert breakers.for_url("https://a.ru/x") is not breakers.for_url("https://b.ru/x")
+
+
+class TestCircuitBreakerIntegration:
+
+    @pytest.mark.asyncio
+    async def test_make_request_fails_fast_when_open(self):
+        """При открытом breaker запрос к сети не уходит"""
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+        with aioresponses.aioresponses() as m:
+            m.get("https://test-api.com", exception=ClientError("down"))
+            async with Handler(base_url="https://test-api.com", circuit_breakers=breakers) as ctx:
+                with pytest.raises(HTTPException):
+                    await ctx._make_request()
+                with pytest.raises(HTTPException) as exc_info:
+                    await ctx._make_request()
+
+        assert exc_info.value.status_code == 503
+        assert "circuit open" in exc_info.value.detail
+        assert int(exc_info.value.headers["Retry-After"]) > 0
+
+    @pytest.mark.asyncio
+    async def test_get_auth_token_returns_none_when_open(self, caplog):
+        breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+        breakers.for_url("https://api.mdlp.crpt.ru").record_failure()
+
+        result = await send.get_auth_token("uuid", "sig", circuit_breakers=breakers)
+
+        assert result is None
+        assert "Circuit open" in caplog.text
@@ -0,0 +1,83 @@
+# Moke tests/test_consts.py
+
+import subprocess
+import sys
+import pytest
+from src import consts as c
+
+
+def run_python(code: str, cwd) -> str:
+    """Выполняет код в отдельном интерпретаторе: sys.modules текущего процесса уже «загрязнён» тестами"""
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, timeout=60,
+        env={"PYTHONPATH": ":".join(sys.path), "PATH": ""},
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+@pytest.fixture
+def settings_env(monkeypatch):
+    """Изменения окружения видны после reload_settings; после теста настройки перечитываются"""
+    yield monkeypatch
+    monkeypatch.undo()
+    c.reload_settings()
+
+
+class TestSettings:
+
+    def test_reload_picks_up_environment(self, settings_env):
+        settings_env.setenv("MAX_CONCURRENCY", "25")
+        settings_env.setenv("SIGNER_BACKEND", "LOCAL")
+        c.reload_settings()
+
+        assert c.MAX_CONCURRENCY == 25
+        assert c.get_settings().SIGNER_BACKEND == "local"
+        assert c.get_settings() is c.get_settings()  # читается один раз
+
+    def test_invalid_values_reported_together(self, settings_env):
+        settings_env.setenv("MAX_CONCURRENCY", "0")
+        settings_env.setenv("LOG_FORMAT", "xml")
+        with pytest.raises(ValueError) as error:
+            c.reload_settings()
+
+        assert "MAX_CONCURRENCY" in str(error.value) and "LOG_FORMAT" in str(error.value)
+
+    def test_unparsable_number(self, settings_env):
+        settings_env.setenv("HTTP_LIMIT", "много")
+        with pytest.raises(ValueError, match="Некорректная конфигурация"):
+            c.reload_settings()
+
+    def test_unknown_attribute(self):
+        with pytest.raises(AttributeError):
+            c.NOT_A_SETTING
+
+
+class TestLazyImport:
+
+    def test_import_has_no_side_effects(self, tmp_path):
+        """Импорт модулей не читает .env, не создаёт файл лога и не загружает FastAPI и win32com"""
+        (tmp_path / ".env").write_text("MAX_CONCURRENCY=0\n")
+        output = run_python(
+            "import sys\n"
+            "import src.send_request, src.batch_refresh, src.to_sign_data, src.logger_setup, src.tracing, src.metrics\n"
+            "from src import consts\n"
+            "print(consts.get_settings.cache_info().misses,"
+            " *(name in sys.modules for name in ('fastapi', 'win32com', 'dotenv', 'aiohttp.web')))",
+            tmp_path,
+        )
+        assert output == "0 False False False False"
+        assert list(tmp_path.iterdir()) == [tmp_path / ".env"]
+
+    def test_first_record_configures_logging(self, tmp_path):
+        """Логирование настраивается при первой записи, и эта запись попадает в файл"""
+        log_path = tmp_path / "app.log"
+        code = (
+            "import os\n"
+            f"os.environ['LOG_FILE_PATH'] = {str(log_path)!r}\n"
+            "from src.logger_setup import logger, shutdown_logging\n"
+            "logger.error('первая запись')\n"
+            "shutdown_logging()\n"
+        )
+        run_python(code, tmp_path)
+        assert "первая запись" in log_path.read_text(encoding="utf-8")
@@ -0,0 +1,47 @@
+# Moke tests/test_http_session.py
+
+import pytest
+import aioresponses
+from src import send_request as send
+from src.http_session import SessionManager
+from src.send_request import AsyncAPIHandler as Handler
+
+
+class TestSessionManager:
+
+    @pytest.mark.asyncio
+    async def test_session_is_reused(self):
+        """Повторные обращения возвращают одну и ту же сессию"""
+        async with SessionManager(limit_per_host=5) as pool:
+            first = pool.session
+            assert pool.session is first
+            assert first.connector.limit_per_host == 5
+        assert first.closed
+
+    @pytest.mark.asyncio
+    async def test_session_recreated_after_close(self):
+        """После закрытия пул создаёт новую сессию"""
+        pool = SessionManager()
+        first = pool.session
+        await pool.close()
+        second = pool.session
+        assert second is not first
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_handler_does_not_close_shared_session(self):
+        """AsyncAPIHandler не закрывает сессию пула"""
+        async with SessionManager() as pool:
+            async with Handler(base_url="https://test-api.com", session=pool.session) as ctx:
+                assert ctx.session is pool.session
+            assert not pool.session.closed
+
+    @pytest.mark.asyncio
+    async def test_get_auth_token_uses_shared_session(self):
+        """get_auth_token работает через переданную сессию и не закрывает её"""
+        with aioresponses.aioresponses() as m:
+            m.post("https://api.mdlp.crpt.ru/api/v1/token", payload={"token": "abc"})
+            async with SessionManager() as pool:
+                result = await send.get_auth_token("uuid", "sig", session=pool.session)
+                assert result == {"token": "abc"}
+                assert not pool.session.closed
@@ -0,0 +1,213 @@
+# Moke tests/test_leases.py
+
+import asyncio
+import json
+import threading
+import time
+import pytest
+from src.batch_refresh import RefreshResult
+from src.leases import FileLeaseBackend, LeasedRefresher, RedisLeaseBackend
+from src.token_cache import CachedToken, FileTokenBackend, TokenCache
+
+
+class FakeRedis:
+    """Локальная замена Redis: SET NX PX, GET и два Lua-скрипта RedisLeaseBackend"""
+
+    def __init__(self):
+        self.data = {}
+
+    def _alive(self, key):
+        value = self.data.get(key)
+        if value is not None and value[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and self._alive(key) is not None:
+            return None
+        self.data[key] = (value.encode(), time.monotonic() + px / 1000)
+        return True
+
+    def get(self, key):
+        value = self._alive(key)
+        return value[0] if value else None
+
+    def eval(self, script, numkeys, key, owner, *args):
+        value = self._alive(key)
+        if value is None or value[0] != owner.encode():
+            return 0
+        if script == RedisLeaseBackend.RENEW_SCRIPT:
+            self.data[key] = (value[0], time.monotonic() + int(args[0]) / 1000)
+        elif script == RedisLeaseBackend.RELEASE_SCRIPT:
+            del self.data[key]
+        return 1
+
+
+class CountingRefresher:
+    """Вместо BatchRefresher: считает обновления и пишет токен в кэш"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = 0
+
+    async def refresh(self, inn):
+        self.calls += 1
+        self.cache.put(inn, f"token-{self.calls}", time.time() + 36000)
+        return RefreshResult(inn, token={"token": f"token-{self.calls}"})
+
+    async def close(self):
+        pass
+
+
+class QueuedRefresher(CountingRefresher):
+    """Одно обновление за раз, как BatchRefresher с concurrency=1; запоминает владельца аренды в начале"""
+
+    def __init__(self, cache, leases, delay):
+        super().__init__(cache)
+        self.leases = leases
+        self.delay = delay
+        self.owners = {}
+        self._semaphore = asyncio.Semaphore(1)
+
+    async def refresh(self, inn):
+        async with self._semaphore:
+            self.owners[inn] = self.leases.owner(inn)
+            await asyncio.sleep(self.delay)
+            return await super().refresh(inn)
+
+
+@pytest.fixture(params=["file", "redis"])
+def leases(request, tmp_path):
+    if request.param == "file":
+        return FileLeaseBackend(tmp_path / "leases")
+    return RedisLeaseBackend(client=FakeRedis())
+
+
+class TestLeaseBackends:
+
+    def test_single_owner(self, leases):
+        assert leases.acquire("7701", "node-a", 30)
+        assert not leases.acquire("7701", "node-b", 30)
+        assert leases.acquire("7701", "node-a", 30)  # продление своей аренды
+        assert leases.owner("7701") == "node-a"
+
+    def test_release_only_by_owner(self, leases):
+        leases.acquire("7701", "node-a", 30)
+        assert not leases.release("7701", "node-b")
+        assert leases.release("7701", "node-a")
+        assert leases.acquire("7701", "node-b", 30)
+
+    def test_lease_expires(self, leases):
+        """Упавший узел не держит ИНН дольше ttl"""
+        leases.acquire("7701", "node-a", 0.05)
+        time.sleep(0.1)
+        assert leases.owner("7701") is None
+        assert leases.acquire("7701", "node-b", 30)
+        assert not leases.acquire("7701", "node-a", 30)
+
+
+class TestFileBackendRaces:
+
+    def race(self, *calls):
+        """Запускает вызовы одновременно в отдельных потоках, возвращает их результаты"""
+        barrier = threading.Barrier(len(calls))
+        results = [None] * len(calls)
+
+        def run(position, call):
+            barrier.wait()
+            results[position] = call()
+
+        threads = [threading.Thread(target=run, args=item) for item in enumerate(calls)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_stale_lease_taken_over_once(self, tmp_path):
+        """Два узла одновременно забирают одну просроченную аренду — получает только один"""
+        directory = tmp_path / "leases"
+        node_a, node_b = FileLeaseBackend(directory), FileLeaseBackend(directory)
+        for _ in range(50):
+            directory.mkdir(exist_ok=True)
+            (directory / "7701.lock").write_text(json.dumps({"owner": "dead", "expires_at": 0}), encoding="utf-8")
+
+            won = self.race(lambda: node_a.acquire("7701", "node-a", 30), lambda: node_b.acquire("7701", "node-b", 30))
+
+            assert sorted(won) == [False, True]
+            assert node_a.owner("7701") == ("node-a" if won[0] else "node-b")
+
+    def test_token_cache_writes_merged(self, tmp_path):
+        """Одновременные записи разных процессов в общий файл кэша не теряются"""
+        path = tmp_path / "cache.json"
+        backends = [FileTokenBackend(path) for _ in range(4)]
+        entry = CachedToken("token", time.time() + 3600)
+
+        self.race(*(lambda backend=backend, i=i: backend.put(f"77{i}", entry) for i, backend in enumerate(backends)))
+
+        assert set(FileTokenBackend(path).load()) == {"770", "771", "772", "773"}
+        assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+
+
+class TestLeasedRefresher:
+
+    @pytest.fixture
+    def nodes(self, tmp_path):
+        """Два узла с общим каталогом аренды и общим файлом кэша"""
+        leases = FileLeaseBackend(tmp_path / "leases")
+        make = lambda owner: LeasedRefresher(
+            CountingRefresher(TokenCache(FileTokenBackend(tmp_path / "cache.json"))),
+            leases, owner=owner, ttl=30, min_remaining=600,
+        )
+        return make("node-a"), make("node-b")
+
+    @pytest.mark.asyncio
+    async def test_other_node_reads_shared_cache(self, nodes):
+        node_a, node_b = nodes
+        assert (await node_a.refresh("7701")).token == {"token": "token-1"}
+
+        result = await node_b.refresh("7701")
+        assert result.ok and result.token == {"token": "token-1"}
+        assert node_b.refresher.calls == 0
+        assert node_b.cache.get("7701") == "token-1"
+
+    @pytest.mark.asyncio
+    async def test_busy_lease_without_token(self, nodes):
+        node_a, node_b = nodes
+        node_a.leases.acquire("7701", "node-a", 30)  # node-a в процессе обновления
+
+        result = await node_b.refresh("7701")
+        assert result.cause == "lease_busy"
+        assert node_b.refresher.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_stale_token_is_refreshed(self, nodes):
+        node_a, _ = nodes
+        node_a.cache.put("7701", "old", time.time() + 60)  # осталось меньше min_remaining
+
+        result = await node_a.refresh("7701")
+        assert result.token == {"token": "token-1"}
+        assert node_a.leases.owner("7701") is None  # аренда освобождена после обновления
+
+    @pytest.mark.asyncio
+    async def test_refresh_all_under_leases(self, nodes):
+        node_a, node_b = nodes
+        await node_a.refresh_all(["7701", "7702"])
+
+        results = await node_b.refresh_all(["7701", "7702", "7701"])
+
+        assert sorted(results) == ["7701", "7702"] and all(result.ok for result in results.values())
+        assert node_b.refresher.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_lease_renewed_while_queued(self, tmp_path):
+        """ИНН ждёт своей очереди дольше ttl, но аренда не истекает"""
+        leases = FileLeaseBackend(tmp_path / "leases")
+        inner = QueuedRefresher(TokenCache(), leases, delay=0.15)
+        node = LeasedRefresher(inner, leases, owner="node-a", ttl=0.3, min_remaining=600)
+
+        results = await node.refresh_all(["7701", "7702", "7703", "7704"])
+
+        assert all(result.ok for result in results.values())
+        assert inner.owners == dict.fromkeys(["7701", "7702", "7703", "7704"], "node-a")
@@ -0,0 +1,55 @@
+# Moke tests/test_local_signer.py
+
+import pytest
+from src.local_signer import LocalCMSSigner, certificate_thumbprint, create_test_certificate
+from src.signer_backend import SignerBackend, create_signer_backend
+from cryptography import x509
+
+
+class TestLocalCMSSigner:
+
+    @pytest.fixture
+    def signer(self, tmp_path):
+        create_test_certificate("644402604072", tmp_path)
+        create_test_certificate("645209152711", tmp_path)
+        signer = LocalCMSSigner(tmp_path)
+        assert signer.initialize_store() is True
+        yield signer
+        signer.close()
+
+    def test_implements_backend_protocol(self, signer):
+        assert isinstance(signer, SignerBackend)
+
+    def test_initialize_store_missing_dir(self, tmp_path):
+        assert LocalCMSSigner(tmp_path / "missing").initialize_store() is False
+
+    def test_select_by_inn(self, signer):
+        assert signer.select_certificate_by_inn("645209152711") is True
+        assert signer.select_certificate_by_inn("000000000000") is False
+
+    def test_select_by_thumbprint(self, signer, tmp_path):
+        cert = x509.load_pem_x509_certificate((tmp_path / "644402604072.crt").read_bytes())
+        assert signer.select_certificate(certificate_thumbprint(cert).lower()) is True
+        assert signer.certificate == cert
+
+    def test_sign_without_certificate(self, signer):
+        assert signer.sign_data("data") is None
+
+    def test_detached_signature_verifies(self, signer):
+        """Открепленная подпись проверяется на исходных данных и не проходит на чужих"""
+        signer.select_certificate_by_inn("644402604072")
+        signature = signer.sign_data("Y2hhbGxlbmdl")
+
+        assert isinstance(signature, str)
+        assert signer.verify_signature(signature, "Y2hhbGxlbmdl") is True
+        assert signer.verify_signature(signature, "other") is False
+
+
+class TestCreateSignerBackend:
+
+    def test_local_backend(self):
+        assert isinstance(create_signer_backend("local"), LocalCMSSigner)
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            create_signer_backend("unknown")
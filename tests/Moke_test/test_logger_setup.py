@@ -0,0 +1,143 @@
+# Moke tests/test_logger_setup.py
+
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from src import logger_setup
+from src.consts import get_settings, reload_settings
+from src.logger_setup import configure_logging, log_context, logger, shutdown_logging
+
+
+class RecordingHandler(logging.Handler):
+    """Запоминает отформатированные записи и поток, в котором они записаны"""
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+        self.threads.add(threading.get_ident())
+
+
+@pytest.fixture
+def handler():
+    handler = RecordingHandler()
+    configure_logging(level="INFO", handlers=[handler])
+    yield handler
+    configure_logging()
+
+
+class TestStructuredLogging:
+
+    def test_json_line_with_correlation(self, handler):
+        with log_context(refresh_id="r1", inn="7701"):
+            with log_context(uuid="u-1"):
+                logger.error("Токен не получен")
+            logger.info("После обмена")
+        shutdown_logging()
+
+        first, second = (json.loads(line) for line in handler.lines)
+        assert first["message"] == "Токен не получен"
+        assert first["level"] == "ERROR"
+        assert (first["refresh_id"], first["inn"], first["uuid"]) == ("r1", "7701", "u-1")
+        assert "uuid" not in second and second["inn"] == "7701"
+
+    def test_written_outside_caller_thread(self, handler):
+        """Запись в обработчик идёт в потоке QueueListener, а не в вызывающем"""
+        logger.error("из основного потока")
+        shutdown_logging()
+
+        assert handler.lines
+        assert threading.get_ident() not in handler.threads
+
+    def test_level_configurable(self, handler):
+        configure_logging(level="ERROR", handlers=[handler])
+        logger.info("не попадёт")
+        logger.error("попадёт")
+        shutdown_logging()
+
+        assert [json.loads(line)["message"] for line in handler.lines] == ["попадёт"]
+
+    @pytest.mark.asyncio
+    async def test_context_isolated_between_tasks(self, handler):
+        """У параллельных обновлений свои идентификаторы"""
+        async def refresh(inn):
+            with log_context(inn=inn):
+                await asyncio.sleep(0)
+                logger.error(f"обновление {inn}")
+
+        await asyncio.gather(refresh("1"), refresh("2"))
+        shutdown_logging()
+
+        records = [json.loads(line) for line in handler.lines]
+        assert {(r["inn"], r["message"]) for r in records} == {("1", "обновление 1"), ("2", "обновление 2")}
+
+    def test_text_format(self, handler):
+        configure_logging(level="ERROR", json_format=False, handlers=[handler])
+        logger.error("текстом")
+        shutdown_logging()
+
+        assert " - ERROR - test_text_format:" in handler.lines[0]
+        assert handler.lines[0].endswith(" - текстом")
+
+
+class TestRotation:
+
+    def test_size_rotation(self, tmp_path):
+        path = tmp_path / "app.log"
+        try:
+            configure_logging(level="ERROR", path=path, max_bytes=300, backup_count=2)
+            for i in range(20):
+                logger.error(f"запись {i}")
+            shutdown_logging()
+        finally:
+            configure_logging()
+
+        assert path.exists()
+        assert (tmp_path / "app.log.1").exists()
+        assert not (tmp_path / "app.log.3").exists()
+
+    def test_invalid_settings_fall_back_to_stderr(self, monkeypatch, capsys):
+        """Неверные LOG_* не роняют logger.error: запись уходит в stderr"""
+        monkeypatch.setenv("LOG_LEVEL", "LOUD")
+        get_settings.cache_clear()  # настройки прочитаются при первой записи
+        shutdown_logging()
+        logger.addHandler(logger_setup._bootstrap)  # как сразу после импорта
+        try:
+            logger.error("запись при неверной настройке")
+            shutdown_logging()
+        finally:
+            monkeypatch.delenv("LOG_LEVEL")
+            reload_settings()
+            configure_logging()
+
+        stderr = capsys.readouterr().err
+        assert "Некорректная конфигурация" in stderr
+        assert "запись при неверной настройке" in stderr
+
+    def test_info_before_first_error_with_lazy_setup(self, tmp_path):
+        """При LOG_LEVEL=INFO записи INFO до первой ошибки тоже попадают в файл"""
+        path = tmp_path / "app.log"
+        env = dict(os.environ, LOG_LEVEL="INFO", LOG_FORMAT="text", LOG_FILE_PATH=str(path))
+        code = (
+            "from src.logger_setup import logger\n"
+            "logger.debug('debug')\n"
+            "logger.info('first info')\n"
+            "logger.info('second info')\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        subprocess.run([sys.executable, "-c", code], env=env, cwd=root, check=True)
+
+        text = path.read_text(encoding="utf-8")
+        assert "first info" in text and "second info" in text
+        assert "debug" not in text
+
+    def test_no_desktop_copy_on_exit(self):
+        assert not hasattr(logger_setup, "_save_log_to_desktop")
@@ -0,0 +1,160 @@
+# Moke tests/test_metrics.py
+
+import aiohttp
+import pytest
+import aioresponses
+from unittest.mock import MagicMock
+from src import metrics
+from src.async_signer import AsyncSigner
+from src.batch_refresh import BatchRefresher
+from src.metrics import Counter, Gauge, Histogram, Registry
+from src.pipeline import refresh_pipelined
+from src.rate_limiter import RateLimiter
+from src.token_cache import TokenCache
+
+KEY_URL = "https://test-api.com/auth/key"
+TOKEN_URL = "https://api.mdlp.crpt.ru/api/v1/token"
+
+
+def sample(name, labels=""):
+    """Значение одной строки из вывода общего реестра"""
+    for line in metrics.REGISTRY.render().splitlines():
+        if line.startswith(name + labels + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+class TestPrometheusFormat:
+
+    def test_counter_and_gauge(self):
+        registry = Registry()
+        counter = registry.register(Counter("requests_total", "Запросы", ["status"]))
+        gauge = registry.register(Gauge("in_flight", "В работе"))
+        counter.inc(1, "ok")
+        counter.inc(2, "ok")
+        counter.inc(1, 'bad"quote')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        text = registry.render()
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{status="ok"} 3' in text
+        assert 'requests_total{status="bad\\"quote"} 1' in text
+        assert "# TYPE in_flight gauge" in text
+        assert "in_flight 1" in text
+
+    def test_histogram_buckets_cumulative(self):
+        registry = Registry()
+        histogram = registry.register(Histogram("latency_seconds", "Задержка", ["phase"], buckets=(0.1, 1)))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, "key")
+
+        text = registry.render()
+        assert 'latency_seconds_bucket{phase="key",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{phase="key",le="1"} 2' in text
+        assert 'latency_seconds_bucket{phase="key",le="+Inf"} 3' in text
+        assert 'latency_seconds_sum{phase="key"} 5.55' in text
+        assert 'latency_seconds_count{phase="key"} 3' in text
+
+    def test_wrong_labels(self):
+        counter = Counter("errors_total", "Ошибки", ["cause"])
+        with pytest.raises(ValueError):
+            counter.inc()
+
+    def test_gauge_function(self):
+        cache = TokenCache()
+        cache.put("1", "abc", expires_at=4102444800)
+        cache.get("1")
+        cache.get("2")
+        metrics.track_cache(cache)
+
+        assert sample("token_cache_hit_ratio") == 0.5
+        assert sample("token_cache_size") == 1
+
+
+class TestPipelineMetrics:
+
+    @pytest.fixture
+    def signer(self):
+        com_signer = MagicMock()
+        com_signer.initialize_store.return_value = True
+        com_signer.select_certificate_by_inn.return_value = True
+        com_signer.sign_data.return_value = "signature"
+        signer = AsyncSigner(signer_factory=lambda: com_signer, max_workers=1)
+        yield signer
+        signer.close()
+
+    @pytest.mark.asyncio
+    async def test_refresh_success_and_failure(self, signer):
+        """Этапы попадают в гистограмму, исходы — в счётчик с причиной и ИНН"""
+        success = sample("token_refresh_total", '{result="success",cause="",inn="7701"}')
+        failure = sample("token_refresh_total", '{result="failure",cause="token_failed",inn="7702"}')
+        signed = sample("token_refresh_phase_seconds_count", '{phase="sign"}')
+
+        with aioresponses.aioresponses() as mock_api:
+            mock_api.get(KEY_URL, payload={"uuid": "u1", "data": "challenge"}, repeat=True)
+            mock_api.post(TOKEN_URL, payload={"token": "abc"})
+            mock_api.post(TOKEN_URL, status=401, body="denied")
+            async with BatchRefresher(signer, key_url=KEY_URL, concurrency=1) as refresher:
+                assert (await refresher.refresh_one("7701")).ok
+                result = await refresher.refresh_one("7702")
+
+        assert result.cause == "token_failed"
+        assert sample("token_refresh_total", '{result="success",cause="",inn="7701"}') == success + 1
+        assert sample("token_refresh_total", '{result="failure",cause="token_failed",inn="7702"}') == failure + 1
+        assert sample("token_refresh_phase_seconds_count", '{phase="sign"}') == signed + 2
+        assert sample("token_refresh_in_flight") == 0
+
+    @pytest.mark.asyncio
+    async def test_key_failure_cause(self, signer):
+        with aioresponses.aioresponses() as mock_api:
+            mock_api.get(KEY_URL, status=403, payload={"error_message": "Нет доступа"})
+            async with BatchRefresher(signer, key_url=KEY_URL) as refresher:
+                result = await refresher.refresh_one("7703")
+
+        assert result.cause == "key_http_403"
+
+    @pytest.mark.asyncio
+    async def test_pipelined_refresh_observed(self, signer):
+        """Конвейер учитывается в тех же метриках, что и refresh_one"""
+        success = sample("token_refresh_total", '{result="success",cause="",inn="7704"}')
+        tokens = sample("token_refresh_phase_seconds_count", '{phase="token"}')
+
+        with aioresponses.aioresponses() as mock_api:
+            mock_api.get(KEY_URL, payload={"uuid": "u1", "data": "challenge"})
+            mock_api.post(TOKEN_URL, payload={"token": "abc"})
+            async with BatchRefresher(signer, key_url=KEY_URL) as refresher:
+                results = await refresh_pipelined(refresher, ["7704"])
+
+        assert results["7704"].ok
+        assert sample("token_refresh_total", '{result="success",cause="",inn="7704"}') == success + 1
+        assert sample("token_refresh_phase_seconds_count", '{phase="token"}') == tokens + 1
+        assert sample("token_refresh_in_flight") == 0
+
+    @pytest.mark.asyncio
+    async def test_limiter_wait_observed(self):
+        before = sample("rate_limiter_wait_seconds_count", '{host="metrics.test",endpoint="key"}')
+        limiter = RateLimiter(endpoint_rates={"key": 100})
+        for _ in range(3):
+            await limiter.acquire("https://metrics.test/auth/key", "key")
+
+        assert sample("rate_limiter_wait_seconds_count", '{host="metrics.test",endpoint="key"}') == before + 3
+
+
+class TestMetricsServer:
+
+    @pytest.mark.asyncio
+    async def test_serves_text_format(self):
+        registry = Registry()
+        registry.register(Counter("served_total", "Проверка")).inc()
+        runner = await metrics.start_metrics_server("127.0.0.1", 0, registry)
+        try:
+            port = runner.addresses[0][1]
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    assert response.status == 200
+                    assert response.headers["Content-Type"].startswith("text/plain")
+                    assert "served_total 1" in await response.text()
+        finally:
+            await runner.cleanup()
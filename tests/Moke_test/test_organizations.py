@@ -0,0 +1,125 @@
+# Moke tests/test_organizations.py
+
+import os
+import pytest
+from src.organizations import (
+    Organization,
+    OrganizationRegistry,
+    OrganizationWatcher,
+    apply_diff,
+    is_valid_inn,
+    parse_organizations,
+)
+
+LEGACY = (
+    '"ИП Кузнецов А.В.":644402604072\n'
+    '"ИП Елудин Роман Иванович":645209152711\n'
+    '"ИП Кузнецов А.В.":644402604072\n\n'
+)
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.calls = []
+
+    def add(self, inn):
+        self.calls.append(("add", inn))
+
+    def remove(self, inn):
+        self.calls.append(("remove", inn))
+
+
+def touch(path, text):
+    """Запись с гарантированно новым mtime (разрешение mtime на некоторых ФС — секунды)"""
+    stat = path.stat()
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+class TestInnChecksum:
+
+    @pytest.mark.parametrize("inn", ["7707083893", "644402604072", "645209152711"])
+    def test_valid(self, inn):
+        assert is_valid_inn(inn)
+
+    @pytest.mark.parametrize("inn", ["7707083890", "644402604073", "12345", "77070838ab"])
+    def test_invalid(self, inn):
+        assert not is_valid_inn(inn)
+
+
+class TestParsing:
+
+    def test_legacy_format(self):
+        registry = OrganizationRegistry(parse_organizations(LEGACY, ".json"))
+        assert registry.inns() == ["644402604072", "645209152711"]
+        assert registry.get("644402604072").name == "ИП Кузнецов А.В."
+
+    def test_json_list_with_thumbprint(self):
+        text = '[{"inn": "7707083893", "name": "ПАО Сбербанк", "thumbprint": "ab cd 01"}]'
+        registry = OrganizationRegistry(parse_organizations(text, ".json"))
+        assert registry.by_thumbprint("ABCD01").inn == "7707083893"
+
+    def test_csv_semicolon(self):
+        text = "inn;name;thumbprint\n7707083893;ПАО Сбербанк;ff00\n644402604072;ИП Кузнецов А.В.;\n"
+        registry = OrganizationRegistry(parse_organizations(text, ".csv"))
+        assert len(registry) == 2
+        assert registry.by_thumbprint("FF00").name == "ПАО Сбербанк"
+        assert registry.get("644402604072").thumbprint is None
+
+    def test_invalid_inn_excluded(self):
+        registry = OrganizationRegistry([Organization("7707083890", "Ошибка"), Organization("7707083893")])
+        assert registry.inns() == ["7707083893"]
+        assert [record.inn for record in registry.invalid] == ["7707083890"]
+
+    def test_json_object_both_orientations(self):
+        text = '{"ИП Кузнецов А.В.": 644402604072, "645209152711": "ИП Елудин Роман Иванович"}'
+        registry = OrganizationRegistry(parse_organizations(text, ".json"))
+        assert registry.as_dict() == {"644402604072": "ИП Кузнецов А.В.", "645209152711": "ИП Елудин Роман Иванович"}
+
+    def test_project_file_wrapped_in_braces(self):
+        """Исходный файл, оформленный как JSON-объект: те же строки в фигурных скобках"""
+        with open("organization.json", encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+        registry = OrganizationRegistry(parse_organizations("{" + ",\n".join(lines) + "}", ".json"))
+        assert len(registry) == 17 and not registry.invalid
+
+    def test_project_file(self):
+        registry = OrganizationRegistry.from_file("organization.json")
+        assert len(registry) == 17 and not registry.invalid
+
+
+class TestWatcher:
+
+    def test_reports_only_changes(self, tmp_path):
+        path = tmp_path / "organization.json"
+        path.write_text(LEGACY, encoding="utf-8")
+        watcher = OrganizationWatcher(path, interval=0)
+        assert watcher.check() is None  # файл не менялся
+
+        touch(path, '"ИП Кузнецов А.В. (новое имя)":644402604072\n"ПАО Сбербанк":7707083893\n')
+        diff = watcher.check()
+
+        assert diff.added == ["7707083893"]
+        assert diff.removed == ["645209152711"]
+        assert diff.changed == ["644402604072"]
+        assert watcher.registry.get("644402604072").name == "ИП Кузнецов А.В. (новое имя)"
+        assert watcher.check() is None
+
+    def test_broken_file_keeps_registry(self, tmp_path):
+        path = tmp_path / "organization.json"
+        path.write_text('[{"inn": "7707083893"}]', encoding="utf-8")
+        watcher = OrganizationWatcher(path, interval=0)
+
+        touch(path, '[{"name": "без ИНН"}]')
+        assert watcher.check() is None
+        assert watcher.registry.inns() == ["7707083893"]
+
+    def test_apply_diff(self, tmp_path):
+        path = tmp_path / "organization.json"
+        path.write_text(LEGACY, encoding="utf-8")
+        watcher = OrganizationWatcher(path, interval=0)
+        touch(path, '"ИП Елудин Роман Иванович":645209152711\n"ПАО Сбербанк":7707083893\n')
+
+        scheduler = RecordingScheduler()
+        apply_diff(scheduler, watcher.check())
+        assert scheduler.calls == [("remove", "644402604072"), ("add", "7707083893")]
@@ -0,0 +1,141 @@
+# Moke tests/test_pipeline.py
+
+import asyncio
+import time
+import pytest
+import aioresponses
+from fastapi import HTTPException
+from src.batch_refresh import BatchRefresher, RefreshResult
+from src.pipeline import refresh_pipelined
+from src.timeouts import PhaseTimeouts
+
+KEY_URL = "https://test-api.com/auth/key"
+TOKEN_URL = "https://api.mdlp.crpt.ru/api/v1/token"
+
+
+class FakeSigner:
+    max_workers = 1
+
+    async def sign(self, inn, data):
+        return "signature"
+
+
+class StageRefresher(BatchRefresher):
+    """Этапы с фиксированной задержкой и учётом challenge, ожидающих подписи"""
+
+    def __init__(self, delay=0.02, fail_key=(), fail_sign=()):
+        super().__init__(FakeSigner(), concurrency=4, timeouts=PhaseTimeouts())
+        self.delay = delay
+        self.fail_key = set(fail_key)
+        self.fail_sign = set(fail_sign)
+        self.waiting = 0
+        self.max_waiting = 0
+        self.fetches = 0
+
+    async def fetch_challenge(self):
+        self.fetches += 1
+        await asyncio.sleep(self.delay)
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        return {"uuid": "u", "data": "d"}
+
+    async def sign_challenge(self, inn, challenge):
+        self.waiting -= 1
+        if inn in self.fail_sign:
+            return None
+        await asyncio.sleep(self.delay)
+        return "signature"
+
+    async def exchange_token(self, inn, challenge, signature):
+        await asyncio.sleep(self.delay)
+        return RefreshResult(inn, token={"token": inn})
+
+
+class KeyFailingRefresher(StageRefresher):
+
+    async def fetch_challenge(self):
+        raise HTTPException(status_code=400, detail="bad request")
+
+
+class TestRefreshPipelined:
+
+    @pytest.mark.asyncio
+    async def test_throughput_bound_by_slowest_stage(self):
+        """Время определяется подписью (1 поток), а не суммой этапов"""
+        refresher = StageRefresher(delay=0.02)
+        started = time.perf_counter()
+        results = await refresh_pipelined(refresher, [str(i) for i in range(10)], prefetch=3)
+        elapsed = time.perf_counter() - started
+        await refresher.close()
+
+        assert all(r.ok for r in results.values())
+        assert list(results) == [str(i) for i in range(10)]
+        assert elapsed < 0.45  # последовательно было бы 10 * 3 * 0.02 = 0.6
+
+    @pytest.mark.asyncio
+    async def test_prefetch_is_bounded(self):
+        """Заранее запрошенных challenge не больше размера очереди и числа воркеров"""
+        refresher = StageRefresher(delay=0.01)
+        await refresh_pipelined(refresher, [str(i) for i in range(20)], prefetch=2)
+        await refresher.close()
+        assert refresher.max_waiting <= 2 + refresher.concurrency + FakeSigner.max_workers
+
+    @pytest.mark.asyncio
+    async def test_stage_errors_reported_per_inn(self):
+        refresher = StageRefresher(delay=0, fail_sign={"2"})
+        results = await refresh_pipelined(refresher, ["1", "2", "1"])
+        await refresher.close()
+
+        assert results["1"].ok
+        assert results["2"].error == "Подпись не создана"
+        assert "sign" in results["2"].timings
+
+    @pytest.mark.asyncio
+    async def test_refresh_deadline_spans_all_stages(self):
+        """Срок timeouts.refresh общий для всех этапов: каждый этап в него укладывается, а вместе — нет"""
+        refresher = StageRefresher(delay=0.05)
+        refresher.timeouts.refresh = 0.12
+        results = await refresh_pipelined(refresher, ["1"])
+        await refresher.close()
+
+        assert results["1"].cause == "token_timeout"
+        assert refresher._semaphore._value == refresher.concurrency
+
+    @pytest.mark.asyncio
+    async def test_shares_refresh_with_concurrent_calls(self):
+        """Параллельный refresh(inn) дожидается конвейера, а не запускает второе обновление"""
+        refresher = StageRefresher(delay=0.02)
+        pipeline = asyncio.create_task(refresh_pipelined(refresher, ["1", "2"]))
+        await asyncio.sleep(0)  # конвейер зарегистрировал свои ИНН
+
+        single = await refresher.refresh("1")
+        results = await pipeline
+        await refresher.close()
+
+        assert single is results["1"]
+        assert refresher.fetches == 2
+
+    @pytest.mark.asyncio
+    async def test_key_errors(self):
+        refresher = KeyFailingRefresher()
+        results = await refresh_pipelined(refresher, ["1", "2"])
+        await refresher.close()
+        assert [r.error for r in results.values()] == ["bad request", "bad request"]
+
+    @pytest.mark.asyncio
+    async def test_full_cycle_with_http(self):
+        """Конвейер на реальных этапах BatchRefresher"""
+        with aioresponses.aioresponses() as m:
+            m.get(KEY_URL, payload={"uuid": "u", "data": "d"}, repeat=True)
+            m.post(TOKEN_URL, payload={"token": "abc"}, repeat=True)
+            async with BatchRefresher(FakeSigner(), key_url=KEY_URL) as refresher:
+                results = await refresh_pipelined(refresher, ["1", "2", "3"])
+
+        assert all(r.token == {"token": "abc"} for r in results.values())
+        assert set(results["1"].timings) == {"key", "sign", "token"}
+
+    @pytest.mark.asyncio
+    async def test_empty(self):
+        refresher = StageRefresher()
+        assert await refresh_pipelined(refresher, []) == {}
+        await refresher.close()
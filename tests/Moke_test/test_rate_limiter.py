@@ -0,0 +1,91 @@
+# Moke tests/test_rate_limiter.py
+
+import asyncio
+import time
+import pytest
+import aioresponses
+from src import send_request as send
+from src.rate_limiter import ENDPOINT_KEY, ENDPOINT_TOKEN, RateLimiter, TokenBucket
+from src.send_request import AsyncAPIHandler as Handler
+
+
+class TestTokenBucket:
+
+    @pytest.mark.asyncio
+    async def test_burst_then_throttle(self):
+        """Всплеск до capacity проходит сразу, дальше — с частотой rate"""
+        bucket = TokenBucket(rate=50, capacity=2)
+        started = time.monotonic()
+        waits = [await bucket.acquire() for _ in range(4)]
+        elapsed = time.monotonic() - started
+
+        assert waits[0] < 0.01 and waits[1] < 0.01
+        assert 0.03 <= elapsed < 0.2
+
+    @pytest.mark.asyncio
+    async def test_waiters_served_in_order(self):
+        """Заблокированные вызовы обслуживаются по очереди (FIFO)"""
+        bucket = TokenBucket(rate=100, capacity=1)
+        order = []
+
+        async def worker(i):
+            await bucket.acquire()
+            order.append(i)
+
+        await asyncio.gather(*(worker(i) for i in range(5)))
+        assert order == [0, 1, 2, 3, 4]
+
+
+class TestRateLimiter:
+
+    def test_rate_resolution(self):
+        limiter = RateLimiter(default_rate=1, endpoint_rates={ENDPOINT_KEY: 5}, host_rates={"a.ru": 3})
+        assert limiter.rate_for("a.ru", ENDPOINT_KEY) == 3  # лимит хоста ограничивает эндпоинт
+        assert limiter.rate_for("b.ru", ENDPOINT_KEY) == 5
+        assert limiter.rate_for("b.ru", ENDPOINT_TOKEN) == 1
+
+    def test_host_rate_overrides_default_endpoint_rates(self):
+        assert RateLimiter(host_rates={"api.mdlp.crpt.ru": 1.0}).rate_for("api.mdlp.crpt.ru", ENDPOINT_TOKEN) == 1.0
+
+    @pytest.mark.asyncio
+    async def test_host_rate_covers_all_endpoints(self):
+        """Лимит хоста общий для ключа и токена: вместе не больше host_rates"""
+        limiter = RateLimiter(default_rate=1000, endpoint_rates={}, host_rates={"a.ru": 20})
+        started = time.monotonic()
+        for _ in range(13):
+            await limiter.acquire("https://a.ru/auth/key", ENDPOINT_KEY)
+            await limiter.acquire("https://a.ru/token", ENDPOINT_TOKEN)
+        elapsed = time.monotonic() - started
+
+        # 26 запросов при всплеске 20 и 20 в секунду — около 0.3 с
+        assert elapsed >= 0.25
+        assert limiter.stats[("a.ru", ENDPOINT_KEY)].waited + limiter.stats[("a.ru", ENDPOINT_TOKEN)].waited >= 5
+
+    @pytest.mark.asyncio
+    async def test_separate_buckets_and_stats(self):
+        """У каждой пары (хост, эндпоинт) свой bucket и своя статистика ожидания"""
+        limiter = RateLimiter(default_rate=20, endpoint_rates={})
+        for _ in range(25):
+            await limiter.acquire("https://a.ru/auth/key", ENDPOINT_KEY)
+        await limiter.acquire("https://a.ru/token", ENDPOINT_TOKEN)
+
+        key_stats = limiter.stats[("a.ru", ENDPOINT_KEY)]
+        token_stats = limiter.stats[("a.ru", ENDPOINT_TOKEN)]
+        assert key_stats.acquired == 25
+        assert key_stats.waited >= 1
+        assert key_stats.total_wait > 0
+        assert token_stats.acquired == 1
+        assert token_stats.waited == 0
+
+    @pytest.mark.asyncio
+    async def test_handler_and_token_pass_through_limiter(self):
+        limiter = RateLimiter(default_rate=100)
+        with aioresponses.aioresponses() as m:
+            m.get("https://test-api.com", payload={"uuid": "u", "data": "d"})
+            m.post("https://api.mdlp.crpt.ru/api/v1/token", payload={"token": "abc"})
+            async with Handler(base_url="https://test-api.com", rate_limiter=limiter) as ctx:
+                await ctx._make_request()
+            await send.get_auth_token("uuid", "sig", rate_limiter=limiter)
+
+        assert limiter.stats[("test-api.com", ENDPOINT_KEY)].acquired == 1
+        assert limiter.stats[("api.mdlp.crpt.ru", ENDPOINT_TOKEN)].acquired == 1
@@ -0,0 +1,62 @@
+# Moke tests/test_responses.py
+
+import base64
+import json
+import pytest
+import aioresponses
+from src import responses
+from src.responses import AuthChallenge, AuthToken, JSONDecodeError, error_message
+from src.send_request import AsyncAPIHandler as Handler, fetch_auth_token
+
+TOKEN_URL = "https://api.mdlp.crpt.ru/api/v1/token"
+
+
+def make_jwt(exp: int) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).rstrip(b"=").decode()
+    return f"header.{payload}.signature"
+
+
+class TestParsing:
+
+    def test_challenge_fields(self):
+        challenge = AuthChallenge.from_body(b'{"uuid": "u1", "data": "d", "extra": [1, 2, 3]}')
+        assert (challenge.uuid, challenge.data) == ("u1", "d")
+        assert challenge.as_dict() == {"uuid": "u1", "data": "d"}
+
+    def test_token_expiry_from_jwt(self):
+        token = AuthToken.from_body(json.dumps({"token": make_jwt(1900000000)}).encode())
+        assert token.expires_at == 1900000000.0
+        assert AuthToken.from_body(b'{"token": "opaque"}').expires_at is None
+
+    def test_non_object_is_decode_error(self):
+        with pytest.raises(JSONDecodeError):
+            AuthChallenge.from_body(b"[1, 2]")
+
+    def test_error_message(self):
+        assert error_message('{"message": "Ошибка"}'.encode()) == "Ошибка"
+        assert error_message(b"<html>") == "Неизвестная ошибка"
+
+    def test_stdlib_fallback(self, monkeypatch):
+        """Без orjson разбор идёт через json, поведение то же"""
+        monkeypatch.setattr(responses, "orjson", None)
+        assert AuthChallenge.from_body(b'{"uuid": "u1"}').uuid == "u1"
+        with pytest.raises(JSONDecodeError):
+            responses.loads(b"not json")
+
+
+class TestTypedRequests:
+
+    @pytest.mark.asyncio
+    async def test_fetch_challenge(self):
+        with aioresponses.aioresponses() as m:
+            m.get("https://test-api.com", payload={"uuid": "u1", "data": "d"})
+            async with Handler(base_url="https://test-api.com") as handler:
+                challenge = await handler.fetch_challenge()
+        assert isinstance(challenge, AuthChallenge) and challenge.uuid == "u1"
+
+    @pytest.mark.asyncio
+    async def test_fetch_auth_token(self):
+        with aioresponses.aioresponses() as m:
+            m.post(TOKEN_URL, payload={"token": make_jwt(1900000000)})
+            token = await fetch_auth_token("uuid", "sig")
+        assert token.expires_at == 1900000000.0
@@ -0,0 +1,147 @@
+# Moke tests/test_retry.py
+
+import asyncio
+import pytest
+import aioresponses
+from aiohttp import ClientError
+from fastapi import HTTPException
+from src import retry
+from src import send_request as send
+from src.retry import RetryPolicy, call_with_retry, deadline_scope, parse_retry_after
+from src.send_request import AsyncAPIHandler as Handler
+
+TOKEN_URL = "https://api.mdlp.crpt.ru/api/v1/token"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Записывает задержки вместо реального ожидания"""
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(retry.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+class Flaky:
+    """Падает заданное число раз, затем возвращает результат"""
+
+    def __init__(self, errors, result="ok"):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+
+class TestRetryPolicy:
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+        assert parse_retry_after("garbage") is None
+        assert parse_retry_after(None) is None
+
+    def test_is_retryable(self):
+        policy = RetryPolicy()
+        assert policy.is_retryable(HTTPException(status_code=429))
+        assert policy.is_retryable(HTTPException(status_code=502))
+        assert policy.is_retryable(ClientError())
+        assert policy.is_retryable(asyncio.TimeoutError())
+        assert not policy.is_retryable(HTTPException(status_code=400))
+        assert not policy.is_retryable(ValueError())
+
+    def test_backoff_is_capped(self):
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        assert all(0 <= policy.backoff(10) <= 5 for _ in range(20))
+
+
+class TestCallWithRetry:
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self, sleeps):
+        func = Flaky([HTTPException(status_code=502), ClientError()])
+        assert await call_with_retry(func, RetryPolicy(max_attempts=3)) == "ok"
+        assert func.calls == 3
+        assert len(sleeps) == 2
+
+    @pytest.mark.asyncio
+    async def test_fatal_error_not_retried(self, sleeps):
+        """4xx не повторяется"""
+        func = Flaky([HTTPException(status_code=401)])
+        with pytest.raises(HTTPException):
+            await call_with_retry(func, RetryPolicy())
+        assert func.calls == 1
+        assert sleeps == []
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self, sleeps):
+        func = Flaky([HTTPException(status_code=503)] * 5)
+        with pytest.raises(HTTPException):
+            await call_with_retry(func, RetryPolicy(max_attempts=2))
+        assert func.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_honors_retry_after(self, sleeps):
+        func = Flaky([HTTPException(status_code=429, headers={"Retry-After": "2"})])
+        await call_with_retry(func, RetryPolicy(max_delay=1))
+        assert sleeps == [2.0]
+
+    @pytest.mark.asyncio
+    async def test_deadline_stops_retries(self, sleeps):
+        """Задержка за пределами общего срока не ожидается"""
+        func = Flaky([HTTPException(status_code=429, headers={"Retry-After": "30"})])
+        with deadline_scope(5):
+            with pytest.raises(HTTPException):
+                await call_with_retry(func, RetryPolicy())
+        assert sleeps == []
+
+    @pytest.mark.asyncio
+    async def test_without_policy_single_call(self):
+        func = Flaky([HTTPException(status_code=503)])
+        with pytest.raises(HTTPException):
+            await call_with_retry(func, None)
+        assert func.calls == 1
+
+
+class TestRetryIntegration:
+
+    @pytest.fixture
+    def mock_api(self):
+        with aioresponses.aioresponses() as m:
+            yield m
+
+    @pytest.mark.asyncio
+    async def test_make_request_retries_502(self, mock_api, sleeps):
+        mock_api.get("https://test-api.com", status=502, payload={"message": "Bad gateway"})
+        mock_api.get("https://test-api.com", payload={"uuid": "u", "data": "d"})
+        async with Handler(base_url="https://test-api.com", retry_policy=RetryPolicy()) as ctx:
+            assert await ctx._make_request() == {"uuid": "u", "data": "d"}
+
+    @pytest.mark.asyncio
+    async def test_make_request_passes_retry_after(self, mock_api):
+        mock_api.get("https://test-api.com", status=429, headers={"Retry-After": "7"}, payload={})
+        async with Handler(base_url="https://test-api.com") as ctx:
+            with pytest.raises(HTTPException) as exc_info:
+                await ctx._make_request()
+        assert exc_info.value.headers == {"Retry-After": "7"}
+
+    @pytest.mark.asyncio
+    async def test_get_auth_token_retries_429(self, mock_api, sleeps):
+        mock_api.post(TOKEN_URL, status=429, headers={"Retry-After": "1"})
+        mock_api.post(TOKEN_URL, payload={"token": "abc"})
+        result = await send.get_auth_token("uuid", "sig", retry_policy=RetryPolicy())
+        assert result == {"token": "abc"}
+        assert sleeps == [1.0]
+
+    @pytest.mark.asyncio
+    async def test_get_auth_token_fatal_returns_none(self, mock_api, sleeps):
+        mock_api.post(TOKEN_URL, status=400)
+        assert await send.get_auth_token("uuid", "sig", retry_policy=RetryPolicy()) is None
+        assert sleeps == []
@@ -0,0 +1,84 @@
+# Moke tests/test_scheduler.py
+
+import asyncio
+import time
+import pytest
+from src.batch_refresh import RefreshResult
+from src.scheduler import RefreshScheduler
+from src.token_cache import TokenCache
+
+
+class FakeRefresher:
+    """Refresher, который выдаёт токен с заданным сроком жизни"""
+
+    def __init__(self, ttl=3600, ok=True):
+        self.cache = None
+        self.ttl = ttl
+        self.ok = ok
+        self.calls = []
+
+    async def refresh(self, inn):
+        self.calls.append(inn)
+        if not self.ok:
+            return RefreshResult(inn, error="fail")
+        self.cache.put(inn, "token", expires_at=time.time() + self.ttl)
+        return RefreshResult(inn, token={"token": "token"})
+
+
+class TestRefreshScheduler:
+
+    def test_next_delay_without_token(self):
+        """Без токена обновление нужно сразу"""
+        scheduler = RefreshScheduler(FakeRefresher(), TokenCache())
+        assert scheduler.next_delay("inn") == 0.0
+
+    def test_next_delay_respects_lead_time_and_jitter(self):
+        """Обновление планируется за lead_time (с учётом jitter) до истечения"""
+        cache = TokenCache()
+        cache.put("inn", "token", expires_at=1000.0)
+        scheduler = RefreshScheduler(FakeRefresher(), cache, lead_time=100, jitter=50)
+
+        delays = {scheduler.next_delay("inn", now=0.0) for _ in range(20)}
+
+        assert all(850 <= d <= 900 for d in delays)
+        assert len(delays) > 1
+
+    @pytest.mark.asyncio
+    async def test_refreshes_missing_tokens_in_background(self):
+        """Токены без записи в кэше получаются сразу после старта"""
+        refresher = FakeRefresher()
+        cache = TokenCache()
+        async with RefreshScheduler(refresher, cache, lead_time=0, jitter=0) as scheduler:
+            await scheduler.start(["1", "2"])
+            await asyncio.sleep(0.05)
+            assert scheduler.get_token("1") == "token"
+            assert scheduler.get_token("2") == "token"
+        assert sorted(refresher.calls) == ["1", "2"]
+
+    @pytest.mark.asyncio
+    async def test_renews_before_expiry(self):
+        """Истекающий токен обновляется повторно"""
+        refresher = FakeRefresher(ttl=0.1)
+        async with RefreshScheduler(refresher, TokenCache(skew=0), lead_time=0.05, jitter=0) as scheduler:
+            await scheduler.start(["1"])
+            await asyncio.sleep(0.2)
+        assert len(refresher.calls) >= 2
+
+    @pytest.mark.asyncio
+    async def test_failure_uses_retry_delay(self):
+        """После ошибки следующая попытка откладывается"""
+        refresher = FakeRefresher(ok=False)
+        async with RefreshScheduler(refresher, TokenCache(), retry_delay=10) as scheduler:
+            await scheduler.start(["1"])
+            await asyncio.sleep(0.05)
+        assert refresher.calls == ["1"]
+
+    @pytest.mark.asyncio
+    async def test_stop_is_graceful(self):
+        """После stop задачи завершены, новые организации не добавляются"""
+        scheduler = RefreshScheduler(FakeRefresher(), TokenCache())
+        await scheduler.start(["1"])
+        await scheduler.stop()
+        scheduler.add("2")
+        assert not scheduler.running
+        assert scheduler._tasks == {}
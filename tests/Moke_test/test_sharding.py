@@ -0,0 +1,106 @@
+# Moke tests/test_sharding.py
+
+import functools
+import os
+import queue
+import pytest
+from benchmarks.mock_api import MockTrueAPI
+from benchmarks.run_refresh import FakeSigner, synthetic_inns
+from src import metrics
+from src.batch_refresh import RefreshResult
+from src.sharding import HashRing, ShardedRefresher, ShardOptions
+from src.token_cache import TokenCache
+
+
+class TestHashRing:
+
+    def test_assign_is_stable_and_complete(self):
+        inns = synthetic_inns(1000) + ["7700000000"]  # повтор не дублируется
+        shards = HashRing(range(4)).assign(inns)
+
+        assert sorted(inn for shard in shards.values() for inn in shard) == sorted(set(inns))
+        assert all(150 < len(shard) < 350 for shard in shards.values())
+        assert HashRing(range(4)).assign(inns) == shards  # одинаково в любом процессе
+
+    def test_adding_node_moves_few_keys(self):
+        inns = synthetic_inns(2000)
+        before, after = HashRing(range(4)), HashRing(range(5))
+        moved = [inn for inn in inns if before.node_for(inn) != after.node_for(inn)]
+
+        assert all(after.node_for(inn) == 4 for inn in moved)  # ключи уходят только на новый узел
+        assert len(moved) < len(inns) * 0.3
+
+    def test_requires_nodes(self):
+        with pytest.raises(ValueError):
+            HashRing([])
+
+
+class TestShardedRefresher:
+
+    @pytest.mark.asyncio
+    async def test_tokens_reach_parent_cache(self):
+        inns = synthetic_inns(12)
+        cache = TokenCache()
+        async with MockTrueAPI() as api:
+            refresher = ShardedRefresher(
+                workers=2,
+                cache=cache,
+                options=ShardOptions(
+                    signer_factory=FakeSigner, key_url=api.key_url, token_url=api.token_url, rate_limit=1000
+                ),
+                poll_interval=0.05,
+            )
+            results = await refresher.refresh_all(inns)
+
+        assert sorted(results) == sorted(inns)
+        assert all(result.ok for result in results.values())
+        assert all(cache.get(inn) == results[inn].token["token"] for inn in inns)
+        assert api.stats.token_requests == 12
+
+    @pytest.mark.asyncio
+    async def test_crashed_worker_reports_failures(self):
+        """Процесс, упавший при подписи, не подвешивает координатора"""
+        inns = synthetic_inns(4)
+        async with MockTrueAPI() as api:
+            refresher = ShardedRefresher(
+                workers=1,
+                options=ShardOptions(
+                    signer_factory=functools.partial(os._exit, 3), key_url=api.key_url, token_url=api.token_url
+                ),
+                poll_interval=0.05,
+            )
+            results = await refresher.refresh_all(inns)
+
+        assert {result.cause for result in results.values()} == {"worker_failed"}
+        assert sorted(results) == sorted(inns)
+
+    @pytest.mark.asyncio
+    async def test_pipelined_workers(self):
+        inns = synthetic_inns(6)
+        async with MockTrueAPI() as api:
+            refresher = ShardedRefresher(
+                workers=2,
+                options=ShardOptions(
+                    signer_factory=FakeSigner, key_url=api.key_url, token_url=api.token_url,
+                    rate_limit=1000, pipelined=True,
+                ),
+                poll_interval=0.05,
+            )
+            results = await refresher.refresh_all(inns)
+
+        assert sorted(results) == sorted(inns)
+        assert all(result.ok for result in results.values())
+
+    def test_dead_worker_results_drained_first(self):
+        """Токены, отданные процессом перед падением, не теряются"""
+        results_queue = queue.Queue()
+        results_queue.put((0, RefreshResult("7701", token={"token": "t"})))
+        dead = type("DeadProcess", (), {"name": "refresh-shard-0", "exitcode": 3, "is_alive": lambda self: False})()
+        pending, results = {0: {"7701", "7702"}}, {}
+        metrics.refresh_started(2)  # как refresh_all перед запуском процессов
+
+        ShardedRefresher(workers=1)._collect_dead({0: dead}, pending, results, results_queue)
+
+        assert results["7701"].ok
+        assert results["7702"].cause == "worker_failed"
+        assert not pending
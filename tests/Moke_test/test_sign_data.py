@@ -37,18 +37,18 @@ class TestCryptoProSigner:
         mock_certificates = MagicMock()
         mock_cert = MagicMock()
         mock_cert.SubjectName = "CN=Test User"
+        mock_cert.Thumbprint = "ABC123"
         mock_certificates.Count = 1
         mock_certificates.Item.return_value = mock_cert
 
-        # Мокаем Certificates и Find
+        # Поиск по отпечатку идёт через индекс хранилища
         self.signer.store.Certificates = mock_certificates # type: ignore
-        mock_certificates.Find.return_value = mock_certificates
 
-        result = self.signer.select_certificate(thumbprint="ABC123")
+        result = self.signer.select_certificate(thumbprint="abc123")
 
         assert result is True
         assert self.signer.certificate == mock_cert
-        mock_certificates.Find.assert_called_with(0, "ABC123", False)
+        mock_certificates.Find.assert_not_called()
 
     @patch("win32com.client.Dispatch")
     def test_select_certificate_first_available(self, mock_dispatch):
@@ -151,4 +151,42 @@ class TestCryptoProSigner:
 
         self.signer.close()
         mock_store.Close.assert_called_once()
-        assert self.signer.store is None  # или оставить как есть — зависит от логики
\ No newline at end of file
+        assert self.signer.store is None  # или оставить как есть — зависит от логики
+
+    @patch("win32com.client.Dispatch")
+    def test_sign_many_reuses_cp_signer(self, mock_dispatch):
+        """CPSigner создаётся один раз на пакет, CadesSignedData — на каждые данные"""
+        self.signer.certificate = MagicMock(Thumbprint="ABC")
+        created = {"CAdESCOM.CPSigner": 0, "CAdESCOM.CadesSignedData": 0}
+
+        def dispatch(name):
+            created[name] += 1
+            obj = MagicMock()
+            obj.SignCades.side_effect = lambda signer, level, detached: f"sig:{obj.Content}"
+            return obj
+
+        mock_dispatch.side_effect = dispatch
+        results = self.signer.sign_many(["a", "b", "c"])
+
+        assert [r.signature for r in results] == ["sig:a", "sig:b", "sig:c"]
+        assert all(r.ok and r.error is None for r in results)
+        assert created == {"CAdESCOM.CPSigner": 1, "CAdESCOM.CadesSignedData": 3}
+
+        self.signer.sign_data("d")
+        assert created["CAdESCOM.CPSigner"] == 1  # тот же сертификат — тот же CPSigner
+
+    @patch("win32com.client.Dispatch")
+    def test_sign_many_per_item_errors(self, mock_dispatch):
+        self.signer.certificate = MagicMock(Thumbprint="ABC")
+        signed_data = MagicMock()
+        signed_data.SignCades.side_effect = ["sig1", Exception("Ошибка CSP"), "sig3"]
+        mock_dispatch.return_value = signed_data
+
+        results = self.signer.sign_many(["a", "b", "c"])
+
+        assert [r.signature for r in results] == ["sig1", None, "sig3"]
+        assert results[1].error == "Ошибка CSP" and not results[1].ok
+
+    def test_sign_many_no_certificate(self):
+        results = self.signer.sign_many(["a", "b"])
+        assert [r.error for r in results] == ["Сертификат не выбран"] * 2
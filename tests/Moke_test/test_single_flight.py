@@ -0,0 +1,95 @@
+# Moke tests/test_single_flight.py
+
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from src.batch_refresh import BatchRefresher, RefreshResult
+from src.single_flight import SingleFlight
+from src.token_cache import TokenCache
+
+
+class TestSingleFlight:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """Одновременные вызовы с одним ключом выполняются один раз"""
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "token"
+
+        results = await asyncio.gather(*(flight.do("inn", work) for _ in range(10)))
+
+        assert results == ["token"] * 10
+        assert calls == 1
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_all_waiters_get_same_error(self):
+        """Ошибка передаётся всем ожидающим"""
+        flight = SingleFlight()
+        error = RuntimeError("COM error")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise error
+
+        results = await asyncio.gather(*(flight.do("inn", work) for _ in range(3)), return_exceptions=True)
+
+        assert all(r is error for r in results)
+
+    @pytest.mark.asyncio
+    async def test_new_call_after_completion(self):
+        """После завершения следующий вызов запускается заново"""
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await flight.do("inn", work) == 1
+        assert await flight.do("inn", work) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_flight(self):
+        """Отмена одного ожидающего не отменяет общий вызов"""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "token"
+
+        first = asyncio.ensure_future(flight.do("inn", work))
+        second = asyncio.ensure_future(flight.do("inn", work))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "token"
+
+
+class TestBatchRefresherSingleFlight:
+
+    @pytest.mark.asyncio
+    async def test_get_token_deduplicates_refresh(self, monkeypatch):
+        """Параллельные get_token по одному ИНН вызывают одно обновление"""
+        calls = []
+
+        async def fake_refresh_one(self, inn):
+            calls.append(inn)
+            await asyncio.sleep(0.01)
+            self.cache.put(inn, "abc")
+            return RefreshResult(inn, token={"token": "abc"})
+
+        monkeypatch.setattr(BatchRefresher, "refresh_one", fake_refresh_one)
+        async with BatchRefresher(MagicMock(), cache=TokenCache()) as refresher:
+            tokens = await asyncio.gather(*(refresher.get_token("1") for _ in range(5)))
+            assert await refresher.get_token("1") == "abc"
+
+        assert tokens == ["abc"] * 5
+        assert calls == ["1"]
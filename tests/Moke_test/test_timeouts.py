@@ -0,0 +1,99 @@
+# Moke tests/test_timeouts.py
+
+import asyncio
+import pytest
+import aioresponses
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fastapi import HTTPException
+from src.batch_refresh import BatchRefresher
+from src.send_request import AsyncAPIHandler as Handler
+from src.timeouts import HttpTimeouts, PhaseTimeouts, PhaseTimer
+
+KEY_URL = "https://test-api.com/auth/key"
+TOKEN_URL = "https://api.mdlp.crpt.ru/api/v1/token"
+
+
+class SlowSigner:
+    """Асинхронный подписант с задержкой"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    async def sign(self, inn, data):
+        await asyncio.sleep(self.delay)
+        return "signature"
+
+
+class TestPhaseTimeouts:
+
+    def test_client_timeout(self):
+        timeout = HttpTimeouts(connect=1, read=2, total=3).client_timeout()
+        assert (timeout.connect, timeout.sock_read, timeout.total) == (1, 2, 3)
+
+    def test_phase_timer_records_failed_phase(self):
+        timer = PhaseTimer()
+        with timer.phase("key"):
+            pass
+        with pytest.raises(RuntimeError):
+            with timer.phase("sign"):
+                raise RuntimeError
+        assert set(timer.timings) == {"key", "sign"}
+        assert timer.current == "sign"
+
+
+class TestRefreshTimeouts:
+
+    @pytest.fixture
+    def mock_api(self):
+        with aioresponses.aioresponses() as m:
+            yield m
+
+    @pytest.mark.asyncio
+    async def test_timings_reported(self, mock_api):
+        """Время каждого этапа попадает в результат"""
+        mock_api.get(KEY_URL, payload={"uuid": "u", "data": "d"})
+        mock_api.post(TOKEN_URL, payload={"token": "abc"})
+        async with BatchRefresher(SlowSigner(), key_url=KEY_URL) as refresher:
+            result = await refresher.refresh_one("1")
+        assert result.ok
+        assert set(result.timings) == {"key", "sign", "token"}
+
+    @pytest.mark.asyncio
+    async def test_sign_timeout(self, mock_api):
+        """Зависшая подпись не держит обновление дольше timeouts.sign"""
+        mock_api.get(KEY_URL, payload={"uuid": "u", "data": "d"})
+        timeouts = PhaseTimeouts(sign=0.01)
+        async with BatchRefresher(SlowSigner(delay=1), key_url=KEY_URL, timeouts=timeouts) as refresher:
+            result = await refresher.refresh_one("1")
+        assert not result.ok
+        assert result.error == "Таймаут на этапе sign"
+        assert result.timings["sign"] < 0.5
+
+    @pytest.mark.asyncio
+    async def test_refresh_budget(self, mock_api):
+        """Общий бюджет обновления ограничивает все этапы вместе"""
+        mock_api.get(KEY_URL, payload={"uuid": "u", "data": "d"})
+        timeouts = PhaseTimeouts(sign=10, refresh=0.05)
+        async with BatchRefresher(SlowSigner(delay=1), key_url=KEY_URL, timeouts=timeouts) as refresher:
+            result = await refresher.refresh_one("1")
+        assert result.error == "Таймаут на этапе sign"
+
+
+class TestHttpTimeouts:
+
+    @pytest.mark.asyncio
+    async def test_key_fetch_read_timeout(self):
+        """Зависший хост приводит к 504, а не к бесконечному ожиданию"""
+        async def slow(request):
+            await asyncio.sleep(1)
+            return web.json_response({})
+
+        app = web.Application()
+        app.router.add_get("/auth/key", slow)
+        async with TestServer(app) as server:
+            timeout = HttpTimeouts(connect=1, read=0.05, total=1).client_timeout()
+            async with Handler(base_url=str(server.make_url("/auth/key")), timeout=timeout) as ctx:
+                with pytest.raises(HTTPException) as exc_info:
+                    await ctx._make_request()
+        assert exc_info.value.status_code == 504
@@ -0,0 +1,149 @@
+# Moke tests/test_token_cache.py
+
+import base64
+import json
+import time
+import pytest
+from unittest.mock import MagicMock
+from src.token_cache import CachedToken, FileTokenBackend, RedisTokenBackend, TokenCache, parse_token_expiry
+
+
+def make_jwt(exp: float) -> str:
+    """Простой JWT без подписи с полем exp"""
+    def part(value: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+    return f"{part({'alg': 'none'})}.{part({'exp': exp})}.sig"
+
+
+class TestParseTokenExpiry:
+
+    def test_jwt_exp(self):
+        assert parse_token_expiry(make_jwt(1700000000)) == 1700000000
+
+    def test_not_jwt(self):
+        assert parse_token_expiry("plain-token") is None
+
+
+class TestTokenCache:
+
+    def test_hit_and_miss_counters(self):
+        """Попадания и промахи считаются"""
+        cache = TokenCache()
+        assert cache.get("644402604072") is None
+        cache.put("644402604072", make_jwt(time.time() + 3600))
+        assert cache.get("644402604072") is not None
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 1
+        assert cache.stats["hit_ratio"] == 0.5
+
+    def test_expired_entry_evicted_on_get(self):
+        """Истёкший токен не отдаётся и удаляется"""
+        cache = TokenCache(skew=0)
+        cache.put("inn", "token", expires_at=time.time() - 1)
+        assert cache.get("inn") is None
+        assert len(cache) == 0
+
+    def test_skew_treats_soon_expiring_as_stale(self):
+        """Токен, истекающий в пределах skew, считается устаревшим"""
+        cache = TokenCache(skew=60)
+        cache.put("inn", "token", expires_at=time.time() + 30)
+        assert cache.get("inn") is None
+
+    def test_default_ttl_for_opaque_token(self):
+        """Для не-JWT токена срок берётся из default_ttl"""
+        cache = TokenCache(default_ttl=100)
+        entry = cache.put("inn", "opaque")
+        assert 90 < entry.expires_at - time.time() <= 100
+
+    def test_evict_expired(self):
+        cache = TokenCache(skew=0)
+        cache.put("old", "t", expires_at=time.time() - 1)
+        cache.put("new", "t", expires_at=time.time() + 100)
+        assert cache.evict_expired() == 1
+        assert len(cache) == 1
+
+
+class TestFileTokenBackend:
+
+    def test_persists_between_instances(self, tmp_path):
+        """После перезапуска токены читаются из файла"""
+        path = tmp_path / "cache.json"
+        cache = TokenCache(FileTokenBackend(path))
+        cache.put("inn", "token", expires_at=time.time() + 3600)
+
+        restored = TokenCache(FileTokenBackend(path))
+        assert restored.get("inn") == "token"
+
+    def test_expired_entries_dropped_on_load(self, tmp_path):
+        path = tmp_path / "cache.json"
+        path.write_text(json.dumps({"inn": {"token": "t", "expires_at": 1}}), encoding="utf-8")
+
+        cache = TokenCache(FileTokenBackend(path))
+
+        assert len(cache) == 0
+        assert json.loads(path.read_text(encoding="utf-8")) == {}
+
+    def test_broken_file_ignored(self, tmp_path):
+        path = tmp_path / "cache.json"
+        path.write_text("not json", encoding="utf-8")
+        assert len(TokenCache(FileTokenBackend(path))) == 0
+
+    def test_get_during_write_keeps_merged_entries(self, tmp_path):
+        """reload() из другого потока между слиянием и записью не теряет изменения"""
+        path = tmp_path / "cache.json"
+        backend = FileTokenBackend(path)
+        backend.put("old", CachedToken("t", time.time() + 3600))
+        save = backend._save
+
+        def save_after_get(entries):
+            backend.get("missing")
+            save(entries)
+
+        backend._save = save_after_get
+        backend.write({"new": CachedToken("t", time.time() + 3600)})
+
+        assert set(FileTokenBackend(path).load()) == {"old", "new"}
+
+    @pytest.mark.asyncio
+    async def test_writes_batched_inside_event_loop(self, tmp_path):
+        """В event loop записи копятся и попадают в файл одной перезаписью"""
+        path = tmp_path / "cache.json"
+        backend = FileTokenBackend(path)
+        backend.write = MagicMock(wraps=backend.write)
+        cache = TokenCache(backend, flush_delay=60)
+        for inn in ("1", "2", "3"):
+            cache.put(inn, "token", expires_at=time.time() + 3600)
+        assert not path.exists()
+
+        await cache.aflush()
+
+        backend.write.assert_called_once()
+        assert set(json.loads(path.read_text(encoding="utf-8"))) == {"1", "2", "3"}
+
+
+class TestRedisTokenBackend:
+
+    def test_put_sets_expiry(self):
+        """Запись в Redis получает абсолютный срок истечения"""
+        client = MagicMock()
+        backend = RedisTokenBackend(prefix="t:", client=client)
+        backend.put("inn", CachedToken("token", 1700000000.5))
+        client.set.assert_called_once_with(
+            "t:inn", json.dumps({"token": "token", "expires_at": 1700000000.5}), pxat=1700000000500
+        )
+
+    def test_load(self):
+        client = MagicMock()
+        client.scan_iter.return_value = [b"t:inn"]
+        client.get.return_value = json.dumps({"token": "token", "expires_at": 1.0})
+        backend = RedisTokenBackend(prefix="t:", client=client)
+        assert backend.load() == {"inn": CachedToken("token", 1.0)}
+
+    def test_write_uses_one_pipeline(self):
+        client = MagicMock()
+        backend = RedisTokenBackend(prefix="t:", client=client)
+        backend.write({"a": CachedToken("x", 1.0), "b": CachedToken("y", 2.0)}, ["c"])
+        pipe = client.pipeline.return_value
+        assert pipe.set.call_count == 2
+        pipe.delete.assert_called_once_with("t:c")
+        pipe.execute.assert_called_once()
@@ -0,0 +1,127 @@
+# Moke tests/test_tracing.py
+
+import json
+import pytest
+import aioresponses
+from unittest.mock import MagicMock, patch
+from benchmarks.mock_api import MockTrueAPI
+from benchmarks.run_refresh import FakeSigner
+from src import tracing
+from src.async_signer import AsyncSigner
+from src.batch_refresh import BatchRefresher
+from src.retry import RetryPolicy
+from src.send_request import AsyncAPIHandler as Handler
+from src.to_sign_data import CryptoProSigner
+from src.tracing import FileSpanExporter, InMemorySpanExporter, Tracer
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    tracing.set_exporter(exporter)
+    yield exporter
+    tracing.set_exporter(None)
+
+
+class TestTracer:
+
+    def test_nested_spans_share_trace(self):
+        exporter = InMemorySpanExporter()
+        tracer = Tracer(exporter)
+        with tracer.span("parent", inn="7701") as parent:
+            with tracer.span("child") as child:
+                child.set_attribute("http.status_code", 200)
+
+        child, parent = exporter.spans  # потомок завершается первым
+        assert child.parent_span_id == parent.span_id
+        assert child.trace_id == parent.trace_id and len(parent.trace_id) == 32
+        assert parent.attributes == {"inn": "7701"}
+        assert child.end_time >= child.start_time
+
+    def test_exception_marks_error(self):
+        exporter = InMemorySpanExporter()
+        tracer = Tracer(exporter)
+        with pytest.raises(ValueError):
+            with tracer.span("failing"):
+                raise ValueError("сбой")
+
+        span = exporter.spans[0]
+        assert span.status == tracing.STATUS_ERROR
+        assert span.events[0]["attributes"]["exception.message"] == "сбой"
+
+    def test_disabled_tracer_is_noop(self):
+        tracer = Tracer()
+        with tracer.span("ignored") as span:
+            span.set_attribute("key", "value")
+        assert span is tracing.NOOP_SPAN
+
+    def test_file_exporter_writes_json_lines(self, tmp_path):
+        path = tmp_path / "spans.jsonl"
+        exporter = FileSpanExporter(path, batch_size=100)
+        tracer = Tracer(exporter)
+        for name in ("a", "b"):
+            with tracer.span(name):
+                pass
+        assert not path.exists()  # буфер ещё не сброшен
+
+        exporter.shutdown()
+        lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [line["name"] for line in lines] == ["a", "b"]
+        assert lines[0]["end_time_unix_nano"] >= lines[0]["start_time_unix_nano"]
+
+
+class TestInstrumentation:
+
+    @pytest.mark.asyncio
+    async def test_refresh_span_tree(self, exporter):
+        """Все этапы обновления — потомки token.refresh, включая подпись в потоке пула"""
+        signer = AsyncSigner(signer_factory=FakeSigner, max_workers=1)
+        try:
+            async with MockTrueAPI() as api:
+                async with BatchRefresher(signer, key_url=api.key_url, token_url=api.token_url) as refresher:
+                    result = await refresher.refresh_one("7701")
+        finally:
+            signer.close()
+
+        assert result.ok
+        root = exporter.by_name("token.refresh")[0]
+        assert root.attributes["inn"] == "7701" and root.attributes["refresh.ok"] is True
+        by_name = {span.name: span for span in exporter.spans}
+        for name in ("auth_key.request", "decode_data", "signer.sign", "auth_token.request"):
+            assert by_name[name].parent_span_id == root.span_id, name
+            assert by_name[name].trace_id == root.trace_id
+
+        key_span = by_name["auth_key.request"]
+        assert key_span.attributes["http.status_code"] == 200
+        assert key_span.attributes["auth.uuid"] == by_name["auth_token.request"].attributes["auth.uuid"]
+        assert by_name["signer.sign"].attributes["inn"] == "7701"
+
+        http_spans = exporter.by_name("http.request")
+        assert [span.attributes["http.method"] for span in http_spans] == ["GET", "POST"]
+        assert "http.connect_ms" in http_spans[0].attributes
+        assert http_spans[1].attributes["http.connection_reused"] is True
+        assert {span.parent_span_id for span in http_spans} == {key_span.span_id, by_name["auth_token.request"].span_id}
+
+    @pytest.mark.asyncio
+    async def test_retry_count(self, exporter):
+        url = "https://test-api.com/auth/key"
+        with aioresponses.aioresponses() as m:
+            m.get(url, status=503, payload={"message": "busy"})
+            m.get(url, payload={"uuid": "u1", "data": "d"})
+            async with Handler(url, retry_policy=RetryPolicy(base_delay=0.001, max_delay=0.001)) as handler:
+                await handler._make_request()
+
+        span = exporter.by_name("auth_key.request")[0]
+        assert span.attributes["retry.count"] == 1
+        assert span.attributes["http.status_code"] == 200
+        assert span.events[0]["name"] == "retry"
+
+    @patch("win32com.client.Dispatch")
+    def test_cryptopro_sign_span(self, mock_dispatch, exporter):
+        signer = CryptoProSigner()
+        signer.certificate = MagicMock()
+        mock_dispatch.return_value.SignCades.return_value = "signature"
+
+        assert signer.sign_data("data") == "signature"
+        span = exporter.by_name("cryptopro.sign_data")[0]
+        assert span.attributes == {"data.length": 4, "signature.created": True}
@@ -61,7 +61,7 @@ class IntegrationTestAuth:
                 return None
 
             # Кодируем данные в base64
-            encoded_data = await AsyncAPIHandler.decode_data(self.data_to_sign)
+            encoded_data = AsyncAPIHandler.decode_data(self.data_to_sign, self.signer.payload_format)
 
             # Подписываем
             signature = self.signer.sign_data(encoded_data, detached=True)
@@ -103,48 +103,43 @@ async def test_make_request_connection_error():
         assert exc_info.value.status_code == 503  # Service unavailable
 
 
-@pytest.mark.asyncio
-async def test_decode_data_success():
+def test_decode_data_success():
     """Проверка корректного кодирования строки в base64"""
     data = "Python"
 
-    result = await AsyncAPIHandler.decode_data(data)
+    result = AsyncAPIHandler.decode_data(data)
 
     expected = base64.b64encode(data.encode("utf-8"))
     assert result == expected
 
 
-@pytest.mark.asyncio
-async def test_decode_data_empty_string():
+def test_decode_data_empty_string():
     """Проверка кодирования пустой строки — возвращает b'' по текущей логике"""
-    result = await AsyncAPIHandler.decode_data("")
+    result = AsyncAPIHandler.decode_data("")
 
     assert result == b""  
 
 
-@pytest.mark.asyncio
-async def test_decode_data_special_chars():
+def test_decode_data_special_chars():
     """Проверка кодирования строки с кириллицей и спецсимволами"""
     data = "Привет, Мир! @#$%^&*()"
 
-    result = await AsyncAPIHandler.decode_data(data)
+    result = AsyncAPIHandler.decode_data(data)
 
     expected = base64.b64encode(data.encode("utf-8"))
     assert result == expected
 
 
-@pytest.mark.asyncio
-async def test_decode_data_none():
-    """Проверка обработки None или None-подобных значений"""
-    result = await AsyncAPIHandler.decode_data("None")
+def test_decode_data_none():
+    """Проверка обработки None"""
+    result = AsyncAPIHandler.decode_data(None)
 
-    assert result == b""  # согласно коду, ошибка → return b""
+    assert result == b""
 
 
-@pytest.mark.asyncio
-async def test_decode_data_non_string():
+def test_decode_data_non_string():
     """Проверка обработки нестроковых типов"""
-    result = await AsyncAPIHandler.decode_data("123")
+    result = AsyncAPIHandler.decode_data("123")
 
     expected = base64.b64encode(b"123")
     assert result == expected
\ No newline at end of file